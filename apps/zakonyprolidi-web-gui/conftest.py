@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Společné fixtures pro testy (pytest)"""
+
+import pytest
+
+from zakonyprolidi_db import ConnectionManager
+from zakonyprolidi_scraper import LocalDatabase
+
+DOCUMENTS = [
+    {'DocId': 1, 'Collection': 'cs', 'Code': '2012-89', 'Year': 2012, 'Number': 89,
+     'Quote': '89/2012 Sb.', 'Title': 'Občanský zákoník', 'DocType': '4',
+     'LastUpdate': '2024-01-01'},
+    {'DocId': 2, 'Collection': 'cs', 'Code': '2006-262', 'Year': 2006, 'Number': 262,
+     'Quote': '262/2006 Sb.', 'Title': 'Zákoník práce', 'DocType': '4',
+     'LastUpdate': '2024-01-01'},
+]
+
+
+@pytest.fixture
+def web_db(tmp_path, monkeypatch):
+    """Malá databáze dokumentů připojená k webovému modulu (bez init_app)"""
+    import zakonyprolidi_web as web
+
+    path = str(tmp_path / 'zakonyprolidi.db')
+    database = LocalDatabase(path)
+    database.bulk_save_documents(DOCUMENTS)
+    database.close()
+
+    manager = ConnectionManager(path)
+    monkeypatch.setattr(web, 'DB_PATH', path)
+    monkeypatch.setattr(web, 'db', manager)
+    yield manager
+    manager.close()
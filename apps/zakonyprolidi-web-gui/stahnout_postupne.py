@@ -15,12 +15,13 @@ import sys
 from datetime import datetime
 from zakonyprolidi_scraper import ZakonyProLidiDownloader
 
-def get_downloaded_years(db_path="zakonyprolidi.db"):
-    """Vrátí seznam již stažených roků"""
+def get_downloaded_years(db_path="zakonyprolidi.db", collection="cs"):
+    """Vrátí seznam kompletně stažených roků (podle registru synced_years)"""
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT year FROM documents ORDER BY year")
+        cursor.execute("SELECT year FROM synced_years WHERE collection = ? ORDER BY year",
+                       (collection,))
         years = [row[0] for row in cursor.fetchall()]
         conn.close()
         return years
@@ -132,6 +133,9 @@ def main():
 
     downloader.show_statistics()
 
+    print("\n💡 PRO PRŮBĚŽNOU AKTUALIZACI (nové a novelizované předpisy):")
+    print("   python3 zakonyprolidi_scraper.py --mode sync")
+
     print("\n💡 PRO STAŽENÍ VŠECH DAT:")
     print("   1. HTML scraping:  bash stahnout_vsechno.sh")
     print("   2. Partnerský klíč: python3 zakonyprolidi_scraper.py --apikey YOUR_KEY --start-year 1918 --end-year 2025")
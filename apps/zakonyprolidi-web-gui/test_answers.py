@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Testy cache odpovědí AI (AnswerCache a AIQueryEngine se StubAIClient)"""
+
+import time
+
+import pytest
+
+import zakonyprolidi_web as web
+from zakonyprolidi_answers import AnswerCache
+
+CONTEXT = [
+    {'code': '2012-89', 'quote': '89/2012 Sb.', 'title': 'Občanský zákoník', 'year': 2012,
+     'snippet': 'Každý má právo na ochranu své osobnosti.'},
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AnswerCache(str(tmp_path / 'answer_cache.db'))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def engine(web_db, cache):
+    engine = web.AIQueryEngine(provider='stub', answer_cache=cache)
+    engine.client = web.StubAIClient(delay=0)
+    return engine
+
+
+def test_cache_key_normalizes_question():
+    key = AnswerCache.cache_key('Co je  Občanský zákoník?', 'stub', 'stub', ['a'])
+
+    assert AnswerCache.cache_key('co je občanský zákoník', 'stub', 'stub', ['a']) == key
+    assert AnswerCache.cache_key('co je občanský zákoník', 'stub', 'stub', ['b']) != key
+    assert AnswerCache.cache_key('co je občanský zákoník', 'openai', 'stub', ['a']) != key
+
+
+def test_get_and_put(cache):
+    sources = {'2012-89': '2024-01-01'}
+
+    assert cache.get('k', sources) is None
+    cache.put('k', 'odpověď', sources)
+    assert cache.get('k', sources) == 'odpověď'
+    assert cache.statistics() == {'hits': 1, 'misses': 1, 'expired': 0, 'invalidated': 0,
+                                  'entries': 1}
+
+
+def test_changed_source_invalidates(cache):
+    cache.put('k', 'odpověď', {'2012-89': '2024-01-01'})
+
+    assert cache.get('k', {'2012-89': '2025-06-30'}) is None
+    assert cache.stats['invalidated'] == 1
+    # Neplatný záznam se smaže, ani původní verze ho nevrátí
+    assert cache.get('k', {'2012-89': '2024-01-01'}) is None
+
+
+def test_expired_entry(tmp_path):
+    cache = AnswerCache(str(tmp_path / 'ttl.db'), ttl=0.05)
+    cache.put('k', 'odpověď', {})
+    time.sleep(0.1)
+
+    assert cache.get('k', {}) is None
+    assert cache.stats['expired'] == 1
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = AnswerCache(str(tmp_path / 'lru.db'), max_entries=2)
+    cache.put('a', '1', {})
+    cache.put('b', '2', {})
+    time.sleep(0.01)
+    cache.get('a', {})
+    cache.put('c', '3', {})
+
+    assert cache.get('a', {}) == '1'
+    assert cache.get('b', {}) is None
+    assert cache.get('c', {}) == '3'
+    cache.close()
+
+
+def test_engine_answers_from_cache(engine, cache):
+    first = engine.ask_ai('Co je ochrana osobnosti?', CONTEXT)
+    second = engine.ask_ai('co je ochrana osobnosti', CONTEXT)
+
+    assert second == first
+    assert engine.client.calls == 1
+    assert cache.stats['hits'] == 1
+
+
+def test_engine_miss_for_different_context(engine):
+    engine.ask_ai('Co je ochrana osobnosti?', CONTEXT)
+    engine.ask_ai('Co je ochrana osobnosti?', [{**CONTEXT[0], 'snippet': 'Jiný fragment.'}])
+
+    assert engine.client.calls == 2
+
+
+def test_engine_invalidated_by_document_update(engine, cache, web_db):
+    engine.ask_ai('Co je ochrana osobnosti?', CONTEXT)
+
+    with web_db.writer() as conn:
+        conn.execute("UPDATE documents SET last_update = '2025-06-30' WHERE code = '2012-89'")
+    engine.ask_ai('Co je ochrana osobnosti?', CONTEXT)
+
+    assert engine.client.calls == 2
+    assert cache.stats['invalidated'] == 1
+
+
+def test_engine_stream_fills_cache(engine, cache):
+    streamed = ''.join(engine.ask_ai_stream('Co je ochrana osobnosti?', CONTEXT))
+
+    assert engine.ask_ai('Co je ochrana osobnosti?', CONTEXT) == streamed
+    assert engine.client.calls == 1
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Testy /api/ask/stream - pořadí událostí Server-Sent Events"""
+
+import json
+
+import pytest
+
+import zakonyprolidi_web as web
+
+
+def parse_events(body: str) -> list:
+    """[(event, data), ...] ze zpráv oddělených prázdným řádkem"""
+    events = []
+    for block in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@pytest.fixture
+def client(web_db, monkeypatch):
+    engine = web.AIQueryEngine(provider='stub')
+    engine.client = web.StubAIClient(delay=0)
+    monkeypatch.setattr(web, 'ai_engine', engine)
+    return web.app.test_client()
+
+
+def test_sources_tokens_done(client):
+    response = client.post('/api/ask/stream', json={'question': 'Co upravuje zákoník práce?'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    events = parse_events(response.get_data(as_text=True))
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == 'sources'
+    assert kinds[-1] == 'done'
+    assert set(kinds[1:-1]) == {'token'} and len(kinds) > 3
+
+    sources = events[0][1]
+    assert sources['question'] == 'Co upravuje zákoník práce?'
+    assert '2006-262' in [s['code'] for s in sources['sources']]
+
+    answer = ''.join(data['text'] for kind, data in events if kind == 'token')
+    assert answer.startswith('Odpověď stub')
+
+
+def test_error_after_tokens(client, monkeypatch):
+    def broken_stream(prompt, model):
+        yield 'Začátek '
+        raise ConnectionError('spojení přerušeno')
+
+    monkeypatch.setattr(web.ai_engine.client, 'stream', broken_stream)
+    response = client.post('/api/ask/stream', json={'question': 'Co upravuje zákoník práce?'})
+
+    events = parse_events(response.get_data(as_text=True))
+    assert [kind for kind, _ in events] == ['sources', 'token', 'error']
+    assert events[-1][1]['error'] == 'spojení přerušeno'
+
+
+def test_empty_question(client):
+    response = client.post('/api/ask/stream', json={'question': ''})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Prázdná otázka'
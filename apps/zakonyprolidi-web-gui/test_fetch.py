@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Testy FetchEngine, ResponseCache a AttachmentFetcher proti lokálnímu stub HTTP serveru"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from zakonyprolidi_attachments import AttachmentFetcher
+from zakonyprolidi_fetch import FetchEngine, ResponseCache, TokenBucket
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Odpovídá podle scénáře pro cestu: seznam (status, hlavičky), poslední se opakuje
+
+    server.delays zpomalí odpověď pro danou cestu (sekundy).
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits.setdefault(self.path, []).append(time.monotonic())
+            script = server.scripts.get(self.path, [(200, {})])
+            status, headers = script[min(len(server.hits[self.path]), len(script)) - 1]
+        time.sleep(server.delays.get(self.path, 0))
+
+        body = f"{status} {self.path}".encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.scripts = {}
+    server.delays = {}
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as s:
+        yield s
+
+
+def test_token_bucket_limits_rate(stub_server, session):
+    engine = FetchEngine(rate=20, burst=1, max_retries=0)
+
+    started = time.monotonic()
+    for i in range(11):
+        assert engine.request(session, f"{stub_server.url}/page/{i}").status_code == 200
+    elapsed = time.monotonic() - started
+
+    # První požadavek z plného bucketu, dalších 10 po 1/20 s
+    assert elapsed >= 0.45
+
+
+def test_token_bucket_allows_burst():
+    bucket = TokenBucket(rate=2, capacity=5)
+
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.1
+
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.4
+
+
+def test_map_runs_items_concurrently(stub_server, session):
+    engine = FetchEngine(rate=0, concurrency=4)
+    urls = [f"{stub_server.url}/doc/{i}" for i in range(8)]
+
+    results = list(engine.map(lambda url: engine.request(session, url).text, urls))
+
+    assert sorted(item for item, _, _ in results) == sorted(urls)
+    assert all(error is None and result.startswith('200') for _, result, error in results)
+
+
+def test_retries_server_errors_then_succeeds(stub_server, session):
+    stub_server.scripts['/flaky'] = [(503, {}), (500, {}), (200, {})]
+    engine = FetchEngine(rate=0, max_retries=4, backoff_base=0.01)
+
+    response = engine.request(session, f"{stub_server.url}/flaky")
+
+    assert response.status_code == 200
+    assert len(stub_server.hits['/flaky']) == 3
+
+
+def test_honours_retry_after_on_429(stub_server, session):
+    stub_server.scripts['/limited'] = [(429, {'Retry-After': '1'}), (200, {})]
+    engine = FetchEngine(rate=0, max_retries=2, backoff_base=0.01)
+
+    response = engine.request(session, f"{stub_server.url}/limited")
+
+    assert response.status_code == 200
+    first, second = stub_server.hits['/limited']
+    assert second - first >= 0.9
+
+
+def test_retry_after_is_capped_by_backoff_max(stub_server, session):
+    stub_server.scripts['/limited'] = [(429, {'Retry-After': '120'}), (200, {})]
+    engine = FetchEngine(rate=0, max_retries=2, backoff_max=0.2)
+
+    started = time.monotonic()
+    assert engine.request(session, f"{stub_server.url}/limited").status_code == 200
+    assert time.monotonic() - started < 2
+
+
+def test_gives_up_after_max_retries(stub_server, session):
+    stub_server.scripts['/down'] = [(502, {})]
+    engine = FetchEngine(rate=0, max_retries=2, backoff_base=0.01)
+
+    response = engine.request(session, f"{stub_server.url}/down")
+
+    assert response.status_code == 502
+    assert len(stub_server.hits['/down']) == 3
+
+
+def test_client_errors_are_not_retried(stub_server, session):
+    stub_server.scripts['/missing'] = [(404, {})]
+    engine = FetchEngine(rate=0, max_retries=4, backoff_base=0.01)
+
+    assert engine.request(session, f"{stub_server.url}/missing").status_code == 404
+    assert len(stub_server.hits['/missing']) == 1
+
+
+def test_retries_connection_errors(session):
+    engine = FetchEngine(rate=0, max_retries=1, backoff_base=0.01)
+
+    # Port bez serveru: po vyčerpání pokusů se chyba vyhodí
+    with pytest.raises(requests.exceptions.ConnectionError):
+        engine.request(session, "http://127.0.0.1:9/", timeout=1)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'http_cache.db'))
+    yield cache
+    cache.close()
+
+
+def test_cache_key_omits_apikey(stub_server, session, cache):
+    url = f"{stub_server.url}/data"
+    first = cache.get(session, url, params={'q': 'x', 'apikey': 'tajny'})
+    second = cache.get(session, url, params={'q': 'x', 'apikey': 'novy'})
+
+    # Klíč se posílá, ale v cache není a jeho výměna cache nezneplatní
+    assert list(stub_server.hits) == ['/data?q=x&apikey=tajny']
+    assert first.url == second.url == f"{url}?q=x"
+    assert second.from_cache
+    stored = cache.conn.execute("SELECT url FROM responses").fetchall()
+    assert stored == [(f"{url}?q=x",)]
+
+
+def test_concurrent_requests_share_one_download(stub_server, session, cache):
+    stub_server.delays['/slow'] = 0.3
+    url = f"{stub_server.url}/slow"
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: cache.get(session, url), range(4)))
+
+    assert len(stub_server.hits['/slow']) == 1
+    assert {r.content for r in responses} == {b'200 /slow'}
+    assert not cache.in_flight
+
+
+def test_slow_download_does_not_block_other_urls(stub_server, session, cache):
+    stub_server.delays['/slow'] = 0.5
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        slow = pool.submit(cache.get, session, f"{stub_server.url}/slow")
+        while '/slow' not in stub_server.hits:
+            time.sleep(0.01)
+
+        start = time.monotonic()
+        cache.get(session, f"{stub_server.url}/fast")
+        assert time.monotonic() - start < 0.3
+        assert not slow.done()
+        slow.result()
+
+
+def test_failed_download_is_not_left_in_flight(session, cache):
+    with pytest.raises(requests.exceptions.ConnectionError):
+        cache.get(session, "http://127.0.0.1:9/", timeout=1)
+
+    assert not cache.in_flight
+
+
+def test_too_large_attachment_is_not_downloaded_again(stub_server, session, tmp_path):
+    fetcher = AttachmentFetcher(str(tmp_path / 'attachments.db'), session=session, max_bytes=4)
+    url = f"{stub_server.url}/priloha.pdf"
+    path = str(tmp_path / 'priloha.pdf')
+
+    assert fetcher.fetch(url, path)['status'] == 'too_large'
+    assert fetcher.fetch(url, path)['status'] == 'too_large'
+
+    assert len(stub_server.hits['/priloha.pdf']) == 1
+    assert fetcher.statistics()['urls'] == {'too_large': 1}
+    fetcher.close()
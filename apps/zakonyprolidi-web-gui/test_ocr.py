@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Testy dokončení OCR úlohy (zápis textu, on_complete a evidence v artifacts)"""
+
+import time
+
+import pytest
+
+import zakonyprolidi_web as web
+from zakonyprolidi_artifacts import document_artifacts, init_artifacts
+from zakonyprolidi_ocr import OCRService
+
+
+@pytest.fixture
+def service(tmp_path):
+    completed = []
+    service = OCRService(str(tmp_path / 'ocr_queue.db'), output_dir=str(tmp_path / 'ocr_texts'),
+                         workers=1, on_complete=completed.append)
+    service.completed = completed
+    yield service
+    service.conn.close()
+
+
+def add_job(service: OCRService, output_path: str, doc_code: str = None) -> dict:
+    """Úloha s jednou hotovou stránkou (bez tesseractu)"""
+    now = time.time()
+    with service.lock:
+        job_id = service.conn.execute("""
+            INSERT INTO ocr_jobs (pdf_path, pdf_hash, status, output_path, doc_code, created_at, updated_at)
+            VALUES ('scan.pdf', 'hash', 'running', ?, ?, ?, ?)
+        """, (output_path, doc_code, now, now)).lastrowid
+        service.conn.commit()
+    service._store_page(job_id, 1, 'page-hash', 'Text stránky', from_cache=False, seconds=0.1)
+    return service.job(job_id)
+
+
+def test_complete_writes_text_and_notifies(service, tmp_path):
+    output_path = str(tmp_path / 'ocr_texts' / '2012' / '000' / '2012-89' / 'priloha.txt')
+    job = add_job(service, output_path, doc_code='2012-89')
+
+    service._complete(job)
+
+    assert service.job(job['job_id'])['status'] == 'done'
+    with open(output_path, encoding='utf-8') as f:
+        assert 'Text stránky' in f.read()
+    assert [(j['job_id'], j['doc_code']) for j in service.completed] == [(job['job_id'], '2012-89')]
+
+
+def test_failed_write_does_not_notify(service, tmp_path):
+    (tmp_path / 'blocker').write_text('')
+    job = add_job(service, str(tmp_path / 'blocker' / 'priloha.txt'))
+
+    service._complete(job)
+
+    assert service.job(job['job_id'])['status'] == 'error'
+    assert service.completed == []
+
+
+def test_completed_ocr_text_is_registered(service, web_db, tmp_path):
+    with web_db.writer() as conn:
+        init_artifacts(conn)
+    service.on_complete = web._record_ocr_text
+    output_path = str(tmp_path / 'ocr_texts' / '2012' / '000' / '2012-89' / 'priloha.txt')
+
+    service._complete(add_job(service, output_path, doc_code='2012-89'))
+
+    with web_db.reader() as conn:
+        assert [(a['kind'], a['path']) for a in document_artifacts(conn, '2012-89')] == [
+            ('text', output_path)]
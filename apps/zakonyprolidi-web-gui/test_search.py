@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Testy /api/search - hledání bez FTS5 (LIKE nad metadaty) a kurzor stránkování"""
+
+import base64
+import json
+
+import pytest
+
+import zakonyprolidi_web as web
+
+
+@pytest.fixture
+def client(web_db, monkeypatch):
+    engine = web.AIQueryEngine(provider='stub')
+    engine.fts_ready = False
+    monkeypatch.setattr(web, 'ai_engine', engine)
+    return web.app.test_client()
+
+
+def search(client, **data):
+    return client.post('/api/search', json={'fields': ['code', 'title'], **data})
+
+
+def test_like_fallback_matches_title(client):
+    response = search(client, query='práce')
+
+    assert response.status_code == 200
+    assert [d['code'] for d in response.get_json()['documents']] == ['2006-262']
+
+
+def test_like_fallback_matches_quote(client):
+    response = search(client, query='89/2012')
+
+    assert [d['code'] for d in response.get_json()['documents']] == ['2012-89']
+
+
+def test_cursor_pages_through_results(client):
+    first = search(client, query='zákoník', limit=1).get_json()
+    second = search(client, query='zákoník', limit=1, cursor=first['next_cursor']).get_json()
+
+    assert [d['code'] for d in first['documents'] + second['documents']] == ['2012-89', '2006-262']
+    assert second['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', [
+    web._encode_cursor({'rank': -2012, 'doc_id': 1}, 1)[:-4],                       # poškozený
+    base64.urlsafe_b64encode(json.dumps([-2012, 1]).encode()).decode(),             # bez hloubky
+    base64.urlsafe_b64encode(json.dumps({'rank': -2012}).encode()).decode(),        # ne seznam
+    base64.urlsafe_b64encode(json.dumps([-2012, 1, -5]).encode()).decode(),         # záporná hloubka
+    12345,
+])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = search(client, query='zákoník', cursor=cursor)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Neplatný kurzor'
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Testy inkrementální synchronizace (PublishList) proti lokálnímu stub API"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+from zakonyprolidi_fetch import FetchEngine
+from zakonyprolidi_scraper import ZakonyProLidiDownloader
+
+PUBLISH_LIST = {'Result': {'Docs': [
+    {'Collection': 'cs', 'Code': '2024-5', 'Year': 2024, 'Number': 5, 'Quote': '5/2024 Sb.',
+     'Title': 'Zákon o zkoušce', 'LastUpdate': '2024-01-05'},
+]}}
+
+DOC_DATA = {'Result': {'Fragments': [{'Content': 'Tento zákon upravuje zkoušku.'}]}}
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Odpověď podle metody API (.../data.json/<Metoda>): (status, JSON)"""
+
+    def do_GET(self):
+        method = urlparse(self.path).path.rsplit('/', 1)[-1]
+        self.server.calls.append(method)
+        status, payload = self.server.responses.get(method, (404, {}))
+
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+    server.calls = []
+    server.responses = {'PublishList': (200, PUBLISH_LIST), 'DocData': (200, DOC_DATA)}
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api/v1"
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_downloader(tmp_path, base_url: str) -> ZakonyProLidiDownloader:
+    engine = FetchEngine(rate=0, max_retries=0)
+    return ZakonyProLidiDownloader(db_path=str(tmp_path / 'zakonyprolidi.db'),
+                                   engine=engine, base_url=base_url)
+
+
+def test_unreachable_api_keeps_mark(tmp_path):
+    downloader = make_downloader(tmp_path, "http://127.0.0.1:9/api/v1")
+
+    result = downloader.sync('cs', since='2024-01-01', until='2024-01-10')
+
+    assert result['errors'] == 1
+    assert downloader.db.get_sync_mark('cs') is None
+    downloader.db.close()
+
+
+def test_successful_sync_moves_mark(tmp_path, stub_api):
+    downloader = make_downloader(tmp_path, stub_api.url)
+
+    result = downloader.sync('cs', since='2024-01-01', until='2024-01-10')
+
+    assert result == {'listed': 1, 'new': 1, 'updated': 0, 'errors': 0}
+    assert downloader.db.get_sync_mark('cs') == '2024-01-10'
+    downloader.db.close()
+
+
+def test_failed_document_keeps_mark(tmp_path, stub_api):
+    stub_api.responses['DocData'] = (500, {})
+    downloader = make_downloader(tmp_path, stub_api.url)
+
+    result = downloader.sync('cs', since='2024-01-01', until='2024-01-10')
+
+    assert result['errors'] == 1
+    assert downloader.db.get_sync_mark('cs') is None
+    downloader.db.close()
+
+
+def test_failed_document_retried_next_sync(tmp_path, stub_api):
+    stub_api.responses['DocData'] = (500, {})
+    downloader = make_downloader(tmp_path, stub_api.url)
+    downloader.sync('cs', since='2024-01-01', until='2024-01-10')
+
+    # Metadata jsou uložena, LastUpdate ale až s obsahem
+    assert downloader.db.get_last_updates('cs', ['2024-5']) == {'2024-5': None}
+
+    stub_api.responses['DocData'] = (200, DOC_DATA)
+    stub_api.calls.clear()
+    result = downloader.sync('cs', since='2024-01-01', until='2024-01-10')
+
+    assert result['errors'] == 0
+    assert 'DocData' in stub_api.calls
+    assert downloader.db.get_last_updates('cs', ['2024-5']) == {'2024-5': '2024-01-05'}
+    assert downloader.db.get_sync_mark('cs') == '2024-01-10'
+    downloader.db.close()
+
+
+def test_empty_document_is_error(tmp_path, stub_api):
+    stub_api.responses['DocData'] = (200, {})
+    downloader = make_downloader(tmp_path, stub_api.url)
+
+    result = downloader.sync('cs', since='2024-01-01', until='2024-01-10')
+
+    assert result['errors'] == 1
+    assert downloader.db.get_sync_mark('cs') is None
+    downloader.db.close()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Cache odpovědí AI
+====================================
+
+Odpověď AI se uloží pod klíčem z normalizované otázky, poskytovatele
+a modelu a hashů fragmentů kontextu. Stejná otázka nad nezměněnými
+dokumenty se tak nemusí znovu posílat do API.
+
+- TTL podle času vytvoření, nad max_entries se mažou nejdéle nepoužité (LRU)
+- u záznamu jsou uložené hodnoty last_update zdrojových dokumentů;
+  změní-li se některá, záznam se při dalším dotazu zahodí
+- počítadla hits / misses / expired / invalidated (za běh procesu)
+
+Použití:
+    python zakonyprolidi_answers.py              # statistiky
+    python zakonyprolidi_answers.py --clear      # smazat celou cache
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def normalize_question(question: str) -> str:
+    """Malá písmena, NFC, jednotlivé mezery, bez interpunkce na okrajích"""
+    text = unicodedata.normalize('NFC', question).lower()
+    text = ' '.join(text.split())
+    return re.sub(r'^[\W_]+|[\W_]+$', '', text)
+
+
+def fragment_hash(text: str) -> str:
+    """Hash textu fragmentu kontextu"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class AnswerCache:
+    """Persistentní cache odpovědí AI v SQLite"""
+
+    def __init__(self, path: str = "answer_cache.db", ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'invalidated': 0}
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                cache_key TEXT PRIMARY KEY,
+                question TEXT,
+                provider TEXT,
+                model TEXT,
+                answer TEXT NOT NULL,
+                sources TEXT,
+                hits INTEGER DEFAULT 0,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_accessed ON answers(accessed_at)")
+        self.conn.commit()
+
+    @staticmethod
+    def cache_key(question: str, provider: str, model: str, fragments: Iterable[str]) -> str:
+        """Klíč z normalizované otázky, poskytovatele/modelu a hashů fragmentů kontextu"""
+        payload = json.dumps([normalize_question(question), provider, model,
+                              [fragment_hash(text) for text in fragments]])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, sources: Dict[str, Optional[str]]) -> Optional[str]:
+        """Vrátí uloženou odpověď, pokud nevypršela a zdroje mají stejné last_update"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT answer, sources, created_at FROM answers WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+
+            answer, stored_sources, created_at = row
+            if now - created_at >= self.ttl:
+                reason = 'expired'
+            elif json.loads(stored_sources) != sources:
+                reason = 'invalidated'
+            else:
+                self.stats['hits'] += 1
+                self.conn.execute(
+                    "UPDATE answers SET hits = hits + 1, accessed_at = ? WHERE cache_key = ?", (now, key))
+                self.conn.commit()
+                return answer
+
+            self.stats[reason] += 1
+            self.stats['misses'] += 1
+            self.conn.execute("DELETE FROM answers WHERE cache_key = ?", (key,))
+            self.conn.commit()
+            return None
+
+    def put(self, key: str, answer: str, sources: Dict[str, Optional[str]],
+            question: str = None, provider: str = None, model: str = None):
+        """Uloží odpověď s verzemi (last_update) zdrojových dokumentů"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO answers
+                    (cache_key, question, provider, model, answer, sources, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, question, provider, model, answer, json.dumps(sources, sort_keys=True), now, now))
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        """Smaže prošlé záznamy a nejdéle nepoužité nad max_entries (volat pod zámkem)"""
+        self.conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+        self.conn.execute("""
+            DELETE FROM answers WHERE cache_key IN (
+                SELECT cache_key FROM answers ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self) -> int:
+        """Smaže všechny záznamy"""
+        with self.lock:
+            count = self.conn.execute("DELETE FROM answers").rowcount
+            self.conn.commit()
+        return count
+
+    def statistics(self) -> Dict[str, int]:
+        """Počítadla za běh procesu a počet uložených odpovědí"""
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {**self.stats, 'entries': entries}
+
+    def close(self):
+        """Zavře databázi cache"""
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Cache odpovědí AI asistenta')
+    parser.add_argument('--db', default='answer_cache.db', help='Cesta k databázi cache')
+    parser.add_argument('--clear', action='store_true', help='Smazat všechny odpovědi')
+
+    args = parser.parse_args()
+
+    cache = AnswerCache(args.db)
+    try:
+        if args.clear:
+            print(f"🗑️  Smazáno odpovědí: {cache.clear()}")
+
+        rows = cache.conn.execute("""
+            SELECT provider, model, COUNT(*), COALESCE(SUM(hits), 0)
+            FROM answers GROUP BY provider, model
+        """).fetchall()
+        for provider, model, count, hits in rows:
+            print(f"💬 {provider or '-':10} {model or '-':30} {count:6} odpovědí {hits:8} zásahů")
+        if not rows:
+            print("📭 Cache je prázdná")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Evidence stažených souborů
+=============================================
+
+Tabulka artifacts v hlavní databázi eviduje soubory dokumentů (PDF, text,
+přílohy) s cestou, velikostí a SHA-256. Kontrola "už staženo" i statistiky
+jsou indexované dotazy, ne os.path.exists / os.listdir nad adresáři se
+statisíci souborů.
+
+Soubory se ukládají do podadresářů podle roku a stovky čísla předpisu:
+    pdfs/2012/000/2012-89.pdf
+    attachments/2012/000/2012-89/priloha.pdf
+Kódy bez tvaru ROK-ČÍSLO jdou do other/<první 2 znaky hashe>/.
+
+Použití:
+    python zakonyprolidi_artifacts.py --migrate   # přesun z plochých adresářů + evidence
+    python zakonyprolidi_artifacts.py --scan      # zaeviduje soubory dopsané mimo web (OCR z CLI)
+    python zakonyprolidi_artifacts.py --verify    # odstraní záznamy chybějících souborů
+    python zakonyprolidi_artifacts.py             # statistiky
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+# Druhy souborů
+KINDS = ('pdf', 'pdf_fallback', 'text', 'attachment')
+
+# Co znamená "dokument je stažen"
+DOWNLOADED_KINDS = ('pdf', 'pdf_fallback')
+
+_CODE_RE = re.compile(r'^(\d{4})-(\d+)')
+
+
+def shard(doc_code: str) -> List[str]:
+    """Podadresáře pro dokument: [rok, stovka čísla], jinak [other, hash]"""
+    match = _CODE_RE.match(doc_code)
+    if match:
+        return [match.group(1), f"{int(match.group(2)) // 100:03d}"]
+    return ['other', hashlib.sha1(doc_code.encode('utf-8')).hexdigest()[:2]]
+
+
+def shard_path(base: str, doc_code: str, *parts: str) -> str:
+    """Cesta v rozděleném adresáři, např. shard_path('pdfs', '2012-89', '2012-89.pdf')"""
+    return os.path.join(base, *shard(doc_code), *parts)
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 souboru (čte se po blocích)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def init_artifacts(conn: sqlite3.Connection):
+    """Vytvoří tabulku artifacts s indexy"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS artifacts (
+            artifact_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doc_code TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER,
+            sha256 TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_doc ON artifacts(doc_code, kind)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_kind ON artifacts(kind, doc_code)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_sha ON artifacts(sha256)")
+    conn.commit()
+
+
+def record_artifact(conn: sqlite3.Connection, doc_code: str, kind: str, path: str,
+                    sha256: str = None):
+    """Zaeviduje (nebo aktualizuje) soubor dokumentu; bez commitu"""
+    size = os.path.getsize(path)
+    if sha256 is None:
+        sha256 = file_sha256(path)
+    conn.execute("""
+        INSERT INTO artifacts (doc_code, kind, path, size, sha256)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            doc_code = excluded.doc_code, kind = excluded.kind, size = excluded.size,
+            sha256 = excluded.sha256, updated_at = CURRENT_TIMESTAMP
+    """, (doc_code, kind, path, size, sha256))
+
+
+def has_artifact(conn: sqlite3.Connection, doc_code: str,
+                 kinds: Iterable[str] = DOWNLOADED_KINDS) -> bool:
+    """Má dokument zaevidovaný soubor některého z druhů?"""
+    kinds = list(kinds)
+    return conn.execute(f"""
+        SELECT 1 FROM artifacts WHERE doc_code = ? AND kind IN ({','.join('?' * len(kinds))}) LIMIT 1
+    """, [doc_code, *kinds]).fetchone() is not None
+
+
+def document_artifacts(conn: sqlite3.Connection, doc_code: str) -> List[Dict]:
+    """Soubory dokumentu"""
+    return [
+        {'kind': row[0], 'path': row[1], 'size': row[2], 'sha256': row[3]}
+        for row in conn.execute(
+            "SELECT kind, path, size, sha256 FROM artifacts WHERE doc_code = ? ORDER BY kind, path",
+            (doc_code,)
+        )
+    ]
+
+
+def artifact_statistics(conn: sqlite3.Connection) -> Dict[str, Dict[str, int]]:
+    """Podle druhu: počet souborů, dokumentů a bajtů"""
+    return {
+        row[0]: {'files': row[1], 'documents': row[2], 'bytes': row[3]}
+        for row in conn.execute("""
+            SELECT kind, COUNT(*), COUNT(DISTINCT doc_code), COALESCE(SUM(size), 0)
+            FROM artifacts GROUP BY kind
+        """)
+    }
+
+
+def _is_shard_dir(name: str) -> bool:
+    return name == 'other' or re.fullmatch(r'\d{4}', name) is not None
+
+
+def _move(path: str, target: str) -> str:
+    if os.path.abspath(path) != os.path.abspath(target):
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+    return target
+
+
+def migrate_attachment_blobs(attachments_db: str, attachments_dir: str = "attachments") -> int:
+    """Přepíše cesty v attachment_blobs (index AttachmentFetcher) na rozdělenou strukturu
+
+    Opraví i záznamy po dřívější migraci, která index neaktualizovala.
+    Vrací počet přepsaných cest.
+    """
+    if not os.path.exists(attachments_db):
+        return 0
+
+    base = os.path.abspath(attachments_dir)
+    blobs = sqlite3.connect(attachments_db)
+    try:
+        if not blobs.execute("SELECT 1 FROM sqlite_master WHERE name = 'attachment_blobs'").fetchone():
+            return 0
+
+        updates = []
+        for sha256, path in blobs.execute("SELECT sha256, path FROM attachment_blobs"):
+            if os.path.exists(path):
+                continue
+            # Plochá cesta attachments/KOD/soubor -> attachments/ROK/STOVKA/KOD/soubor
+            code_dir, name = os.path.split(path)
+            if os.path.abspath(os.path.dirname(code_dir)) != base:
+                continue
+            code = os.path.basename(code_dir)
+            target = shard_path(attachments_dir, code, code, name)
+            if os.path.exists(target):
+                updates.append((target, sha256))
+
+        blobs.executemany("UPDATE attachment_blobs SET path = ? WHERE sha256 = ?", updates)
+        blobs.commit()
+        return len(updates)
+    finally:
+        blobs.close()
+
+
+def migrate_flat_layout(conn: sqlite3.Connection, pdf_dir: str = "pdfs", text_dir: str = "ocr_texts",
+                        attachments_dir: str = "attachments",
+                        attachments_db: str = "attachments.db") -> Dict[str, int]:
+    """Přesune soubory z plochých adresářů (pdfs/KOD.pdf, attachments/KOD/...) do
+    rozdělené struktury a zaeviduje je. Jednorázová migrace starších instalací.
+
+    Cesty příloh přepíše i v indexu stažených příloh (attachments_db)."""
+    moved = {kind: 0 for kind in KINDS}
+
+    if os.path.isdir(pdf_dir):
+        for entry in os.scandir(pdf_dir):
+            if not entry.is_file():
+                continue
+            code, ext = os.path.splitext(entry.name)
+            kind = {'.pdf': 'pdf', '.txt': 'pdf_fallback'}.get(ext)
+            if kind:
+                record_artifact(conn, code, kind, _move(entry.path, shard_path(pdf_dir, code, entry.name)))
+                moved[kind] += 1
+
+    if os.path.isdir(text_dir):
+        for entry in os.scandir(text_dir):
+            if entry.is_file() and entry.name.endswith('.txt'):
+                code = entry.name[:-4]
+                record_artifact(conn, code, 'text', _move(entry.path, shard_path(text_dir, code, entry.name)))
+                moved['text'] += 1
+            elif entry.is_dir() and not _is_shard_dir(entry.name):
+                # Texty příloh: ocr_texts/KOD/priloha.txt
+                for sub in os.scandir(entry.path):
+                    if sub.is_file():
+                        target = shard_path(text_dir, entry.name, entry.name, sub.name)
+                        record_artifact(conn, entry.name, 'text', _move(sub.path, target))
+                        moved['text'] += 1
+
+    if os.path.isdir(attachments_dir):
+        for entry in os.scandir(attachments_dir):
+            if not entry.is_dir() or _is_shard_dir(entry.name):
+                continue
+            for sub in os.scandir(entry.path):
+                if sub.is_file() and not sub.name.endswith('.part'):
+                    target = shard_path(attachments_dir, entry.name, entry.name, sub.name)
+                    record_artifact(conn, entry.name, 'attachment', _move(sub.path, target))
+                    moved['attachment'] += 1
+
+    conn.commit()
+    migrate_attachment_blobs(attachments_db, attachments_dir)
+    return moved
+
+
+def scan_layout(conn: sqlite3.Connection, base: str, kind: str) -> int:
+    """Zaeviduje soubory v rozdělené struktuře, které ještě nejsou v artifacts
+    (např. texty z OCR fronty dokončené po stažení dokumentu)"""
+    known = {row[0] for row in conn.execute("SELECT path FROM artifacts")}
+    added = 0
+
+    def add(code: str, path: str):
+        nonlocal added
+        if path in known or path.endswith('.part'):
+            return
+        file_kind = 'pdf_fallback' if kind == 'pdf' and path.endswith('.txt') else kind
+        record_artifact(conn, code, file_kind, path)
+        added += 1
+
+    if not os.path.isdir(base):
+        return 0
+    for top in os.scandir(base):
+        if not top.is_dir() or not _is_shard_dir(top.name):
+            continue
+        for bucket in os.scandir(top.path):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.is_file():
+                    add(os.path.splitext(entry.name)[0], entry.path)
+                elif entry.is_dir():
+                    for sub in os.scandir(entry.path):
+                        if sub.is_file():
+                            add(entry.name, sub.path)
+
+    conn.commit()
+    return added
+
+
+def verify_artifacts(conn: sqlite3.Connection) -> int:
+    """Smaže záznamy souborů, které už na disku nejsou"""
+    missing = [row[0] for row in conn.execute("SELECT artifact_id, path FROM artifacts")
+               if not os.path.exists(row[1])]
+    conn.executemany("DELETE FROM artifacts WHERE artifact_id = ?", [(i,) for i in missing])
+    conn.commit()
+    return len(missing)
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Evidence stažených souborů dokumentů')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--migrate', action='store_true',
+                        help='Přesunout soubory z plochých adresářů do rozdělené struktury')
+    parser.add_argument('--scan', action='store_true',
+                        help='Zaevidovat soubory, které v evidenci chybí (např. dokončené OCR)')
+    parser.add_argument('--verify', action='store_true', help='Odstranit záznamy chybějících souborů')
+    parser.add_argument('--pdf-dir', default='pdfs', help='Adresář PDF')
+    parser.add_argument('--text-dir', default='ocr_texts', help='Adresář textů')
+    parser.add_argument('--attachments-dir', default='attachments', help='Adresář příloh')
+    parser.add_argument('--attachments-db', default='attachments.db', help='Index stažených příloh')
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+
+    try:
+        init_artifacts(conn)
+
+        if args.migrate:
+            moved = migrate_flat_layout(conn, args.pdf_dir, args.text_dir, args.attachments_dir,
+                                        args.attachments_db)
+            print(f"✅ Přesunuto a zaevidováno: {moved}")
+
+        if args.scan:
+            added = sum(scan_layout(conn, base, kind) for base, kind in (
+                (args.pdf_dir, 'pdf'), (args.text_dir, 'text'), (args.attachments_dir, 'attachment')))
+            print(f"✅ Nově zaevidováno: {added}")
+
+        if args.verify:
+            print(f"🗑️  Odstraněno záznamů chybějících souborů: {verify_artifacts(conn)}")
+
+        for kind, values in artifact_statistics(conn).items():
+            print(f"📁 {kind:13} {values['files']:8} souborů {values['documents']:8} dokumentů "
+                  f"{values['bytes'] / 1e6:10.1f} MB")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Stahování příloh
+===================================
+
+Přílohy (PDF, DOC, XLS) se stahují mimo ResponseCache přímo na disk:
+- stream=True, zápis po blocích - soubor nikdy není celý v paměti
+- přílohy jednoho dokumentu se stahují souběžně (thread pool)
+- deduplikace podle URL (už stažená URL se nestahuje znovu) i podle
+  SHA-256 obsahu (stejný soubor pod jinou URL se jen hardlinkuje)
+- přerušené stažení pokračuje z .part souboru přes Range/If-Range
+- limit velikosti (Content-Length předem, skutečná délka při stahování)
+
+Index je v SQLite (attachments.db): attachment_urls (URL -> hash, stav,
+validátory pro navázání) a attachment_blobs (hash -> kanonický soubor).
+
+Použití:
+    python zakonyprolidi_attachments.py https://.../priloha.pdf --dir attachments/test
+    python zakonyprolidi_attachments.py --stats
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from zakonyprolidi_fetch import FetchEngine, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+# Chyby, po kterých má smysl navázat na .part soubor
+RESUMABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout)
+
+
+class AttachmentTooLarge(Exception):
+    """Příloha překračuje povolenou velikost"""
+
+
+def _content_range_total(value: Optional[str]) -> Optional[int]:
+    """Celková velikost z hlavičky Content-Range (bytes 100-199/200)"""
+    match = re.search(r'/(\d+)\s*$', value or '')
+    return int(match.group(1)) if match else None
+
+
+class AttachmentFetcher:
+    """Streamované, souběžné a deduplikované stahování příloh"""
+
+    # Zámky po URL jsou rozložené do pevného počtu pruhů - paměť neroste s počtem URL
+    URL_LOCK_STRIPES = 64
+
+    # Konečné stavy URL bez souboru - další běhy je znovu nestahují
+    FINAL_STATUSES = ('too_large',)
+
+    def __init__(self, path: str = "attachments.db", session: requests.Session = None,
+                 concurrency: int = 4, max_bytes: int = DEFAULT_MAX_BYTES, retries: int = 3,
+                 timeout: float = 60):
+        self.path = path
+        self.session = session or requests.Session()
+        self.concurrency = max(1, concurrency)
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.timeout = timeout
+        self.stats = {'downloaded': 0, 'cached': 0, 'deduplicated': 0, 'resumed': 0,
+                      'too_large': 0, 'errors': 0, 'bytes': 0}
+
+        self.lock = threading.Lock()
+        self.url_locks = [threading.Lock() for _ in range(self.URL_LOCK_STRIPES)]
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS attachment_urls (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                sha256 TEXT,
+                size INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_attachment_urls_sha ON attachment_urls(sha256);
+
+            CREATE TABLE IF NOT EXISTS attachment_blobs (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER,
+                created_at REAL
+            );
+        """)
+        self.conn.commit()
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        return self.url_locks[hash(url) % len(self.url_locks)]
+
+    def _count(self, key: str, value: int = 1):
+        with self.lock:
+            self.stats[key] += value
+
+    def _load_url(self, url: str) -> Optional[Tuple]:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT status, sha256, size, etag, last_modified FROM attachment_urls WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+    def _blob_path(self, sha256: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT path FROM attachment_blobs WHERE sha256 = ?",
+                                    (sha256,)).fetchone()
+        return row[0] if row and os.path.exists(row[0]) else None
+
+    def _save_url(self, url: str, status: str, sha256: str = None, size: int = None,
+                  etag: str = None, last_modified: str = None):
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO attachment_urls
+                    (url, status, sha256, size, etag, last_modified, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (url, status, sha256, size, etag, last_modified, time.time()))
+            self.conn.commit()
+
+    @staticmethod
+    def _materialize(source: str, path: str):
+        """Zpřístupní již stažený soubor pod další cestou (hardlink, jinak kopie)"""
+        if os.path.exists(path):
+            if os.path.samefile(source, path):
+                return
+            os.remove(path)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+
+    def _request(self, url: str, headers: Dict, engine: FetchEngine = None) -> requests.Response:
+        if engine:
+            return engine.request(self.session, url, timeout=self.timeout, headers=headers, stream=True)
+        return self.session.get(url, timeout=self.timeout, headers=headers, stream=True)
+
+    def _download(self, url: str, part: str, engine: FetchEngine = None) -> Tuple[str, int, bool]:
+        """Stáhne URL do .part souboru (případně naváže), vrací (sha256, velikost, navázáno)"""
+        row = self._load_url(url)
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        validator = row and row[0] == 'partial' and (row[3] or row[4])
+
+        headers = {}
+        if offset and validator:
+            # If-Range: změnil-li se soubor na serveru, přijde celý znovu (200)
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+
+        with self._request(url, headers, engine) as response:
+            if response.status_code == 416:
+                # .part je delší než soubor na serveru - začni znovu
+                os.remove(part)
+                self._save_url(url, 'partial')
+                return self._download(url, part, engine)
+            response.raise_for_status()
+
+            resumed = response.status_code == 206
+            if resumed:
+                total = _content_range_total(response.headers.get('Content-Range'))
+            else:
+                offset = 0
+                length = response.headers.get('Content-Length')
+                total = int(length) if length and length.isdigit() else None
+
+            if total is not None and total > self.max_bytes:
+                raise AttachmentTooLarge(f"{url}: {total} B > limit {self.max_bytes} B")
+
+            self._save_url(url, 'partial', etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'))
+
+            # Hash musí pokrýt celý soubor včetně už stažené části
+            hasher = hashlib.sha256()
+            if resumed:
+                with open(part, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        hasher.update(chunk)
+
+            size = offset
+            Path(part).parent.mkdir(parents=True, exist_ok=True)
+            with open(part, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise AttachmentTooLarge(f"{url}: více než limit {self.max_bytes} B")
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    self._count('bytes', len(chunk))
+
+        return hasher.hexdigest(), size, resumed
+
+    def fetch(self, url: str, path: str, engine: FetchEngine = None) -> Dict:
+        """Stáhne přílohu do path, vrací {url, path, sha256, size, status}
+
+        status: downloaded, resumed, cached (URL už stažena), deduplicated
+        (stejný obsah pod jinou URL), too_large, error
+        """
+        result = {'url': url, 'path': None, 'sha256': None, 'size': None, 'status': 'error'}
+
+        with self._url_lock(url):
+            row = self._load_url(url)
+            if row and row[0] in self.FINAL_STATUSES:
+                self._count(row[0])
+                result['status'] = row[0]
+                return result
+            if row and row[0] == 'done':
+                source = self._blob_path(row[1])
+                if source:
+                    self._materialize(source, path)
+                    self._count('cached')
+                    result.update(path=path, sha256=row[1], size=row[2], status='cached')
+                    return result
+
+            part = path + '.part'
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        sha256, size, resumed = self._download(url, part, engine)
+                        break
+                    except RESUMABLE_ERRORS as e:
+                        if attempt >= self.retries:
+                            raise
+                        delay = backoff_delay(attempt)
+                        logger.warning(f"Přerušené stahování {url}: {e} - navazuji za {delay:.1f}s")
+                        time.sleep(delay)
+                        attempt += 1
+            except AttachmentTooLarge as e:
+                logger.warning(f"Příloha přeskočena: {e}")
+                if os.path.exists(part):
+                    os.remove(part)
+                self._save_url(url, 'too_large')
+                self._count('too_large')
+                result['status'] = 'too_large'
+                return result
+            except Exception as e:
+                # .part zůstává, příští pokus naváže
+                logger.error(f"Chyba při stahování přílohy {url}: {e}")
+                self._count('errors')
+                result['error'] = str(e)
+                return result
+
+            with self.lock:
+                existing = self.conn.execute("SELECT path FROM attachment_blobs WHERE sha256 = ?",
+                                             (sha256,)).fetchone()
+                duplicate = existing and os.path.exists(existing[0]) and existing[0] != path
+                if not duplicate:
+                    os.replace(part, path)
+                    self.conn.execute("""
+                        INSERT OR REPLACE INTO attachment_blobs (sha256, path, size, created_at)
+                        VALUES (?, ?, ?, ?)
+                    """, (sha256, path, size, time.time()))
+                    self.conn.commit()
+
+            if duplicate:
+                os.remove(part)
+                self._materialize(existing[0], path)
+
+            self._save_url(url, 'done', sha256=sha256, size=size)
+            status = 'deduplicated' if duplicate else ('resumed' if resumed else 'downloaded')
+            self._count(status)
+            result.update(path=path, sha256=sha256, size=size, status=status)
+            return result
+
+    def fetch_all(self, items: Iterable[Tuple[str, str]], engine: FetchEngine = None) -> List[Dict]:
+        """Stáhne (url, cesta) souběžně, výsledky vrací ve stejném pořadí"""
+        items = list(items)
+        if len(items) <= 1:
+            return [self.fetch(url, path, engine) for url, path in items]
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items))) as executor:
+            return list(executor.map(lambda item: self.fetch(item[0], item[1], engine), items))
+
+    def statistics(self) -> Dict:
+        """Počty URL podle stavu, unikátní soubory a čítače běhu"""
+        with self.lock:
+            urls = dict(self.conn.execute(
+                "SELECT status, COUNT(*) FROM attachment_urls GROUP BY status"
+            ).fetchall())
+            blobs, blob_bytes = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM attachment_blobs"
+            ).fetchone()
+            return {'urls': urls, 'files': blobs, 'bytes': blob_bytes, 'session': dict(self.stats)}
+
+    def close(self):
+        """Zavře index příloh"""
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Stahování příloh (streamované, s deduplikací)')
+    parser.add_argument('urls', nargs='*', help='URL příloh')
+    parser.add_argument('--dir', default='attachments', help='Cílový adresář')
+    parser.add_argument('--index', default='attachments.db', help='Soubor indexu příloh')
+    parser.add_argument('--concurrency', type=int, default=4, help='Souběžná stahování')
+    parser.add_argument('--max-size', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help='Maximální velikost přílohy v MB')
+    parser.add_argument('--stats', action='store_true', help='Zobrazit statistiky indexu')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+
+    fetcher = AttachmentFetcher(args.index, concurrency=args.concurrency,
+                                max_bytes=int(args.max_size * 1024 * 1024))
+    try:
+        items = [(url, os.path.join(args.dir, os.path.basename(url.split('?')[0]))) for url in args.urls]
+        started = time.perf_counter()
+        for result in fetcher.fetch_all(items):
+            print(f"📎 {result['status']:12} {result['size'] or '-':>10} {result['url']}")
+        if items:
+            print(f"⏱️  {time.perf_counter() - started:.1f}s")
+
+        if args.stats or not items:
+            stats = fetcher.statistics()
+            print(f"📊 URL: {stats['urls']}, souborů: {stats['files']} ({stats['bytes'] / 1e6:.1f} MB)")
+    finally:
+        fetcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Benchmark hlavních cest
+==========================================
+
+Reprodukovatelné měření bez sítě nad syntetickou databází:
+- vyhledávání (AIQueryEngine.search_documents, FTS5 i fallback, filtr tagů)
+- výběr kontextu AI dotazů (AIQueryEngine.retrieve_context)
+- výběr dokumentů ke stažení (DownloadManager.get_documents_by_criteria)
+- ZakonyQuery.search_by_title / list_by_year / statistics
+- zápis (LocalDatabase.save_document po jednom a bulk_save_documents)
+- přetagování celého korpusu podle tag_rules.json (nanečisto, bez zápisu)
+- parsování HTML uložených stránek (zakonyprolidi_html, všechny backendy)
+
+Syntetické databáze (deterministické podle --seed) se ukládají do --data-dir
+a při dalším běhu se použijí znovu. Výsledky jdou do JSON, který lze
+porovnat s předchozí verzí přes --compare.
+
+Použití:
+    python zakonyprolidi_bench.py --sizes 10000 100000 --output bench.json
+    python zakonyprolidi_bench.py --pages stranky/ --output bench.json
+    python zakonyprolidi_bench.py --output nove.json --compare stare.json
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from zakonyprolidi_html import BACKENDS, HAS_LXML, extract_page
+from zakonyprolidi_pdf import HAS_PDF, render_paper
+from zakonyprolidi_query import ZakonyQuery
+from zakonyprolidi_scraper import LocalDatabase
+from zakonyprolidi_storage import collect_garbage, fragment_text, put_json
+from zakonyprolidi_fulltext import set_body
+from zakonyprolidi_retrieval import set_fragments
+from zakonyprolidi_tagging import TagRules, retag
+from zakonyprolidi_tags import assign_tags
+
+# Verze generátoru - při změně dat se databáze vytvoří znovu
+GENERATOR_VERSION = 3
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# Podíl dokumentů s kompletním obsahem (fragmenty v content_blobs)
+CONTENT_RATIO = 0.05
+
+DOC_TYPES = ('Zákon', 'Vyhláška', 'Nařízení vlády', 'Sdělení', 'Usnesení', 'Nález')
+
+SUBJECTS = (
+    'daních z příjmů', 'zaměstnanosti', 'silničním provozu', 'ochraně spotřebitele',
+    'veřejných zakázkách', 'zdravotních službách', 'stavebním řádu', 'obchodních korporacích',
+    'odpadech', 'ochraně osobních údajů', 'katastru nemovitostí', 'státní sociální podpoře',
+    'účetnictví', 'myslivosti', 'vodách', 'pozemních komunikacích', 'azylu', 'insolvenci',
+)
+
+WORDS = (
+    'zákon', 'zákoník', 'zaměstnavatel', 'zaměstnanec', 'povinnost', 'právo', 'smlouva',
+    'odstavec', 'paragraf', 'lhůta', 'řízení', 'správní', 'orgán', 'obec', 'kraj', 'stát',
+    'daň', 'poplatník', 'přiznání', 'pokuta', 'přestupek', 'rozhodnutí', 'odvolání', 'soud',
+    'nemovitost', 'vlastník', 'nájem', 'pojištění', 'dávka', 'příspěvek', 'podpora',
+    'osoba', 'fyzická', 'právnická', 'podnikatel', 'evidence', 'registr', 'údaje', 'ochrana',
+    'stavba', 'povolení', 'územní', 'plán', 'vozidlo', 'řidič', 'provoz', 'komunikace',
+)
+
+# Tagy syntetických dokumentů (podíl otagovaných a počet tagů na dokument)
+TAGS = ('pracovní právo', 'daňové právo', 'správní právo', 'stavební právo', 'dopravní právo',
+        'občanské právo', 'nové', 'platné', 'historické')
+TAGGED_RATIO = 0.4
+
+QUERIES = ('zákoník práce', 'daň z příjmů', 'silniční provoz', 'ochrana osobních údajů',
+           'stavební povolení', 'zaměstnavatel povinnost', 'insolvence', 'účetnictví')
+
+
+def _timed(func: Callable, calls: List[tuple], repeat: int) -> Dict:
+    """Změří volání func(*args) pro každé args, `repeat` průchodů po zahřátí"""
+    for args in calls:
+        func(*args)
+
+    times = []
+    for _ in range(repeat):
+        for args in calls:
+            started = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - started)
+
+    times.sort()
+    return {
+        'calls': len(times),
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 3),
+        'min_ms': round(times[0] * 1000, 3),
+        'max_ms': round(times[-1] * 1000, 3),
+    }
+
+
+def _quiet(func: Callable) -> Callable:
+    """ZakonyQuery výsledky tiskne - výstup se při měření zahodí"""
+    def wrapper(*args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args)
+    return wrapper
+
+
+def synthetic_document(rng: random.Random, doc_id: int) -> Dict:
+    """Jeden dokument ve tvaru odpovědi API (DocId, Code, Quote, ...)"""
+    year = rng.randint(1945, 2025)
+    number = rng.randint(1, 600)
+    doc_type = rng.choice(DOC_TYPES)
+    publish = date(year, 1, 1) + timedelta(days=rng.randint(0, 364))
+    effect_from = publish + timedelta(days=rng.choice((0, 15, 30, 180)))
+
+    return {
+        'DocId': doc_id,
+        'Collection': 'cs',
+        'Code': f"{year}-{number}-{doc_id}",
+        'Year': year,
+        'Number': number,
+        'Quote': f"{number}/{year} Sb.",
+        'Title': f"{doc_type} o {rng.choice(SUBJECTS)} a {rng.choice(SUBJECTS)}",
+        'DocType': doc_type,
+        'DeclareDate': publish.isoformat(),
+        'PublishDate': publish.isoformat(),
+        'EffectFrom': effect_from.isoformat(),
+        'EffectTill': None,
+        'LastUpdate': f"{publish.isoformat()}T00:00:00",
+        'Href': f"/cs/{year}-{number}",
+    }
+
+
+def synthetic_content(rng: random.Random, fragments: int = 20) -> Dict:
+    """Obsah dokumentu ve tvaru API ({"Fragments": [{"Content": ...}]})"""
+    return {'Fragments': [
+        {'Content': f"§ {i + 1} " + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(15, 60)))}
+        for i in range(fragments)
+    ]}
+
+
+def synthetic_page(paragraphs: int = 1000, seed: int = 1) -> str:
+    """HTML stránka ve struktuře zakonyprolidi.cz (navigace + div.Paper)"""
+    rng = random.Random(seed)
+    nav = ''.join(f'<li><a href="/cs/{rng.randint(1945, 2025)}-{i}">Předpis {i}</a></li>'
+                  for i in range(300))
+    body = ''.join(
+        f'<p class="L2"><var>§ {i}</var> ' + ' '.join(rng.choice(WORDS) for _ in range(40)) + '</p>'
+        for i in range(paragraphs)
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        '<title>Zákon č. 262/2006 Sb. – Zákoník práce</title></head>'
+        f'<body><ul class="Menu">{nav}</ul><div class="Frags Paper">{body}</div></body></html>'
+    )
+
+
+def build_database(path: str, size: int, seed: int = 42) -> Dict:
+    """Vytvoří syntetickou databázi se `size` dokumenty (deterministicky podle seed)"""
+    if os.path.exists(path):
+        os.remove(path)
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    database = LocalDatabase(path, commit_interval=10_000)
+    conn = database.conn
+
+    database.bulk_save_documents(synthetic_document(rng, doc_id) for doc_id in range(1, size + 1))
+
+    # Tagy (document_tags) pro část dokumentů - vyhledávání je vrací a filtruje podle nich
+    tagged = rng.sample(range(1, size + 1), int(size * TAGGED_RATIO))
+    assign_tags(conn, ((doc_id, rng.sample(TAGS, rng.randint(1, 3))) for doc_id in tagged), source='auto')
+    conn.commit()
+
+    # Obsah jen pro část dokumentů, po dávkách v jedné transakci
+    with_content = rng.sample(range(1, size + 1), int(size * CONTENT_RATIO))
+    for i, doc_id in enumerate(with_content, start=1):
+        content = synthetic_content(rng)
+        conn.execute("UPDATE documents SET content_json_ref = ? WHERE doc_id = ?",
+                     (put_json(conn, content), doc_id))
+        set_body(conn, doc_id, fragment_text(content))
+        set_fragments(conn, doc_id, content)
+        if i % 1000 == 0:
+            conn.commit()
+    conn.commit()
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    database.close()
+
+    return {'build_seconds': round(time.perf_counter() - started, 2)}
+
+
+def _database_path(data_dir: str, size: int, seed: int) -> str:
+    return os.path.join(data_dir, f"synthetic_v{GENERATOR_VERSION}_{size}_{seed}.db")
+
+
+def bench_web(db_path: str, repeat: int) -> Dict:
+    """search_documents a get_documents_by_criteria z webové aplikace"""
+    import zakonyprolidi_web as web
+    from zakonyprolidi_db import ConnectionManager
+
+    # Webový modul čte DB_PATH a db při každém volání; init_app() se nevolá
+    # (fronty, cache a OCR benchmark nepotřebuje)
+    web.DB_PATH = db_path
+    web.db = ConnectionManager(db_path)
+
+    engine = web.AIQueryEngine(provider='none')
+    manager = web.DownloadManager()
+    results = {}
+
+    try:
+        queries = [(q,) for q in QUERIES]
+        results['web.search_documents'] = _timed(engine.search_documents, queries, repeat)
+        results['web.search_documents[ask]'] = _timed(
+            lambda q: engine.search_documents(q, limit=5, match_all=False, snippet_tokens=64),
+            queries, repeat)
+        results['web.retrieve_context'] = _timed(engine.retrieve_context, queries, repeat)
+        results['web.search_documents[tags]'] = _timed(
+            lambda q: engine.search_documents(q, filters={'tags': ['pracovní právo']}), queries, repeat)
+        results['web.search_documents[tag only]'] = _timed(
+            lambda tag: engine.search_documents('', limit=20, filters={'tags': [tag]}),
+            [(tag,) for tag in TAGS[:3]], repeat)
+
+        engine.fts_ready = False
+        results['web.search_documents[like]'] = _timed(engine.search_documents, queries[:2], 1)
+        engine.fts_ready = True
+
+        criteria = [
+            ({'year': 2006},),
+            ({'doc_type': 'Vyhláška'},),
+            ({'date_from': '2020-01-01', 'date_to': '2020-12-31'},),
+            ({'days_old': 365 * 3, 'doc_type': 'Zákon'},),
+            ({'max_docs': 1000},),
+        ]
+        results['web.get_documents_by_criteria'] = _timed(
+            manager.get_documents_by_criteria, criteria, repeat)
+    finally:
+        web.db.close()
+
+    return results
+
+
+def bench_query(db_path: str, repeat: int) -> Dict:
+    """ZakonyQuery (CLI dotazy)"""
+    query = ZakonyQuery(db_path)
+    try:
+        return {
+            'query.search_by_title': _timed(
+                _quiet(query.search_by_title), [('práce',), ('odpadech',), ('azylu',)], repeat),
+            'query.list_by_year': _timed(
+                _quiet(query.list_by_year), [(2006,), (1990, 'Zákon'), (2024, 'Vyhláška')], repeat),
+            'query.statistics': _timed(_quiet(query.statistics), [()], max(1, repeat // 5)),
+        }
+    finally:
+        query.close()
+
+
+def bench_ingest(db_path: str, single: int, bulk: int, seed: int) -> Dict:
+    """Zápis nových dokumentů do databáze dané velikosti (po měření se smažou)"""
+    rng = random.Random(seed + 1)
+    database = LocalDatabase(db_path)
+    conn = database.conn
+    first_id = conn.execute("SELECT COALESCE(MAX(doc_id), 0) FROM documents").fetchone()[0] + 1
+    results = {}
+
+    try:
+        # Po jednom dokumentu (commit po každém), každý pátý s obsahem
+        docs = [synthetic_document(rng, first_id + i) for i in range(single)]
+        contents = [json.dumps(synthetic_content(rng)) if i % 5 == 0 else None for i in range(single)]
+        started = time.perf_counter()
+        for doc, content in zip(docs, contents):
+            database.save_document(doc, content_json=content)
+        elapsed = time.perf_counter() - started
+        results['scraper.save_document'] = {
+            'rows': single,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(single / elapsed, 1) if elapsed > 0 else None,
+        }
+
+        docs = [synthetic_document(rng, first_id + single + i) for i in range(bulk)]
+        results['scraper.bulk_save_documents'] = database.bulk_save_documents(docs)
+    finally:
+        conn.execute("DELETE FROM documents WHERE doc_id >= ?", (first_id,))
+        conn.commit()
+        collect_garbage(conn)
+        database.close()
+
+    return results
+
+
+def bench_tagging(db_path: str) -> Dict:
+    """Přetagování celého korpusu podle pravidel (dry-run - databáze se nemění)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        stats = retag(conn, TagRules.load(), dry_run=True)
+    finally:
+        conn.close()
+
+    # Stejný tvar jako metriky zápisu (rows, seconds, rows_per_second) pro report i porovnání
+    return {'tagging.retag': {
+        'rows': stats['documents'],
+        'seconds': stats['seconds'],
+        'rows_per_second': stats['documents_per_second'],
+        'tagged': stats['tagged'],
+        'added': stats['added'],
+        'removed': stats['removed'],
+    }}
+
+
+def bench_html(pages: List[str], repeat: int) -> Dict:
+    """Parsování uložených stránek všemi dostupnými backendy"""
+    if pages:
+        documents = []
+        for path in pages:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                documents.append((os.path.basename(path), f.read()))
+    else:
+        documents = [('synthetic.html', synthetic_page())]
+
+    results = {}
+    for backend in BACKENDS:
+        if backend == 'lxml' and not HAS_LXML:
+            continue
+        for name, html in documents:
+            stats = _timed(lambda h: extract_page(h, backend=backend), [(html,)], repeat)
+            stats['bytes'] = len(html.encode('utf-8'))
+            results[f"html.extract_page[{backend}]:{name}"] = stats
+
+    if HAS_PDF:
+        pdf_path = os.path.join(tempfile.gettempdir(), 'zakony_bench.pdf')
+        for name, html in documents:
+            content = BeautifulSoup(html, 'html.parser').find('div', class_='Paper')
+            if content is None:
+                continue
+            stats = _timed(lambda c: render_paper(c, pdf_path), [(content,)], repeat)
+            stats['pages'] = render_paper(content, pdf_path)
+            stats['pages_per_second'] = round(stats['pages'] / (stats['median_ms'] / 1000), 1)
+            results[f"pdf.render_paper:{name}"] = stats
+        os.remove(pdf_path)
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[int], data_dir: str, pages: List[str], repeat: int = 5,
+              seed: int = 42, rebuild: bool = False) -> Dict:
+    """Spustí celý benchmark, vrací slovník pro JSON"""
+    os.makedirs(data_dir, exist_ok=True)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'html': bench_html(pages, repeat),
+        'sizes': {},
+    }
+
+    for size in sizes:
+        path = _database_path(data_dir, size, seed)
+        entry = {}
+
+        if rebuild or not os.path.exists(path):
+            print(f"🏗️  Generuji databázi s {size} dokumenty: {path}")
+            entry.update(build_database(path, size, seed))
+
+        entry['db_bytes'] = os.path.getsize(path)
+        print(f"⏱️  Měřím {size} dokumentů...")
+
+        metrics = {}
+        metrics.update(bench_web(path, repeat))
+        metrics.update(bench_query(path, repeat))
+        metrics.update(bench_ingest(path, single=200, bulk=5000, seed=seed))
+        metrics.update(bench_tagging(path))
+        entry['metrics'] = metrics
+        report['sizes'][str(size)] = entry
+
+    return report
+
+
+def _flatten(report: Dict) -> Dict[str, float]:
+    """Metrika -> hodnota pro porovnání (medián v ms, u zápisu řádků za sekundu)"""
+    values = {}
+    for name, stats in report.get('html', {}).items():
+        values[name] = stats['median_ms']
+    for size, entry in report.get('sizes', {}).items():
+        for name, stats in entry.get('metrics', {}).items():
+            if 'median_ms' in stats:
+                values[f"{size}:{name}"] = stats['median_ms']
+            elif stats.get('seconds'):
+                values[f"{size}:{name}"] = stats['seconds'] * 1000
+    return values
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 1.25) -> List[str]:
+    """Vypíše změny proti baseline, vrací metriky zpomalené víc než threshold"""
+    old, new = _flatten(baseline), _flatten(current)
+    regressions = []
+
+    print(f"\n{'Metrika':70} | {'Před ms':>10} | {'Teď ms':>10} | {'Poměr':>6}")
+    print("-" * 105)
+    for name in sorted(set(old) & set(new)):
+        ratio = new[name] / old[name] if old[name] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            flag = ' ⚠️'
+            regressions.append(name)
+        print(f"{name[:70]:70} | {old[name]:10.2f} | {new[name]:10.2f} | {ratio:6.2f}{flag}")
+
+    return regressions
+
+
+def print_report(report: Dict):
+    """Přehled výsledků"""
+    print(f"\n{'Metrika':70} | {'Medián ms':>10} | {'p95 ms':>10}")
+    print("-" * 96)
+    for name, stats in report['html'].items():
+        print(f"{name[:70]:70} | {stats['median_ms']:10.2f} | {stats['p95_ms']:10.2f}")
+
+    for size, entry in report['sizes'].items():
+        print(f"\n📦 {size} dokumentů ({entry['db_bytes'] / 1e6:.0f} MB)")
+        for name, stats in entry['metrics'].items():
+            if 'median_ms' in stats:
+                print(f"  {name:68} | {stats['median_ms']:10.2f} | {stats['p95_ms']:10.2f}")
+            else:
+                print(f"  {name:68} | {stats['rows_per_second']:>10} řádků/s")
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark Zákonů pro lidi (offline)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Velikosti syntetických databází (počet dokumentů)')
+    parser.add_argument('--data-dir', default='bench_data', help='Adresář se syntetickými databázemi')
+    parser.add_argument('--pages', help='Adresář s uloženými HTML stránkami (*.html)')
+    parser.add_argument('--repeat', type=int, default=5, help='Počet opakování každého měření')
+    parser.add_argument('--seed', type=int, default=42, help='Seed generátoru dat')
+    parser.add_argument('--rebuild', action='store_true', help='Znovu vygenerovat databáze')
+    parser.add_argument('--output', default='bench_results.json', help='Výstupní JSON')
+    parser.add_argument('--compare', help='Porovnat s předchozím JSON výstupem')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Poměr zpomalení považovaný za regresi')
+
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(os.path.join(args.pages, '*.html'))) if args.pages else []
+    report = run_suite(args.sizes, args.data_dir, pages, repeat=args.repeat,
+                       seed=args.seed, rebuild=args.rebuild)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print_report(report)
+    print(f"\n💾 Výsledky uloženy: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n⚠️  Regrese ({len(regressions)}): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Výběr dokumentů podle kritérií
+=================================================
+
+Dotaz pro dávky stahování (datum vyhlášení od-do, stáří ve dnech, typ,
+rok) seřazený od nejnovějších. Ke každé kombinaci filtrů existuje
+složený index, který dotaz pokryje celý:
+- filtrovaný sloupec, pak publish_date (rozsah data i ORDER BY ... DESC
+  se čtou z indexu, bez řazení celé tabulky)
+- zbytek vracených sloupců (CRITERIA_FIELDS), takže se nečte řádek
+  tabulky s obsahem dokumentu
+
+Použití:
+    python zakonyprolidi_criteria.py --create-indexes
+    python zakonyprolidi_criteria.py --doc-type Zákon --date-from 2020-01-01 --explain
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+# Sloupce, které potřebuje zpracování dokumentu (doc_id je rowid, je v každém indexu)
+CRITERIA_FIELDS = ('doc_id', 'code', 'title', 'quote', 'doc_type', 'year', 'publish_date')
+
+# Pokrývající indexy: (název, sloupce) - vedoucí sloupec podle filtru
+CRITERIA_INDEXES = (
+    ('idx_documents_published', ('publish_date', 'doc_type', 'year', 'code', 'quote', 'title')),
+    ('idx_documents_type_published', ('doc_type', 'publish_date', 'year', 'code', 'quote', 'title')),
+    ('idx_documents_year_published', ('year', 'publish_date', 'doc_type', 'code', 'quote', 'title')),
+)
+
+DEFAULT_LIMIT = 100
+
+
+def init_criteria_indexes(conn: sqlite3.Connection) -> List[str]:
+    """Vytvoří chybějící pokrývající indexy, vrací názvy nově vytvořených
+
+    Bez tabulky documents (databáze ještě nebyla naplněna) nedělá nic.
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    if 'documents' not in existing:
+        return []
+    created = []
+    for name, columns in CRITERIA_INDEXES:
+        if name not in existing:
+            conn.execute(f"CREATE INDEX {name} ON documents({', '.join(columns)})")
+            created.append(name)
+    if created and conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+        # Statistiky pro plánovač, aby mezi indexy vybíral podle selektivity
+        conn.execute("ANALYZE documents")
+    conn.commit()
+    return created
+
+
+def build_criteria_query(criteria: Dict, default_limit: int = DEFAULT_LIMIT) -> Tuple[str, list]:
+    """SQL a parametry pro kritéria dávky (date_from, date_to, days_old, doc_type, year, max_docs)"""
+    clauses, params = [], []
+
+    # Dolní mez data: date_from a stáří ve dnech - platí přísnější
+    lower = [criteria['date_from']] if criteria.get('date_from') else []
+    if criteria.get('days_old'):
+        lower.append((datetime.now() - timedelta(days=criteria['days_old'])).strftime('%Y-%m-%d'))
+    if lower:
+        clauses.append("publish_date >= ?")
+        params.append(max(lower))
+
+    if criteria.get('date_to'):
+        clauses.append("publish_date <= ?")
+        params.append(criteria['date_to'])
+
+    if criteria.get('doc_type'):
+        clauses.append("doc_type = ?")
+        params.append(criteria['doc_type'])
+
+    if criteria.get('year'):
+        clauses.append("year = ?")
+        params.append(criteria['year'])
+
+    sql = f"SELECT {', '.join(CRITERIA_FIELDS)} FROM documents"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY publish_date DESC LIMIT ?"
+    params.append(criteria.get('max_docs') or default_limit)
+    return sql, params
+
+
+def select_documents(conn: sqlite3.Connection, criteria: Dict,
+                     default_limit: int = DEFAULT_LIMIT) -> List[Dict]:
+    """Dokumenty podle kritérií, nejnovější první (jen CRITERIA_FIELDS)"""
+    sql, params = build_criteria_query(criteria, default_limit)
+    return [dict(zip(CRITERIA_FIELDS, row)) for row in conn.execute(sql, params)]
+
+
+def explain(conn: sqlite3.Connection, criteria: Dict, default_limit: int = DEFAULT_LIMIT) -> Dict:
+    """EXPLAIN QUERY PLAN dotazu - použitý index, pokrytí a případné řazení mimo index"""
+    sql, params = build_criteria_query(criteria, default_limit)
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    indexes = [name for name, _ in CRITERIA_INDEXES if any(name in step for step in plan)]
+    return {
+        'sql': sql,
+        'params': params,
+        'plan': plan,
+        'indexes': indexes,
+        'covering': any('COVERING INDEX' in step for step in plan),
+        'temp_sort': any('TEMP B-TREE' in step for step in plan),
+        'full_scan': any(step.startswith('SCAN') and 'INDEX' not in step for step in plan),
+    }
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Výběr dokumentů ke stažení podle kritérií')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--create-indexes', action='store_true', help='Vytvořit pokrývající indexy')
+    parser.add_argument('--date-from', help='Vyhlášeno od (YYYY-MM-DD)')
+    parser.add_argument('--date-to', help='Vyhlášeno do (YYYY-MM-DD)')
+    parser.add_argument('--days-old', type=int, help='Vyhlášeno za posledních N dní')
+    parser.add_argument('--doc-type', help='Typ dokumentu')
+    parser.add_argument('--year', type=int, help='Rok')
+    parser.add_argument('--max-docs', type=int, help='Počet dokumentů')
+    parser.add_argument('--explain', action='store_true', help='Vypsat plán dotazu místo výsledků')
+
+    args = parser.parse_args()
+    criteria = {k: v for k, v in vars(args).items()
+                if k in ('date_from', 'date_to', 'days_old', 'doc_type', 'year', 'max_docs')}
+
+    conn = sqlite3.connect(args.db)
+
+    try:
+        if args.create_indexes:
+            created = init_criteria_indexes(conn)
+            print(f"✅ Vytvořeno indexů: {len(created)} {', '.join(created)}")
+
+        if args.explain:
+            result = explain(conn, criteria)
+            print(result['sql'])
+            for step in result['plan']:
+                print(f"  {step}")
+            status = '✅' if result['covering'] and not result['temp_sort'] else '⚠️ '
+            print(f"{status} pokrývající index: {result['covering']}, řazení mimo index: {result['temp_sort']}")
+        elif not args.create_indexes:
+            for doc in select_documents(conn, criteria):
+                print(f"{doc['publish_date'] or '':10} | {doc['quote'] or '':15} | "
+                      f"{doc['doc_type'] or '':15} | {(doc['title'] or '')[:60]}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Správa SQLite spojení
+========================================
+
+Znovupoužitelná spojení pro web (Flask) a stahovací vlákna:
+- pool čtecích spojení (query_only) - bez režie connect() na každý dotaz
+- jediné zapisovací spojení chráněné zámkem - zápisy z download vláken
+  se serializují v procesu místo "database is locked"
+- pragmy: WAL, synchronous=NORMAL, mmap_size, cache_size, busy_timeout
+
+Použití:
+    db = ConnectionManager("zakonyprolidi.db")
+    with db.reader() as conn:
+        conn.execute("SELECT ...")
+    with db.writer() as conn:
+        conn.execute("UPDATE ...")      # commit při úspěšném opuštění bloku
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class ConnectionManager:
+    """Pool čtecích spojení a jediný zapisovatel nad jednou databází"""
+
+    def __init__(self, db_path: str, mmap_size: int = 256 * 1024 * 1024,
+                 cache_size_kb: int = 64 * 1024, busy_timeout_ms: int = 5000,
+                 max_idle_readers: int = 8):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._readers = queue.LifoQueue(maxsize=max_idle_readers)
+        self._writer = None
+        self._writer_lock = threading.RLock()
+
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        """Otevře spojení s nastavenými pragmami"""
+        # Spojení nepatří jednomu vláknu, ale vždy ho drží jen jeden uživatel
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        else:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Zapůjčí čtecí spojení z poolu (po použití se vrátí)"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect(read_only=True)
+
+        try:
+            yield conn
+        finally:
+            # Nedokončená transakce by držela snapshot WAL
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Jediné zapisovací spojení - commit při úspěchu, rollback při chybě"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect(read_only=False)
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    def close(self):
+        """Zavře všechna spojení"""
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Paralelní stahování s rate limitem
+=====================================================
+
+Sdílený fetch engine pro API i HTML:
+- token bucket rate limiter (průměrná rychlost + povolený burst)
+- konfigurovatelný počet souběžných požadavků (thread pool)
+- opakování při 429/5xx a síťových chybách s jittered exponential backoff
+- respektuje hlavičku Retry-After
+- on-disk cache odpovědí (ETag/Last-Modified revalidace, TTL, LRU podle velikosti)
+
+Engine nepředpokládá konkrétní server - pro testy stačí předat
+ZakonyProLidiAPI(base_url="http://127.0.0.1:PORT/api/v1").
+"""
+
+import json
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Stavové kódy, u kterých má smysl požadavek opakovat
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token bucket - průměrně `rate` požadavků za sekundu, burst až `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Počká, dokud není k dispozici token"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                wait = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Full jitter: náhodná pauza 0..min(cap, base * 2^attempt)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Vrátí pauzu z hlavičky Retry-After (jen sekundy), jinak None"""
+    value = response.headers.get('Retry-After')
+    if value and value.strip().isdigit():
+        return float(value.strip())
+    return None
+
+
+class FetchEngine:
+    """Rate-limitovaný HTTP klient s paralelním zpracováním a retry"""
+
+    def __init__(self, rate: float = 2.0, burst: Optional[float] = None, concurrency: int = 4,
+                 max_retries: int = 4, backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def configure_session(self, session: requests.Session):
+        """Zvětší connection pool session podle počtu souběžných požadavků"""
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+    def request(self, session: requests.Session, url: str, params: Dict = None,
+                timeout: float = 30, **kwargs) -> requests.Response:
+        """GET s rate limitem a opakováním při 429/5xx a síťových chybách"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                response = session.get(url, params=params, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                logger.warning(f"Síťová chyba {url}: {e} - opakuji za {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                delay = min(delay, self.backoff_max)
+                logger.warning(f"HTTP {response.status_code} pro {url} - opakuji za {delay:.1f}s")
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+        """Spustí func paralelně nad položkami, vrací (položka, výsledek, chyba) v pořadí dokončení"""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(func, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+
+
+class CachedResponse:
+    """Odpověď z ResponseCache - kompatibilní podmnožina requests.Response"""
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers: Dict,
+                 from_cache: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def encoding(self) -> str:
+        match = re.search(r'charset=([\w-]+)', self.headers.get('Content-Type', ''), re.I)
+        return match.group(1) if match else 'utf-8'
+
+    @property
+    def text(self) -> str:
+        try:
+            return self.content.decode(self.encoding, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}",
+                                                response=self)
+
+
+class ResponseCache:
+    """Sdílená on-disk cache GET odpovědí s podmíněnou revalidací
+
+    - čerstvý záznam (mladší než TTL) se vrátí bez síťového požadavku
+    - starší záznam se revaliduje přes If-None-Match / If-Modified-Since,
+      odpověď 304 jen obnoví čas a vrátí uložené tělo
+    - celková velikost je omezena, nejdéle nepoužité záznamy se mažou (LRU)
+    """
+
+    CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+    # Přihlašovací parametry se posílají, ale do klíče (a tedy do souboru cache) nepatří
+    CREDENTIAL_PARAMS = ('apikey',)
+
+    def __init__(self, path: str = "http_cache.db", ttl: float = 3600,
+                 max_bytes: int = 512 * 1024 * 1024, max_entry_bytes: int = 20 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+
+        self.lock = threading.Lock()
+        # Rozpracované požadavky podle klíče - souběžní žadatelé počkají na stejný výsledek
+        self.in_flight: Dict[str, Future] = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                headers TEXT,
+                body BLOB,
+                size INTEGER,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @classmethod
+    def cache_key(cls, url: str, params: Dict = None) -> str:
+        """Klíč cache = úplná URL včetně parametrů kromě přihlašovacích údajů
+
+        Klíč API tak není uložený v čitelné podobě a jeho výměna cache nezneplatní.
+        """
+        params = {k: v for k, v in (params or {}).items() if k not in cls.CREDENTIAL_PARAMS}
+        return requests.Request('GET', url, params=params).prepare().url
+
+    def _count(self, stat: str):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def _load(self, key: str) -> Optional[Tuple]:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT status, headers, body, fetched_at FROM responses WHERE url = ?", (key,)
+            ).fetchone()
+
+    def _touch(self, key: str, refetched: bool = False):
+        now = time.time()
+        with self.lock:
+            if refetched:
+                self.conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                                  (now, now, key))
+            else:
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, key))
+            self.conn.commit()
+
+    def _store(self, key: str, response: requests.Response):
+        body = response.content
+        if len(body) > self.max_entry_bytes:
+            return
+
+        headers = {h: response.headers[h] for h in self.CACHED_HEADERS if h in response.headers}
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE url = ?", (key,)).fetchone()
+            self.conn.execute("""
+                INSERT OR REPLACE INTO responses (url, status, headers, body, size, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (key, response.status_code, json.dumps(headers), body, len(body), now, now))
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Smaže nejdéle nepoužité záznamy nad limitem velikosti (volat pod zámkem)"""
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT url, size FROM responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            for url, size in rows:
+                self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def get(self, session: requests.Session, url: str, params: Dict = None, timeout: float = 30,
+            engine: FetchEngine = None) -> CachedResponse:
+        """GET přes cache; souběžné požadavky na stejnou URL se stáhnou jen jednou
+
+        Během síťového požadavku se nedrží žádný zámek - ostatní URL nečekají
+        na retry a backoff cizího stahování.
+        """
+        key = self.cache_key(url, params)
+
+        with self.lock:
+            pending = self.in_flight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self.in_flight[key] = Future()
+        if not leader:
+            return pending.result()
+
+        try:
+            response = self._fetch(session, key, url, params, timeout, engine)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(response)
+            return response
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def _fetch(self, session: requests.Session, key: str, url: str, params: Optional[Dict],
+               timeout: float, engine: Optional[FetchEngine]) -> CachedResponse:
+        """Odpověď z cache, nebo (re)validace na serveru a uložení"""
+        entry = self._load(key)
+        headers = {}
+
+        if entry:
+            status, stored_headers, body, fetched_at = entry
+            stored_headers = json.loads(stored_headers)
+            if time.time() - fetched_at < self.ttl:
+                self._count('hits')
+                self._touch(key)
+                return CachedResponse(key, status, body, stored_headers, from_cache=True)
+
+            if 'ETag' in stored_headers:
+                headers['If-None-Match'] = stored_headers['ETag']
+            if 'Last-Modified' in stored_headers:
+                headers['If-Modified-Since'] = stored_headers['Last-Modified']
+
+        request_url = requests.Request('GET', url, params=params).prepare().url
+        if engine:
+            response = engine.request(session, request_url, timeout=timeout, headers=headers)
+        else:
+            response = session.get(request_url, timeout=timeout, headers=headers)
+
+        if response.status_code == 304 and entry:
+            self._count('revalidated')
+            self._touch(key, refetched=True)
+            return CachedResponse(key, status, body, stored_headers, from_cache=True)
+
+        # Při chybě serveru je lepší starší obsah než žádný
+        if response.status_code >= 500 and entry:
+            logger.warning(f"HTTP {response.status_code} pro {key} - použita starší verze z cache")
+            return CachedResponse(key, status, body, stored_headers, from_cache=True)
+
+        self._count('misses')
+        if response.status_code == 200:
+            self._store(key, response)
+
+        return CachedResponse(key, response.status_code, response.content,
+                              dict(response.headers))
+
+    def close(self):
+        """Zavře databázi cache"""
+        with self.lock:
+            self.conn.close()
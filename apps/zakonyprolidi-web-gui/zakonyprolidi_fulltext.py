@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Fulltextový index
+====================================
+
+FTS5 index nad citací, názvem a textem fragmentů dokumentů.
+
+- tokenizer unicode61 s odstraněním diakritiky ("zakon" najde "zákon")
+- synchronizace triggery na tabulce documents
+- řazení podle BM25, výsledky se zvýrazněným úryvkem místo content_json
+- projekce polí, stránkování kurzorem (rank, doc_id) a fasety rok / typ
+- filtr podle tagů (zakonyprolidi_tags) jako vyhledání v indexu document_tags
+- lehký český stemming dotazu (ořez koncovek + prefixové vyhledávání)
+
+Obsah uložený v content_blobs (zakonyprolidi_storage) SQL trigger nepřečte,
+proto ho při zápisu do indexu doplní set_body() a rebuild_fulltext().
+
+Použití:
+    python zakonyprolidi_fulltext.py --rebuild
+    python zakonyprolidi_fulltext.py --search "zákoník práce"
+"""
+
+import json
+import re
+import sqlite3
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from zakonyprolidi_storage import fragment_text, get_text
+from zakonyprolidi_tags import document_tags, tag_filter_sql
+
+FTS_TABLE = "documents_fts"
+
+# Sloupce indexu: quote, title, body (text fragmentů)
+FTS_COLUMNS = ("quote", "title", "body")
+
+# Váhy BM25 pro sloupce (citace a název jsou důležitější než text)
+BM25_WEIGHTS = (5.0, 10.0, 1.0)
+
+# Pole, která může vrátit vyhledávání (projekce), a výchozí výběr
+SEARCH_FIELDS = ('doc_id', 'code', 'quote', 'title', 'year', 'doc_type', 'publish_date',
+                 'effect_from', 'effect_till', 'last_update', 'tags', 'snippet', 'rank')
+DEFAULT_FIELDS = ('doc_id', 'code', 'quote', 'title', 'year', 'tags', 'snippet', 'rank')
+
+# Pole pro fasety a filtry výsledků (filtr 'tags' navíc - dokument má všechny tagy)
+FACET_FIELDS = ('year', 'doc_type')
+
+# Pole vracená mimo tabulku documents
+_COMPUTED_FIELDS = ('doc_id', 'tags', 'snippet', 'rank')
+
+# Text fragmentů z content_json ({"Fragments": [{"Content": ...}, ...]})
+_BODY_SQL = """
+    CASE WHEN json_valid({col}) THEN (
+        SELECT group_concat(json_extract(value, '$.Content'), char(10))
+        FROM json_each({col}, '$.Fragments')
+        WHERE type = 'object'
+    ) END
+"""
+
+# Krátká slova, která ve fulltextu jen škodí
+STOPWORDS = {
+    'a', 'i', 'o', 'u', 'v', 've', 'z', 'ze', 's', 'se', 'si', 'k', 'ke',
+    'na', 'za', 'do', 'od', 'po', 'pro', 'pri', 'pod', 'nad', 'bez',
+    'je', 'jsou', 'byt', 'jak', 'jaka', 'jaky', 'jake', 'co', 'kdy', 'kde',
+    'ktery', 'ktera', 'ktere', 'podle', 'nebo', 'ale', 'aby', 'ani', 'to',
+}
+
+# Pádové a tvarové koncovky (bez diakritiky), od nejdelších
+CZECH_SUFFIXES = (
+    'ovych', 'ovymi', 'ami', 'emi', 'ymi', 'imi', 'ich', 'ych', 'ech',
+    'eho', 'emu', 'ovi', 'ove', 'ova', 'ovy', 'ym', 'im', 'em', 'om',
+    'am', 'ou', 'ho', 'mu', 'a', 'e', 'i', 'o', 'u', 'y',
+)
+
+# Minimální délka kmene po ořezu koncovky
+MIN_STEM = 4
+
+_ensured = set()
+
+
+def fold_diacritics(text: str) -> str:
+    """Převede text na malá písmena bez diakritiky"""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def czech_stem(token: str) -> str:
+    """Odstraní nejdelší známou koncovku, pokud zůstane dost dlouhý kmen"""
+    for suffix in CZECH_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def build_match_query(text: str, match_all: bool = True) -> Optional[str]:
+    """Sestaví FTS5 MATCH výraz z uživatelského dotazu"""
+    tokens = re.findall(r'\w+', fold_diacritics(text))
+    terms = [t for t in tokens if t not in STOPWORDS and len(t) > 1] or tokens
+    if not terms:
+        return None
+
+    # Každý termín jako prefix kmene - "zákoníku" najde i "zákoník", "zákoníky"
+    parts = []
+    for term in dict.fromkeys(terms):
+        parts.append(f'"{czech_stem(term)}"*')
+
+    return (' AND ' if match_all else ' OR ').join(parts)
+
+
+def has_fts5(conn: sqlite3.Connection) -> bool:
+    """Zjistí, zda SQLite podporuje FTS5 a JSON funkce"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        conn.execute("SELECT json_valid('{}')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def init_fulltext(conn: sqlite3.Connection) -> bool:
+    """Vytvoří FTS5 tabulku a triggery, při prvním vytvoření naplní index
+
+    Vrací False, pokud SQLite FTS5 nepodporuje nebo chybí tabulka documents.
+    """
+    if not _table_exists(conn, 'documents') or not has_fts5(conn):
+        return False
+
+    created = not _table_exists(conn, FTS_TABLE)
+    cursor = conn.cursor()
+
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {', '.join(FTS_COLUMNS)},
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+
+    # Triggery se vždy vytvoří znovu, aby odpovídaly aktuální verzi kódu
+    for name in ('bi', 'ai', 'ad', 'au_title', 'au_content'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}")
+
+    # INSERT OR REPLACE maže starý řádek bez spuštění DELETE triggeru,
+    # proto se jeho záznam v indexu odstraní už před vložením
+    cursor.execute(f"""
+        CREATE TRIGGER {FTS_TABLE}_bi BEFORE INSERT ON documents BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid IN (
+                SELECT doc_id FROM documents
+                WHERE doc_id = new.doc_id
+                   OR (collection = new.collection AND code = new.code)
+            );
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON documents BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, quote, title, body)
+            VALUES (new.doc_id, new.quote, new.title,
+                    {_BODY_SQL.format(col='new.content_json')});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON documents BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.doc_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {FTS_TABLE}_au_title AFTER UPDATE OF quote, title ON documents BEGIN
+            UPDATE {FTS_TABLE} SET quote = new.quote, title = new.title
+            WHERE rowid = new.doc_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {FTS_TABLE}_au_content AFTER UPDATE OF content_json ON documents
+        WHEN new.content_json IS NOT NULL BEGIN
+            UPDATE {FTS_TABLE} SET body = {_BODY_SQL.format(col='new.content_json')}
+            WHERE rowid = new.doc_id;
+        END
+    """)
+
+    if created:
+        rebuild_fulltext(conn, commit=False)
+
+    conn.commit()
+    return True
+
+
+def rebuild_fulltext(conn: sqlite3.Connection, commit: bool = True) -> int:
+    """Znovu naplní celý index z tabulky documents v jednom průchodu"""
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    cursor.execute(f"""
+        INSERT INTO {FTS_TABLE}(rowid, quote, title, body)
+        SELECT doc_id, quote, title, {_BODY_SQL.format(col='content_json')}
+        FROM documents
+    """)
+    count = cursor.rowcount
+
+    # Obsah v blobech se dekomprimuje a doplní po jednom
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+    if 'content_json_ref' in columns:
+        rows = conn.execute(
+            "SELECT doc_id, content_json_ref FROM documents WHERE content_json_ref IS NOT NULL"
+        ).fetchall()
+        for doc_id, ref in rows:
+            set_body(conn, doc_id, _blob_fragment_text(conn, ref))
+
+    if commit:
+        conn.commit()
+    return count
+
+
+def _blob_fragment_text(conn: sqlite3.Connection, ref: str) -> Optional[str]:
+    text = get_text(conn, ref)
+    try:
+        return fragment_text(json.loads(text)) if text else None
+    except ValueError:
+        return None
+
+
+def set_body(conn: sqlite3.Connection, doc_id: int, body: Optional[str]):
+    """Nastaví text dokumentu v indexu (pro obsah uložený mimo content_json)"""
+    conn.execute(f"UPDATE {FTS_TABLE} SET body = ? WHERE rowid = ?", (body, doc_id))
+
+
+def ensure_fulltext(conn: sqlite3.Connection, db_path: str) -> bool:
+    """Inicializuje index jednou za běh procesu pro danou databázi"""
+    if db_path not in _ensured:
+        if not init_fulltext(conn):
+            return False
+        _ensured.add(db_path)
+    return True
+
+
+def filters_sql(filters: Optional[Dict], alias: str = 'd') -> Tuple[str, list]:
+    """Podmínky ' AND ...' pro filtry podle FACET_FIELDS a tagů (hodnota None = bez filtru)"""
+    clauses, params = [], []
+    for field in FACET_FIELDS:
+        value = (filters or {}).get(field)
+        if value is not None:
+            clauses.append(f" AND {alias}.{field} = ?")
+            params.append(value)
+    if (filters or {}).get('tags'):
+        clause, tag_params = tag_filter_sql(filters['tags'], alias=alias)
+        clauses.append(clause)
+        params += tag_params
+    return ''.join(clauses), params
+
+
+def attach_tags(conn: sqlite3.Connection, rows: List[Dict]) -> List[Dict]:
+    """Doplní k výsledkům seznam tagů (jeden dotaz na celou stránku)"""
+    tags = document_tags(conn, [row['doc_id'] for row in rows])
+    for row in rows:
+        row['tags'] = tags[row['doc_id']]
+    return rows
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int = 10,
+           match_all: bool = True, snippet_tokens: int = 24,
+           fields: Iterable[str] = DEFAULT_FIELDS, after: Tuple[float, int] = None,
+           filters: Dict = None) -> List[Dict]:
+    """Vyhledá dokumenty podle BM25, vrací vybraná pole a zvýrazněný úryvek
+
+    Výsledky jsou seřazené podle (rank, doc_id); další stránka začíná za
+    dvojicí `after` z posledního řádku předchozí (keyset), takže hluboké
+    stránky nepřeskakují OFFSET řádků. doc_id a rank jsou vždy ve výsledku.
+
+    Rank je vypočtený BM25, ne sloupec v indexu: každá stránka ho spočítá
+    pro všechny shody (cena O(shod) i pro hluboké stránky). BM25 závisí na
+    statistikách korpusu, po změně dokumentů mezi stránkami se proto
+    výsledky mohou přeskočit nebo opakovat.
+    """
+    match = build_match_query(query, match_all=match_all)
+    if not match:
+        return []
+
+    fields = [f for f in fields if f in SEARCH_FIELDS]
+    columns = ''.join(f", d.{f}" for f in fields if f not in _COMPUTED_FIELDS)
+    if 'snippet' in fields:
+        columns += f", snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', ?) AS snippet"
+        params = [snippet_tokens, match]
+    else:
+        params = [match]
+
+    # Výraz místo aliasu - ve WHERE by "rank" byl skrytý sloupec FTS5 tabulky
+    rank = f"bm25({FTS_TABLE}, {', '.join(str(w) for w in BM25_WEIGHTS)})"
+
+    where, filter_params = filters_sql(filters)
+    params += filter_params
+    if after is not None:
+        where += f" AND ({rank} > ? OR ({rank} = ? AND d.doc_id > ?))"
+        params += [after[0], after[0], after[1]]
+
+    cursor = conn.execute(f"""
+        SELECT d.doc_id, {rank} AS rank{columns}
+        FROM {FTS_TABLE}
+        JOIN documents d ON d.doc_id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH ?{where}
+        ORDER BY rank, d.doc_id
+        LIMIT ?
+    """, params + [limit])
+
+    rows = [dict(row) for row in cursor.fetchall()]
+    return attach_tags(conn, rows) if 'tags' in fields else rows
+
+
+def facets(conn: sqlite3.Connection, query: str, match_all: bool = True,
+           filters: Dict = None, limit: int = 20) -> Dict[str, List[Dict]]:
+    """Počty výsledků dotazu podle roku a typu dokumentu (nejčastější hodnoty)"""
+    match = build_match_query(query, match_all=match_all)
+    if not match:
+        return {field: [] for field in FACET_FIELDS}
+
+    where, params = filters_sql(filters)
+    result = {}
+    for field in FACET_FIELDS:
+        rows = conn.execute(f"""
+            SELECT d.{field}, COUNT(*) AS count
+            FROM {FTS_TABLE}
+            JOIN documents d ON d.doc_id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH ?{where}
+            GROUP BY d.{field}
+            ORDER BY count DESC, d.{field}
+            LIMIT ?
+        """, [match, *params, limit]).fetchall()
+        result[field] = [{'value': row[0], 'count': row[1]} for row in rows]
+    return result
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fulltextový index Zákonů pro lidi')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--rebuild', action='store_true', help='Znovu sestavit index')
+    parser.add_argument('--search', help='Vyhledat dotaz')
+    parser.add_argument('--limit', type=int, default=10, help='Počet výsledků')
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+
+    try:
+        if not init_fulltext(conn):
+            print("❌ FTS5 není k dispozici nebo chybí tabulka documents")
+            return
+
+        if args.rebuild:
+            count = rebuild_fulltext(conn)
+            print(f"✅ Index přestavěn ({count} dokumentů)")
+
+        if args.search:
+            for row in search(conn, args.search, limit=args.limit):
+                print(f"{row['quote'] or '':15} | {row['rank']:8.2f} | {(row['title'] or '')[:70]}")
+                print(f"{'':15} | {row['snippet']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Extrakce dat z HTML stránek
+==============================================
+
+Scraper z každé stránky potřebuje jen pár věcí: <title>, obsah div.Paper
+a odkazy. Místo stavby celého BeautifulSoup stromu:
+
+- backend "lxml": HTMLPullParser krmený po částech, uzly mimo div.Paper
+  se po zpracování hned uvolní (paměť neroste s velikostí stránky)
+- backend "bs4": původní BeautifulSoup + html.parser (bez lxml)
+
+Obě implementace vrací stejný slovník, volba je jen otázkou rychlosti.
+
+Použití:
+    python zakonyprolidi_html.py --benchmark stranky/*.html
+    python zakonyprolidi_html.py --benchmark stranky/*.html --repeat 20 --json bench.json
+
+Vzorovou stránku lze uložit např.:
+    curl -o stranky/2006-262.html https://www.zakonyprolidi.cz/cs/2006-262
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+BACKENDS = ('lxml', 'bs4')
+
+# Velikost části textu předávané pull parseru
+FEED_CHUNK = 64 * 1024
+
+# Text těchto elementů get_text() v bs4 vynechává
+SKIP_TEXT_TAGS = {'script', 'style'}
+
+
+def default_backend() -> str:
+    """Nejrychlejší dostupný backend"""
+    return 'lxml' if HAS_LXML else 'bs4'
+
+
+def _has_class(value: Optional[str], name: str) -> bool:
+    return bool(value) and name in value.split()
+
+
+def _empty_page() -> Dict:
+    return {'title': "", 'content': "", 'html': "", 'links': []}
+
+
+def _text_parts(element, parts: List[str]):
+    """Textové uzly podstromu v pořadí dokumentu (bez komentářů a skriptů)"""
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in SKIP_TEXT_TAGS:
+            if child.text:
+                parts.append(child.text)
+            _text_parts(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+
+
+def _extract_bs4(html: str, want_links: bool) -> Dict:
+    """Extrakce přes celý BeautifulSoup strom"""
+    soup = BeautifulSoup(html, 'html.parser')
+    page = _empty_page()
+
+    title = soup.find('title')
+    page['title'] = title.text if title else ""
+
+    content = soup.find('div', class_='Paper')
+    if content:
+        page['content'] = content.get_text(strip=True)
+        page['html'] = str(content)
+
+    if want_links:
+        page['links'] = [a['href'] for a in soup.find_all('a', href=True)]
+    return page
+
+
+def _extract_lxml(html: str, want_links: bool) -> Dict:
+    """Inkrementální extrakce - drží se jen podstrom div.Paper"""
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    page = _empty_page()
+    title = None
+    paper = None
+    in_paper = False
+
+    for start in range(0, len(html), FEED_CHUNK):
+        parser.feed(html[start:start + FEED_CHUNK])
+
+        for event, element in parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else None
+
+            if event == 'start':
+                if paper is None and tag == 'div' and _has_class(element.get('class'), 'Paper'):
+                    paper = element
+                    in_paper = True
+                continue
+
+            if want_links and tag == 'a':
+                href = element.get('href')
+                if href is not None:
+                    page['links'].append(href)
+
+            if tag == 'title' and title is None:
+                title = ''.join(element.itertext())
+
+            if element is paper:
+                # Odpojený podstrom přežije úklid předků
+                in_paper = False
+                parent = paper.getparent()
+                if parent is not None:
+                    parent.remove(paper)
+            elif not in_paper:
+                # Hotový uzel mimo Paper už nebude potřeba
+                element.clear()
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+
+    parser.close()
+
+    page['title'] = title or ""
+    if paper is not None:
+        parts = [paper.text] if paper.text else []
+        _text_parts(paper, parts)
+        page['content'] = ''.join(text.strip() for text in parts)
+        page['html'] = etree.tostring(paper, encoding='unicode', method='html', with_tail=False)
+    return page
+
+
+def extract_page(html: str, want_links: bool = True, backend: str = None) -> Dict:
+    """Vrátí {'title', 'content', 'html', 'links'} ze stránky"""
+    backend = backend or default_backend()
+    if backend == 'lxml':
+        if not HAS_LXML:
+            raise RuntimeError("Backend lxml vyžaduje: pip install lxml")
+        return _extract_lxml(html, want_links)
+    if backend == 'bs4':
+        return _extract_bs4(html, want_links)
+    raise ValueError(f"Neznámý HTML backend: {backend}")
+
+
+def extract_links(html: str, backend: str = None) -> List[str]:
+    """Vrátí href všech odkazů na stránce"""
+    return extract_page(html, want_links=True, backend=backend)['links']
+
+
+def _measure(backend: str, path: str, repeat: int) -> Dict:
+    """Změří čas a paměť jednoho backendu nad jedním souborem (v čistém procesu)"""
+    import resource
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        html = f.read()
+
+    # Paměť se měří jako první - ru_maxrss je maximum za celý život procesu.
+    # tracemalloc vidí jen alokace Pythonu, RSS zachytí i paměť libxml2
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    extract_page(html, backend=backend)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        extract_page(html, backend=backend)
+        times.append(time.perf_counter() - started)
+
+    return {
+        'backend': backend,
+        'file': path,
+        'bytes': len(html.encode('utf-8')),
+        'median_ms': statistics.median(times) * 1000,
+        'min_ms': min(times) * 1000,
+        'py_peak_kb': py_peak / 1024,
+        'rss_growth_kb': max(0, rss_after - rss_before),
+    }
+
+
+def run_benchmark(paths: List[str], repeat: int = 10, backends: List[str] = None) -> List[Dict]:
+    """Porovná backendy na uložených stránkách, každé měření v samostatném procesu"""
+    backends = backends or [b for b in BACKENDS if b != 'lxml' or HAS_LXML]
+    results = []
+
+    for path in paths:
+        for backend in backends:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--_measure', backend, path,
+                 '--repeat', str(repeat)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(output))
+
+    return results
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Extrakce dat z HTML stránek Zákonů pro lidi')
+    parser.add_argument('--benchmark', nargs='+', metavar='SOUBOR', help='Porovnat backendy na uložených stránkách')
+    parser.add_argument('--repeat', type=int, default=10, help='Počet opakování parsování')
+    parser.add_argument('--backend', choices=BACKENDS, action='append', help='Měřit jen vybraný backend')
+    parser.add_argument('--json', help='Uložit výsledky do JSON souboru')
+    parser.add_argument('--_measure', nargs=2, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args._measure:
+        print(json.dumps(_measure(args._measure[0], args._measure[1], args.repeat)))
+        return
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    results = run_benchmark(args.benchmark, repeat=args.repeat, backends=args.backend)
+
+    print(f"{'Soubor':30} | {'Backend':7} | {'KB':>7} | {'Medián ms':>9} | {'Py peak KB':>10} | {'RSS +KB':>8}")
+    print("-" * 88)
+    for r in results:
+        print(f"{os.path.basename(r['file'])[:30]:30} | {r['backend']:7} | {r['bytes'] / 1024:7.0f} | "
+              f"{r['median_ms']:9.2f} | {r['py_peak_kb']:10.0f} | {r['rss_growth_kb']:8.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Výsledky uloženy: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
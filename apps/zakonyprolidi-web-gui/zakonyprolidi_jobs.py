@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Fronta stahování
+===================================
+
+Perzistentní fronta úloh stahování v SQLite (download_queue.db):
+- jedna úloha = jeden dokument (stav pending/running/done/failed/cancelled,
+  počet pokusů, chyba, časy stupňů pipeline)
+- dávky (download_batches) jen odkazují na úlohy - dokument zadaný více
+  dávkami se stahuje jednou, souběžné dávky se nepřekážejí
+- po pádu procesu se rozpracované úlohy vrátí do fronty (recover)
+- neúspěšná úloha se opakuje, dokud nevyčerpá max_attempts
+- změny (převzetí a výsledek úlohy, nová dávka) se publikují do
+  ProgressEvents, odkud je web posílá klientům jako Server-Sent Events
+
+Frontu zpracovává DownloadManager ve webu; tady je jen stav.
+
+Použití:
+    python zakonyprolidi_jobs.py --status
+    python zakonyprolidi_jobs.py --retry-failed
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Sloupce dokumentu, které potřebuje zpracování (ne celý řádek s obsahem)
+TASK_DOC_FIELDS = ('doc_id', 'code', 'title', 'quote', 'doc_type', 'year', 'publish_date')
+
+
+class ProgressEvents:
+    """Posledních `size` událostí fronty s pořadovým číslem pro push klienty
+
+    Klient si pamatuje číslo poslední události a čeká na další (wait);
+    pokud mu mezitím události vypadly z bufferu, potřebuje nový snapshot.
+    """
+
+    def __init__(self, size: int = 1000):
+        self.events = deque(maxlen=size)
+        self.last_id = 0
+        self.epoch = int(time.time())
+        self.changed = threading.Condition()
+
+    def publish(self, kind: str, data: Dict):
+        with self.changed:
+            self.last_id += 1
+            self.events.append((self.last_id, kind, data))
+            self.changed.notify_all()
+
+    def _since(self, event_id: int) -> Optional[List[tuple]]:
+        if event_id > self.last_id:
+            return None
+        if self.events and event_id < self.events[0][0] - 1:
+            return None
+        return [event for event in self.events if event[0] > event_id]
+
+    def since(self, event_id: int) -> Optional[List[tuple]]:
+        """Události po event_id, None pokud už nejsou v bufferu"""
+        with self.changed:
+            return self._since(event_id)
+
+    def wait(self, event_id: int, timeout: float = None) -> Optional[List[tuple]]:
+        """Počká na události po event_id (prázdný seznam po timeoutu)"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.last_id != event_id, timeout)
+            return self._since(event_id)
+
+
+class DownloadQueue:
+    """SQLite fronta úloh stahování po dokumentech"""
+
+    def __init__(self, path: str = "download_queue.db", max_attempts: int = 3,
+                 events: ProgressEvents = None):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.events = events or ProgressEvents()
+
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS download_tasks (
+                doc_code TEXT PRIMARY KEY,
+                doc TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                pdf_path TEXT,
+                timings TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_download_tasks_status ON download_tasks(status, created_at);
+
+            CREATE TABLE IF NOT EXISTS download_batches (
+                batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                criteria TEXT,
+                status TEXT NOT NULL DEFAULT 'active',
+                created_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_download_batches_status ON download_batches(status);
+
+            CREATE TABLE IF NOT EXISTS download_batch_tasks (
+                batch_id INTEGER,
+                doc_code TEXT,
+                PRIMARY KEY (batch_id, doc_code)
+            );
+            CREATE INDEX IF NOT EXISTS idx_download_batch_tasks_code ON download_batch_tasks(doc_code);
+        """)
+        self.conn.commit()
+
+    # --- Zadávání ---
+
+    def submit(self, docs: Iterable[Dict], criteria: Dict = None) -> Dict:
+        """Založí dávku, vrací {batch_id, queued, duplicates}
+
+        Dokument, který už ve frontě čeká nebo běží, se znovu nezařadí;
+        hotový zůstane hotový, neúspěšný nebo zrušený se zkusí znovu.
+        """
+        now = time.time()
+        queued = duplicates = 0
+
+        with self.changed:
+            batch_id = self.conn.execute(
+                "INSERT INTO download_batches (criteria, created_at) VALUES (?, ?)",
+                (json.dumps(criteria or {}, ensure_ascii=False), now)
+            ).lastrowid
+
+            for doc in docs:
+                code = doc['code']
+                self.conn.execute("INSERT OR IGNORE INTO download_batch_tasks (batch_id, doc_code) VALUES (?, ?)",
+                                  (batch_id, code))
+                payload = json.dumps({k: doc.get(k) for k in TASK_DOC_FIELDS}, ensure_ascii=False)
+                row = self.conn.execute("SELECT status FROM download_tasks WHERE doc_code = ?",
+                                        (code,)).fetchone()
+
+                if row is None:
+                    self.conn.execute("""
+                        INSERT INTO download_tasks (doc_code, doc, status, created_at)
+                        VALUES (?, ?, 'pending', ?)
+                    """, (code, payload, now))
+                    queued += 1
+                elif row['status'] in ('failed', 'cancelled'):
+                    self.conn.execute("""
+                        UPDATE download_tasks
+                        SET doc = ?, status = 'pending', attempts = 0, error = NULL, created_at = ?
+                        WHERE doc_code = ?
+                    """, (payload, now, code))
+                    queued += 1
+                else:
+                    duplicates += 1
+
+            self._close_batches()
+            self.conn.commit()
+            self.changed.notify_all()
+
+        result = {'batch_id': batch_id, 'queued': queued, 'duplicates': duplicates}
+        self.events.publish('batch', result)
+        return result
+
+    def recover(self) -> int:
+        """Vrátí úlohy rozpracované při pádu procesu do fronty"""
+        with self.changed:
+            count = self.conn.execute(
+                "UPDATE download_tasks SET status = 'pending' WHERE status = 'running'"
+            ).rowcount
+            self.conn.commit()
+            self.changed.notify_all()
+        return count
+
+    def cancel(self) -> int:
+        """Zruší čekající úlohy (běžící doběhnou)"""
+        with self.changed:
+            count = self.conn.execute(
+                "UPDATE download_tasks SET status = 'cancelled', finished_at = ? WHERE status = 'pending'",
+                (time.time(),)
+            ).rowcount
+            self._close_batches()
+            self.conn.commit()
+            self.changed.notify_all()
+        self.events.publish('cancel', {'cancelled': count})
+        return count
+
+    def retry_failed(self) -> int:
+        """Vrátí neúspěšné úlohy do fronty"""
+        with self.changed:
+            count = self.conn.execute("""
+                UPDATE download_tasks SET status = 'pending', attempts = 0, error = NULL
+                WHERE status = 'failed'
+            """).rowcount
+            self.conn.execute("""
+                UPDATE download_batches SET status = 'active', finished_at = NULL
+                WHERE batch_id IN (SELECT bt.batch_id FROM download_batch_tasks bt
+                                   JOIN download_tasks t ON t.doc_code = bt.doc_code
+                                   WHERE t.status = 'pending')
+            """)
+            self.conn.commit()
+            self.changed.notify_all()
+        self.events.publish('retry', {'retried': count})
+        return count
+
+    # --- Zpracování ---
+
+    def claim(self) -> Optional[Dict]:
+        """Vezme nejstarší čekající úlohu a označí ji jako běžící"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT doc_code, doc FROM download_tasks WHERE status = 'pending' "
+                "ORDER BY created_at, doc_code LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("""
+                UPDATE download_tasks
+                SET status = 'running', attempts = attempts + 1, started_at = ?
+                WHERE doc_code = ?
+            """, (time.time(), row['doc_code']))
+            self.conn.commit()
+        self.events.publish('task', {'doc': row['doc_code'], 'status': 'running'})
+        return json.loads(row['doc'])
+
+    def iter_claims(self, should_stop, poll: float = 1.0) -> Iterator[Dict]:
+        """Nekonečně vydává úlohy z fronty (čeká na nové), dokud should_stop() nevrátí True"""
+        while not should_stop():
+            doc = self.claim()
+            if doc is not None:
+                yield doc
+                continue
+            with self.changed:
+                self.changed.wait(poll)
+
+    def wake(self):
+        """Probudí čekající iter_claims (např. při zastavení)"""
+        with self.changed:
+            self.changed.notify_all()
+
+    def finish(self, doc_code: str, pdf_path: str = None, timings: Dict = None,
+               error: str = None):
+        """Uloží výsledek úlohy; chybná úloha se zařadí na konec fronty, dokud nedojdou pokusy"""
+        now = time.time()
+        with self.changed:
+            if error is None:
+                self.conn.execute("""
+                    UPDATE download_tasks
+                    SET status = 'done', error = NULL, pdf_path = ?, timings = ?, finished_at = ?
+                    WHERE doc_code = ?
+                """, (pdf_path, json.dumps(timings or {}), now, doc_code))
+            else:
+                self.conn.execute("""
+                    UPDATE download_tasks
+                    SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                        error = ?, timings = ?, finished_at = ?, created_at = ?
+                    WHERE doc_code = ?
+                """, (self.max_attempts, error, json.dumps(timings or {}), now, now, doc_code))
+            self._close_batches()
+            self.conn.commit()
+            self.changed.notify_all()
+            row = self.conn.execute("SELECT status, attempts FROM download_tasks WHERE doc_code = ?",
+                                    (doc_code,)).fetchone()
+
+        # Výsledek i časy stupňů - klient si je přičte ke svému stavu
+        self.events.publish('task', {'doc': doc_code, 'status': row['status'] if row else None,
+                                     'attempts': row['attempts'] if row else None,
+                                     'error': error,
+                                     'timings': {k: round(v, 4) for k, v in (timings or {}).items()}})
+
+    def release(self, doc_code: str):
+        """Vrátí běžící úlohu do fronty (přerušená zastavením, pokus se nepočítá)"""
+        with self.changed:
+            self.conn.execute("""
+                UPDATE download_tasks SET status = 'pending', attempts = MAX(attempts - 1, 0)
+                WHERE doc_code = ? AND status = 'running'
+            """, (doc_code,))
+            self.conn.commit()
+            self.changed.notify_all()
+        self.events.publish('task', {'doc': doc_code, 'status': 'pending'})
+
+    def _close_batches(self):
+        """Označí dávky bez čekajících a běžících úloh jako hotové (volat pod zámkem)"""
+        self.conn.execute("""
+            UPDATE download_batches SET status = 'done', finished_at = ?
+            WHERE status = 'active' AND NOT EXISTS (
+                SELECT 1 FROM download_batch_tasks bt
+                JOIN download_tasks t ON t.doc_code = bt.doc_code
+                WHERE bt.batch_id = download_batches.batch_id AND t.status IN ('pending', 'running')
+            )
+        """, (time.time(),))
+
+    # --- Stav ---
+
+    def _scope(self, batch_id: int = None) -> List[int]:
+        """Sledované dávky: zadaná, jinak aktivní, jinak poslední (volat pod zámkem)"""
+        if batch_id is not None:
+            return [batch_id]
+        batches = [r[0] for r in self.conn.execute(
+            "SELECT batch_id FROM download_batches WHERE status = 'active' ORDER BY batch_id"
+        )]
+        if not batches:
+            last = self.conn.execute("SELECT MAX(batch_id) FROM download_batches").fetchone()[0]
+            batches = [last] if last is not None else []
+        return batches
+
+    def progress(self, batch_id: int = None) -> Dict:
+        """Jen počty a aktuální dokument (bez chyb a časů) - levné volání po každé události"""
+        counts = {s: 0 for s in ('pending', 'running', 'done', 'failed', 'cancelled')}
+        current = None
+        with self.lock:
+            batches = self._scope(batch_id)
+            if batches:
+                scope = f"doc_code IN (SELECT doc_code FROM download_batch_tasks WHERE batch_id IN " \
+                        f"({','.join('?' * len(batches))}))"
+                counts.update(self.conn.execute(
+                    f"SELECT status, COUNT(*) FROM download_tasks WHERE {scope} GROUP BY status", batches
+                ).fetchall())
+                current = self.conn.execute(
+                    f"SELECT doc_code FROM download_tasks WHERE status = 'running' AND {scope} "
+                    f"ORDER BY started_at DESC LIMIT 1", batches
+                ).fetchone()
+
+        return {
+            'is_running': bool(counts['pending'] or counts['running']),
+            'current_doc': current[0] if current else None,
+            'total': sum(counts.values()),
+            'completed': counts['done'],
+            'tasks': counts,
+            'batches': batches,
+        }
+
+    def status(self, batch_id: int = None, max_errors: int = 50) -> Dict:
+        """Stav aktivních dávek (nebo zadané či poslední dávky) pro /api/download/status"""
+        with self.lock:
+            batches = self._scope(batch_id)
+
+            marks = ','.join('?' * len(batches))
+            rows = self.conn.execute(f"""
+                SELECT t.doc_code, t.status, t.attempts, t.error, t.timings, t.started_at
+                FROM download_tasks t
+                WHERE t.doc_code IN (SELECT doc_code FROM download_batch_tasks WHERE batch_id IN ({marks}))
+            """, batches).fetchall() if batches else []
+
+            queue = dict(self.conn.execute(
+                "SELECT status, COUNT(*) FROM download_tasks GROUP BY status"
+            ).fetchall())
+
+        counts = {s: 0 for s in ('pending', 'running', 'done', 'failed', 'cancelled')}
+        timings = {}
+        errors = []
+        current = None
+        for row in rows:
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+            for stage, seconds in json.loads(row['timings'] or '{}').items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+            if row['error'] and len(errors) < max_errors:
+                prefix = '' if row['status'] == 'failed' else f"(pokus {row['attempts']}) "
+                errors.append(f"{prefix}{row['doc_code']}: {row['error']}")
+            if row['status'] == 'running' and (current is None or row['started_at'] > current[1]):
+                current = (row['doc_code'], row['started_at'])
+
+        return {
+            'is_running': bool(counts['pending'] or counts['running']),
+            'current_doc': current[0] if current else None,
+            'total': len(rows),
+            'completed': counts['done'],
+            'tasks': counts,
+            'errors': errors,
+            'timings': timings,
+            'batches': batches,
+            'queue': queue,
+        }
+
+    def tasks(self, status: str = None, limit: int = 100) -> List[Dict]:
+        """Seznam úloh (volitelně podle stavu)"""
+        query = "SELECT doc_code, status, attempts, error, pdf_path, finished_at FROM download_tasks"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+
+    def close(self):
+        """Zavře databázi fronty"""
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fronta stahování dokumentů')
+    parser.add_argument('--queue', default='download_queue.db', help='Soubor fronty')
+    parser.add_argument('--status', action='store_true', help='Zobrazit stav fronty')
+    parser.add_argument('--failed', action='store_true', help='Vypsat neúspěšné úlohy')
+    parser.add_argument('--retry-failed', action='store_true', help='Vrátit neúspěšné úlohy do fronty')
+    parser.add_argument('--cancel', action='store_true', help='Zrušit čekající úlohy')
+
+    args = parser.parse_args()
+
+    jobs = DownloadQueue(args.queue)
+    try:
+        if args.retry_failed:
+            print(f"🔁 Do fronty vráceno: {jobs.retry_failed()}")
+        if args.cancel:
+            print(f"🛑 Zrušeno: {jobs.cancel()}")
+        if args.failed:
+            for task in jobs.tasks('failed'):
+                print(f"❌ {task['doc_code']} ({task['attempts']}×): {task['error']}")
+
+        status = jobs.status()
+        print(f"📋 Fronta: {status['queue']}")
+        if status['batches']:
+            print(f"📦 Dávky {status['batches']}: {status['completed']} / {status['total']} hotovo, "
+                  f"{status['tasks']['failed']} chyb")
+    finally:
+        jobs.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Paralelní OCR
+================================
+
+OCR běží mimo stahování v pozadí:
+- práce se dělí po stránkách, stránky zpracovává pool procesů (všechna jádra)
+- každý worker rasterizuje jen svou stránku (first_page/last_page),
+  v paměti nikdy nejsou obrázky celého PDF
+- fronta úloh je v SQLite (ocr_queue.db) - po restartu se nedokončené
+  úlohy převezmou a hotové stránky se znovu nepočítají
+- text stránky se ukládá pod hashem jejího obrázku, stejná stránka
+  (jiné PDF, opakovaný běh) se podruhé neOCRuje
+
+Použití:
+    python zakonyprolidi_ocr.py pdfs/2012-89.pdf pdfs/2006-262.pdf --workers 4
+    python zakonyprolidi_ocr.py --resume        # dokončí úlohy z fronty
+    python zakonyprolidi_ocr.py --status
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    HAS_OCR = True
+except ImportError:
+    HAS_OCR = False
+
+DEFAULT_DPI = 300
+DEFAULT_LANG = 'ces+eng'
+
+# Spojení workeru na cache stránek (jedno na proces)
+_worker_conn = None
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 obsahu souboru"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def page_hash(image, dpi: int, lang: str) -> str:
+    """Klíč cache stránky - obsah obrázku + parametry OCR"""
+    digest = hashlib.sha256(f"{lang}:{dpi}:{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def _init_worker():
+    # Tesseract jinak spouští vlastní vlákna na každé stránce a procesy
+    # poolu by si jádra přetahovaly
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+
+def _cached_text(queue_path: str, digest: str) -> Optional[str]:
+    global _worker_conn
+    if _worker_conn is None:
+        _worker_conn = sqlite3.connect(queue_path, timeout=30)
+        _worker_conn.execute("PRAGMA query_only=ON")
+    row = _worker_conn.execute(
+        "SELECT text FROM ocr_page_cache WHERE page_hash = ?", (digest,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def ocr_page(queue_path: str, pdf_path: str, page: int, dpi: int, lang: str) -> tuple:
+    """OCR jedné stránky (běží v procesu poolu), vrací (hash, text, z_cache, sekundy)"""
+    started = time.perf_counter()
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page)[0]
+    try:
+        digest = page_hash(image, dpi, lang)
+        text = _cached_text(queue_path, digest)
+        if text is not None:
+            return digest, text, True, time.perf_counter() - started
+        text = pytesseract.image_to_string(image, lang=lang)
+        return digest, text, False, time.perf_counter() - started
+    finally:
+        image.close()
+
+
+class OCRService:
+    """Perzistentní fronta OCR úloh zpracovávaná poolem procesů po stránkách"""
+
+    def __init__(self, queue_path: str = "ocr_queue.db", output_dir: str = "ocr_texts",
+                 workers: int = None, dpi: int = DEFAULT_DPI, lang: str = DEFAULT_LANG,
+                 on_complete: Callable[[Dict], None] = None):
+        self.queue_path = queue_path
+        self.output_dir = output_dir
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.dpi = dpi
+        self.lang = lang
+        # Volá se z dispatcheru po zapsání textu úlohy (např. evidence v artifacts)
+        self.on_complete = on_complete
+        self.stats = {'pages': 0, 'cache_hits': 0, 'seconds': 0.0}
+
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = None
+        self.executor = None
+
+        self.conn = sqlite3.connect(queue_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pdf_path TEXT NOT NULL,
+                pdf_hash TEXT NOT NULL,
+                pages INTEGER,
+                status TEXT NOT NULL DEFAULT 'pending',
+                output_path TEXT,
+                doc_code TEXT,
+                error TEXT,
+                seconds REAL DEFAULT 0,
+                created_at REAL,
+                updated_at REAL
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(ocr_jobs)")}
+        if 'seconds' not in columns:
+            self.conn.execute("ALTER TABLE ocr_jobs ADD COLUMN seconds REAL DEFAULT 0")
+        if 'doc_code' not in columns:
+            self.conn.execute("ALTER TABLE ocr_jobs ADD COLUMN doc_code TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs(status, job_id)")
+        self.conn.execute("DROP INDEX IF EXISTS idx_ocr_jobs_hash")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_jobs_target ON ocr_jobs(pdf_hash, output_path)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_job_pages (
+                job_id INTEGER,
+                page INTEGER,
+                page_hash TEXT,
+                PRIMARY KEY (job_id, page)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_page_cache (
+                page_hash TEXT PRIMARY KEY,
+                text TEXT,
+                created_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    # --- Fronta ---
+
+    def submit(self, pdf_path: str, output_path: str = None, doc_code: str = None) -> int:
+        """Zařadí PDF do fronty, vrací job_id
+
+        Stejné PDF se stejným výstupním souborem se nezařadí dvakrát. Jiný výstup
+        je nová úloha - stránky už zpracované jinou úlohou vezme z cache.
+        doc_code se uloží s úlohou a dostane ho on_complete.
+        """
+        if not HAS_OCR:
+            raise RuntimeError("OCR vyžaduje: pip install pytesseract pdf2image")
+        digest = file_hash(pdf_path)
+        output_path = output_path or os.path.join(self.output_dir, Path(pdf_path).stem + '.txt')
+        now = time.time()
+
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT job_id, status FROM ocr_jobs
+                WHERE pdf_hash = ? AND output_path = ? AND status != 'error'
+                ORDER BY status = 'done' DESC, job_id DESC LIMIT 1
+            """, (digest, output_path)).fetchone()
+
+            if row and (row['status'] != 'done' or os.path.exists(output_path)):
+                return row['job_id']
+
+            cursor = self.conn.execute("""
+                INSERT INTO ocr_jobs (pdf_path, pdf_hash, status, output_path, doc_code, created_at, updated_at)
+                VALUES (?, ?, 'pending', ?, ?, ?, ?)
+            """, (pdf_path, digest, output_path, doc_code, now, now))
+            self.conn.commit()
+            job_id = cursor.lastrowid
+
+        self.start()
+        self.wakeup.set()
+        return job_id
+
+    def job(self, job_id: int) -> Optional[Dict]:
+        """Stav úlohy"""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM ocr_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def wait(self, job_id: int, timeout: float = None) -> Optional[Dict]:
+        """Počká na dokončení úlohy (done/error), vrací její stav"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.changed:
+            while True:
+                row = self.conn.execute("SELECT * FROM ocr_jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is None or row['status'] in ('done', 'error'):
+                    return dict(row) if row else None
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return dict(row)
+                self.changed.wait(remaining)
+
+    def ocr(self, pdf_path: str, timeout: float = None) -> str:
+        """Synchronní OCR jednoho PDF, vrací cestu k textu"""
+        job = self.wait(self.submit(pdf_path), timeout)
+        if job['status'] == 'error':
+            raise RuntimeError(job['error'])
+        if job['status'] != 'done':
+            raise TimeoutError(f"OCR {pdf_path} nedokončeno")
+        return job['output_path']
+
+    def status(self) -> Dict:
+        """Počty úloh podle stavu a statistika stránek"""
+        with self.lock:
+            counts = dict(self.conn.execute(
+                "SELECT status, COUNT(*) FROM ocr_jobs GROUP BY status"
+            ).fetchall())
+            cached = self.conn.execute("SELECT COUNT(*) FROM ocr_page_cache").fetchone()[0]
+        return {'jobs': counts, 'cached_pages': cached, 'workers': self.workers, **self.stats}
+
+    # --- Zpracování ---
+
+    def start(self):
+        """Spustí dispatcher a pool procesů (pokud ještě neběží)
+
+        Frontu má zpracovávat jen jeden proces (web nebo CLI).
+        """
+        if not HAS_OCR:
+            raise RuntimeError("OCR vyžaduje: pip install pytesseract pdf2image")
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stopping = False
+
+            # Úlohy rozpracované při pádu procesu se zpracují znovu (hotové
+            # stránky zůstaly v ocr_job_pages). Až tady, ne v __init__ - procesy
+            # poolu při spawn znovu importují hlavní modul.
+            self.conn.execute("UPDATE ocr_jobs SET status = 'pending' WHERE status = 'running'")
+            self.conn.commit()
+
+            # spawn - fork procesu s běžícími vlákny (Flask, stahování) není bezpečný
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=_init_worker)
+            self.thread = threading.Thread(target=self._dispatch, name="ocr-dispatcher", daemon=True)
+            self.thread.start()
+
+    def close(self, wait_for_jobs: bool = False):
+        """Zastaví zpracování (nedokončené úlohy zůstanou ve frontě)"""
+        if wait_for_jobs:
+            self.drain()
+        with self.lock:
+            thread, self.stopping = self.thread, True
+        self.wakeup.set()
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+            self.thread = None
+            self.conn.close()
+
+    def drain(self, timeout: float = None):
+        """Počká, až ve frontě nebudou žádné čekající ani běžící úlohy"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.changed:
+            while self.conn.execute(
+                "SELECT 1 FROM ocr_jobs WHERE status IN ('pending', 'running') LIMIT 1"
+            ).fetchone():
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return
+                self.changed.wait(remaining)
+
+    def _claim_job(self) -> Optional[Dict]:
+        """Vezme další čekající úlohu, vrací ji se seznamem zbývajících stránek"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM ocr_jobs WHERE status = 'pending' ORDER BY job_id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE ocr_jobs SET status = 'running', updated_at = ? WHERE job_id = ?",
+                              (time.time(), row['job_id']))
+            self.conn.commit()
+            done = {r[0] for r in self.conn.execute(
+                "SELECT page FROM ocr_job_pages WHERE job_id = ?", (row['job_id'],))}
+
+        job = dict(row)
+        try:
+            job['pages'] = int(pdfinfo_from_path(job['pdf_path'])['Pages'])
+        except Exception as e:
+            self._finish(job['job_id'], error=f"pdfinfo: {e}")
+            return None
+
+        with self.lock:
+            self.conn.execute("UPDATE ocr_jobs SET pages = ? WHERE job_id = ?", (job['pages'], job['job_id']))
+            self.conn.commit()
+        job['todo'] = [p for p in range(1, job['pages'] + 1) if p not in done]
+        job['remaining'] = len(job['todo'])
+        return job
+
+    def _dispatch(self):
+        """Plní pool stránkami úloh v pořadí fronty a ukládá výsledky"""
+        active = []        # úlohy, jejichž stránky se rozdělují
+        running = {}       # job_id -> úloha (rozdělená i čekající na stránky)
+        inflight = {}      # future -> (job_id, page)
+
+        while not self.stopping:
+            # Pool se drží plný - několik stránek na worker, ať nečeká na dispatcher
+            while len(inflight) < self.workers * 2:
+                if not active:
+                    job = self._claim_job()
+                    if job is None:
+                        break
+                    running[job['job_id']] = job
+                    if not job['todo']:
+                        self._complete(running.pop(job['job_id']))
+                        continue
+                    active.append(job)
+
+                job = active[0]
+                page = job['todo'].pop(0)
+                if not job['todo']:
+                    active.pop(0)
+                future = self.executor.submit(ocr_page, self.queue_path, job['pdf_path'], page,
+                                              self.dpi, self.lang)
+                inflight[future] = (job['job_id'], page)
+
+            if not inflight:
+                self.wakeup.wait(1.0)
+                self.wakeup.clear()
+                continue
+
+            finished, _ = wait(list(inflight), timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job_id, page = inflight.pop(future)
+                job = running.get(job_id)
+                if job is None:
+                    continue  # úloha už skončila chybou
+
+                try:
+                    digest, text, from_cache, seconds = future.result()
+                except Exception as e:
+                    running.pop(job_id)
+                    if job in active:
+                        active.remove(job)
+                    self._finish(job_id, error=f"stránka {page}: {e}")
+                    continue
+
+                self._store_page(job_id, page, digest, text, from_cache, seconds)
+                job['remaining'] -= 1
+                if job['remaining'] == 0:
+                    self._complete(running.pop(job_id))
+
+    def _store_page(self, job_id: int, page: int, digest: str, text: str,
+                    from_cache: bool, seconds: float):
+        with self.lock:
+            if not from_cache:
+                self.conn.execute("""
+                    INSERT OR IGNORE INTO ocr_page_cache (page_hash, text, created_at)
+                    VALUES (?, ?, ?)
+                """, (digest, text, time.time()))
+            self.conn.execute("INSERT OR REPLACE INTO ocr_job_pages (job_id, page, page_hash) VALUES (?, ?, ?)",
+                              (job_id, page, digest))
+            self.conn.execute("UPDATE ocr_jobs SET seconds = seconds + ? WHERE job_id = ?",
+                              (seconds, job_id))
+            self.conn.commit()
+            self.stats['pages'] += 1
+            self.stats['cache_hits'] += int(from_cache)
+            self.stats['seconds'] += seconds
+
+    def _complete(self, job: Dict):
+        """Složí text stránek v pořadí a uloží ho do output_dir"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT p.page, c.text FROM ocr_job_pages p
+                JOIN ocr_page_cache c ON c.page_hash = p.page_hash
+                WHERE p.job_id = ? ORDER BY p.page
+            """, (job['job_id'],)).fetchall()
+
+        text = ""
+        for page, page_text in rows:
+            text += f"\n--- Stránka {page} ---\n"
+            text += page_text or ""
+
+        try:
+            Path(job['output_path']).parent.mkdir(parents=True, exist_ok=True)
+            with open(job['output_path'], 'w', encoding='utf-8') as f:
+                f.write(text)
+        except OSError as e:
+            self._finish(job['job_id'], error=str(e))
+            return
+        self._finish(job['job_id'])
+
+        if self.on_complete:
+            try:
+                self.on_complete(job)
+            except Exception as e:
+                print(f"❌ OCR úloha {job['job_id']}: zpracování výsledku selhalo: {e}")
+
+    def _finish(self, job_id: int, error: str = None):
+        with self.changed:
+            self.conn.execute("""
+                UPDATE ocr_jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?
+            """, ('error' if error else 'done', error, time.time(), job_id))
+            self.conn.commit()
+            self.changed.notify_all()
+        if error:
+            print(f"❌ OCR úloha {job_id}: {error}")
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Paralelní OCR PDF dokumentů')
+    parser.add_argument('pdfs', nargs='*', help='PDF soubory k OCR')
+    parser.add_argument('--queue', default='ocr_queue.db', help='Soubor fronty a cache stránek')
+    parser.add_argument('--output-dir', default='ocr_texts', help='Adresář pro výsledné texty')
+    parser.add_argument('--workers', type=int, help='Počet procesů (výchozí = počet jader)')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help='Rozlišení rasterizace')
+    parser.add_argument('--lang', default=DEFAULT_LANG, help='Jazyky tesseractu')
+    parser.add_argument('--resume', action='store_true', help='Dokončit čekající úlohy z fronty')
+    parser.add_argument('--status', action='store_true', help='Zobrazit stav fronty')
+
+    args = parser.parse_args()
+
+    service = OCRService(args.queue, output_dir=args.output_dir, workers=args.workers,
+                         dpi=args.dpi, lang=args.lang)
+
+    try:
+        if args.pdfs or args.resume:
+            started = time.perf_counter()
+            for pdf in args.pdfs:
+                print(f"📄 Zařazeno: {pdf} (úloha {service.submit(pdf)})")
+            service.start()
+            service.drain()
+            stats = service.status()
+            print(f"✅ Hotovo za {time.perf_counter() - started:.1f}s: {stats['pages']} stránek, "
+                  f"z cache {stats['cache_hits']}, {service.workers} procesů")
+
+        if args.status or not (args.pdfs or args.resume):
+            stats = service.status()
+            print(f"📊 Úlohy: {stats['jobs']}, stránek v cache: {stats['cached_pages']}")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Generování PDF
+=================================
+
+Průchozí renderer obsahu div.Paper do PDF:
+- strom se prochází po blocích (odstavce, nadpisy, řádky tabulek),
+  nikdy se nestaví text celého dokumentu najednou
+- každý blok se hned zalomí na šířku stránky a vykreslí, plná stránka
+  se uzavře (showPage) - žádný limit počtu řádků ani délky řádku
+- Unicode TrueType font (DejaVu Sans) s českou diakritikou
+
+Použití:
+    python zakonyprolidi_pdf.py --benchmark stranky/*.html
+    python zakonyprolidi_pdf.py --benchmark          # syntetická stránka
+
+Vlastní font: ZAKONY_PDF_FONT=/cesta/k/fontu.ttf (tučný ZAKONY_PDF_FONT_BOLD).
+"""
+
+import os
+import time
+import tracemalloc
+from typing import Iterator, Tuple
+
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, PreformattedString, Tag
+
+try:
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.lib.utils import simpleSplit
+    HAS_PDF = True
+except ImportError:
+    HAS_PDF = False
+
+# Unicode fonty s českými znaky: (běžný, tučný)
+FONT_CANDIDATES = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/TTF/DejaVuSans.ttf', '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf'),
+    (os.path.expanduser('~/Library/Fonts/DejaVuSans.ttf'), os.path.expanduser('~/Library/Fonts/DejaVuSans-Bold.ttf')),
+    ('/Library/Fonts/DejaVuSans.ttf', '/Library/Fonts/DejaVuSans-Bold.ttf'),
+    ('/System/Library/Fonts/Supplemental/Arial.ttf', '/System/Library/Fonts/Supplemental/Arial Bold.ttf'),
+    ('C:/Windows/Fonts/DejaVuSans.ttf', 'C:/Windows/Fonts/DejaVuSans-Bold.ttf'),
+    ('C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+]
+
+# Elementy, které tvoří samostatný odstavec
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'blockquote', 'pre', 'ul', 'ol', 'li',
+    'table', 'thead', 'tbody', 'tr', 'dl', 'dt', 'dd',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+SKIP_TAGS = {'script', 'style', 'noscript'}
+
+MARGIN = 50
+FONT_SIZE = 10
+HEADING_SIZE = 12
+TITLE_SIZE = 16
+
+_fonts = None
+
+
+def register_fonts() -> Tuple[str, str]:
+    """Zaregistruje Unicode font, vrací jména (běžný, tučný)"""
+    global _fonts
+    if _fonts:
+        return _fonts
+
+    candidates = []
+    if os.getenv('ZAKONY_PDF_FONT'):
+        candidates.append((os.getenv('ZAKONY_PDF_FONT'),
+                           os.getenv('ZAKONY_PDF_FONT_BOLD') or os.getenv('ZAKONY_PDF_FONT')))
+    candidates.extend(FONT_CANDIDATES)
+
+    for regular, bold in candidates:
+        if not os.path.exists(regular):
+            continue
+        pdfmetrics.registerFont(TTFont('ZPL', regular))
+        pdfmetrics.registerFont(TTFont('ZPL-Bold', bold if os.path.exists(bold) else regular))
+        _fonts = ('ZPL', 'ZPL-Bold')
+        return _fonts
+
+    # Helvetica neumí č, ř, ů... - text se vykreslí, ale ne správně
+    print("⚠️  Unicode font nenalezen (nastav ZAKONY_PDF_FONT), použije se Helvetica")
+    _fonts = ('Helvetica', 'Helvetica-Bold')
+    return _fonts
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.split())
+
+
+def _has_blocks(tag: Tag) -> bool:
+    return tag.find(BLOCK_TAGS) is not None
+
+
+def iter_blocks(element: Tag) -> Iterator[Tuple[str, str]]:
+    """Projde strom po blocích, vrací (styl, text) - styl 'heading' nebo 'text'"""
+    inline = []
+
+    def flush():
+        text = _normalize(''.join(inline))
+        inline.clear()
+        return text
+
+    for child in element.children:
+        if isinstance(child, NavigableString):
+            if not isinstance(child, PreformattedString):
+                inline.append(str(child))
+            continue
+        if not isinstance(child, Tag) or child.name in SKIP_TAGS:
+            continue
+
+        if child.name == 'br':
+            text = flush()
+            if text:
+                yield 'text', text
+        elif child.name in BLOCK_TAGS:
+            text = flush()
+            if text:
+                yield 'text', text
+
+            if _has_blocks(child):
+                yield from iter_blocks(child)
+            else:
+                # Buňky řádku tabulky oddělí mezera
+                text = _normalize(child.get_text(' ' if child.name == 'tr' else ''))
+                if text:
+                    yield ('heading' if child.name in HEADING_TAGS else 'text'), text
+        else:
+            inline.append(child.get_text())
+
+    text = flush()
+    if text:
+        yield 'text', text
+
+
+class StreamingPDFWriter:
+    """Zapisuje odstavce do PDF po řádcích, plnou stránku hned uzavře"""
+
+    def __init__(self, path: str, title: str = None, font_size: int = FONT_SIZE):
+        self.path = path
+        self.font, self.bold = register_fonts()
+        self.font_size = font_size
+        self.width, self.height = A4
+        self.text_width = self.width - 2 * MARGIN
+        self.pages = 0
+
+        self.canvas = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        if title:
+            self.canvas.setTitle(title)
+        self._new_page()
+
+    def _new_page(self):
+        self.pages += 1
+        self.y = self.height - MARGIN
+
+    def _finish_page(self):
+        self.canvas.setFont(self.font, 8)
+        self.canvas.drawCentredString(self.width / 2, MARGIN / 2, str(self.pages))
+        self.canvas.showPage()
+        self._new_page()
+
+    def paragraph(self, text: str, style: str = 'text'):
+        """Zalomí a vykreslí odstavec (přes konec stránky pokračuje na další)"""
+        if style == 'title':
+            font, size, space = self.bold, TITLE_SIZE, 12
+        elif style == 'heading':
+            font, size, space = self.bold, HEADING_SIZE, 8
+        else:
+            font, size, space = self.font, self.font_size, 4
+        leading = size * 1.3
+
+        # Nadpis nezůstane osamocený na konci stránky
+        if style != 'text' and self.y - 3 * leading < MARGIN:
+            self._finish_page()
+
+        for line in simpleSplit(text, font, size, self.text_width):
+            if self.y - leading < MARGIN:
+                self._finish_page()
+            self.y -= leading
+            self.canvas.setFont(font, size)
+            self.canvas.drawString(MARGIN, self.y, line)
+
+        self.y -= space
+
+    def close(self) -> int:
+        """Uzavře poslední stránku a zapíše soubor, vrací počet stránek"""
+        self.canvas.setFont(self.font, 8)
+        self.canvas.drawCentredString(self.width / 2, MARGIN / 2, str(self.pages))
+        self.canvas.showPage()
+        self.canvas.save()
+        return self.pages
+
+
+def render_paper(content: Tag, pdf_path: str, title: str = None) -> int:
+    """Vykreslí div.Paper do PDF, vrací počet stránek"""
+    writer = StreamingPDFWriter(pdf_path, title=title)
+    if title:
+        writer.paragraph(title, style='title')
+    for style, text in iter_blocks(content):
+        writer.paragraph(text, style=style)
+    return writer.close()
+
+
+def benchmark(paths, output_dir: str = "/tmp", repeat: int = 3) -> list:
+    """Změří rychlost generování (stránky PDF za sekundu) a špičku paměti"""
+    if paths:
+        documents = []
+        for path in paths:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                documents.append((os.path.basename(path), f.read()))
+    else:
+        from zakonyprolidi_bench import synthetic_page
+        documents = [('synthetic.html', synthetic_page(paragraphs=3000))]
+
+    results = []
+    for name, html in documents:
+        soup = BeautifulSoup(html, 'html.parser')
+        content = soup.find('div', class_='Paper')
+        if content is None:
+            print(f"⚠️  {name}: chybí div.Paper")
+            continue
+        title = soup.title.get_text() if soup.title else None
+        pdf_path = os.path.join(output_dir, f"bench_{os.path.splitext(name)[0]}.pdf")
+
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            pages = render_paper(content, pdf_path, title=title)
+            times.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        render_paper(content, pdf_path, title=title)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        best = min(times)
+        results.append({
+            'file': name,
+            'pages': pages,
+            'seconds': round(best, 3),
+            'pages_per_second': round(pages / best, 1) if best > 0 else None,
+            'py_peak_kb': round(peak / 1024),
+            'pdf_bytes': os.path.getsize(pdf_path),
+        })
+    return results
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generování PDF z HTML stránek Zákonů pro lidi')
+    parser.add_argument('--benchmark', nargs='*', metavar='SOUBOR',
+                        help='Změřit rychlost na uložených stránkách (bez souborů syntetická stránka)')
+    parser.add_argument('--repeat', type=int, default=3, help='Počet opakování')
+    parser.add_argument('--output-dir', default='/tmp', help='Kam ukládat testovací PDF')
+
+    args = parser.parse_args()
+
+    if not HAS_PDF:
+        print("❌ Chybí reportlab: pip install reportlab")
+        return
+
+    if args.benchmark is None:
+        parser.print_help()
+        return
+
+    print(f"{'Soubor':30} | {'Stran':>6} | {'Čas s':>7} | {'Stran/s':>8} | {'Py peak KB':>10}")
+    print("-" * 74)
+    for r in benchmark(args.benchmark, args.output_dir, args.repeat):
+        print(f"{r['file'][:30]:30} | {r['pages']:6} | {r['seconds']:7.2f} | "
+              f"{r['pages_per_second']:8} | {r['py_peak_kb']:10}")
+
+
+if __name__ == "__main__":
+    main()
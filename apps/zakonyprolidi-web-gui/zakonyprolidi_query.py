@@ -11,6 +11,9 @@ import json
 import sys
 from datetime import datetime
 
+from zakonyprolidi_stats import init_stats, read_stats
+from zakonyprolidi_storage import init_blob_store, load_content_json
+
 
 class ZakonyQuery:
     """Dotazovací nástroj pro databázi"""
@@ -18,6 +21,8 @@ class ZakonyQuery:
     def __init__(self, db_path="zakonyprolidi.db"):
         self.conn = sqlite3.connect(db_path)
         self.conn.row_factory = sqlite3.Row
+        init_blob_store(self.conn)
+        init_stats(self.conn)
 
     def search_by_title(self, keyword: str):
         """Vyhledá dokumenty podle názvu"""
@@ -92,9 +97,11 @@ class ZakonyQuery:
         print(f"Aktualizace:   {doc['last_update']}")
         print(f"URL:           https://www.zakonyprolidi.cz{doc['href']}")
 
-        if doc['content_json']:
-            content = json.loads(doc['content_json'])
-            print(f"\n✅ Kompletní obsah stažen (JSON: {len(doc['content_json'])} bajtů)")
+        # Obsah se dekomprimuje až tady, metadata ho nepotřebují
+        content_json = load_content_json(self.conn, doc)
+        if content_json:
+            content = json.loads(content_json)
+            print(f"\n✅ Kompletní obsah stažen (JSON: {len(content_json)} bajtů)")
 
             if 'Fragments' in content:
                 fragments = content['Fragments']
@@ -112,55 +119,37 @@ class ZakonyQuery:
         return doc
 
     def statistics(self):
-        """Zobrazí statistiky databáze"""
-        cursor = self.conn.cursor()
+        """Zobrazí statistiky databáze (z materializovaných počtů)"""
+        stats = read_stats(self.conn)
 
         print("\n" + "=" * 60)
         print("📊 STATISTIKY DATABÁZE")
         print("=" * 60)
 
         # Celkový počet dokumentů
-        cursor.execute("SELECT COUNT(*) as cnt FROM documents")
-        print(f"Celkem dokumentů: {cursor.fetchone()['cnt']}")
+        print(f"Celkem dokumentů: {stats['documents']}")
 
         # Roky
-        cursor.execute("SELECT MIN(year) as min_year, MAX(year) as max_year FROM documents")
-        row = cursor.fetchone()
-        print(f"Roky: {row['min_year']} - {row['max_year']}")
+        years = [year for year in stats['by_year'] if year is not None]
+        print(f"Roky: {min(years, default=None)} - {max(years, default=None)}")
 
         # Podle typu
         print("\nPočet podle typu dokumentu:")
-        cursor.execute("""
-            SELECT doc_type, COUNT(*) as cnt
-            FROM documents
-            GROUP BY doc_type
-            ORDER BY cnt DESC
-            LIMIT 15
-        """)
-        for row in cursor.fetchall():
-            doc_type = row['doc_type'] or '(neznámý)'
-            print(f"  {doc_type:20} {row['cnt']:5}")
+        by_type = sorted(stats['by_doc_type'].items(), key=lambda item: -item[1])
+        for doc_type, cnt in by_type[:15]:
+            print(f"  {doc_type or '(neznámý)':20} {cnt:5}")
 
         # Podle roku
         print("\nPočet podle roku (top 10):")
-        cursor.execute("""
-            SELECT year, COUNT(*) as cnt
-            FROM documents
-            GROUP BY year
-            ORDER BY cnt DESC
-            LIMIT 10
-        """)
-        for row in cursor.fetchall():
-            print(f"  {row['year']:6} {row['cnt']:5}")
+        by_year = sorted(stats['by_year'].items(), key=lambda item: -item[1])
+        for year, cnt in by_year[:10]:
+            print(f"  {year!s:>6} {cnt:5}")
 
         # S obsahem
-        cursor.execute("SELECT COUNT(*) as cnt FROM documents WHERE content_json IS NOT NULL")
-        with_content = cursor.fetchone()['cnt']
-        print(f"\nS kompletním obsahem: {with_content}")
+        print(f"\nS kompletním obsahem: {stats['with_content']}")
 
         # Částky
-        cursor.execute("SELECT COUNT(*) as cnt FROM batches")
-        print(f"Částek sbírky: {cursor.fetchone()['cnt']}")
+        print(f"Částek sbírky: {stats['rows']['batches']}")
 
         print("=" * 60 + "\n")
 
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Výběr kontextu pro AI dotazy
+===============================================
+
+Fragmenty dokumentů (paragrafy z {"Fragments": [...]}) jsou předem
+rozložené v tabulce fragments s pozicí a znakovými offsety v textu
+dokumentu (stejný text jako sloupec body v documents_fts). Dlouhé
+fragmenty se dělí na kusy do MAX_CHUNK_CHARS.
+
+Dotaz se řadí podle BM25 po fragmentech, ne po celých dokumentech,
+a nejlepší fragmenty se skládají do zadaného rozpočtu tokenů:
+- z jednoho dokumentu nejvýše per_doc fragmentů (víc různých zdrojů)
+- poslední fragment, který se nevejde celý, se zkrátí na hranici slova
+
+Použití:
+    python zakonyprolidi_retrieval.py --rebuild
+    python zakonyprolidi_retrieval.py --ask "výpovědní lhůta" --budget 1500
+"""
+
+import json
+import sqlite3
+from typing import Any, Dict, Iterator, List, Tuple
+
+from zakonyprolidi_fulltext import _table_exists, build_match_query, has_fts5
+from zakonyprolidi_storage import get_text
+
+FRAGMENTS_FTS = "fragments_fts"
+
+# Delší fragment se rozdělí na kusy (znaky)
+MAX_CHUNK_CHARS = 1500
+
+# Odhad délky v tokenech - česká sazba vychází zhruba na 3 znaky na token
+CHARS_PER_TOKEN = 3
+
+# Výchozí rozpočet kontextu a počet kandidátů z indexu
+DEFAULT_BUDGET_TOKENS = 2000
+CANDIDATES = 60
+
+# Zkrácený fragment kratší než tohle se do kontextu nepřidá
+MIN_PARTIAL_TOKENS = 40
+
+_ensured = set()
+
+
+def estimate_tokens(text: str) -> int:
+    """Hrubý odhad počtu tokenů textu"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _chunks(text: str) -> Iterator[Tuple[int, str]]:
+    """Rozdělí text na kusy do MAX_CHUNK_CHARS (na řádku nebo mezeře), vrací (offset, kus)"""
+    start = 0
+    while len(text) - start > MAX_CHUNK_CHARS:
+        end = start + MAX_CHUNK_CHARS
+        cut = max(text.rfind('\n', start, end), text.rfind(' ', start, end))
+        if cut <= start:
+            cut = end
+        yield start, text[start:cut]
+        start = cut + 1 if cut < end else cut
+    yield start, text[start:]
+
+
+def split_fragments(obj: Any) -> List[Tuple[int, int, int, str]]:
+    """Fragmenty obsahu jako (pozice, začátek, konec, text)
+
+    Offsety odpovídají textu z fragment_text() - fragmenty spojené znakem nového řádku.
+    """
+    if not isinstance(obj, dict):
+        return []
+    fragments = obj.get('Fragments')
+    if isinstance(fragments, dict):
+        fragments = [fragments]
+    if not isinstance(fragments, list):
+        return []
+
+    rows = []
+    offset = 0
+    for position, fragment in enumerate(f for f in fragments if isinstance(f, dict) and f.get('Content')):
+        content = fragment['Content']
+        for start, chunk in _chunks(content):
+            if chunk.strip():
+                rows.append((position, offset + start, offset + start + len(chunk), chunk))
+        offset += len(content) + 1
+    return rows
+
+
+def init_fragments(conn: sqlite3.Connection) -> bool:
+    """Vytvoří tabulku fragments s FTS5 indexem, při prvním vytvoření ji naplní
+
+    Vrací False, pokud SQLite FTS5 nepodporuje nebo chybí tabulka documents.
+    """
+    if not _table_exists(conn, 'documents') or not has_fts5(conn):
+        return False
+
+    created = not _table_exists(conn, 'fragments')
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fragments (
+            fragment_id INTEGER PRIMARY KEY,
+            doc_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            UNIQUE(doc_id, start_offset)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FRAGMENTS_FTS} USING fts5(
+            text,
+            content = 'fragments', content_rowid = 'fragment_id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+
+    for name in ('ai', 'ad'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {FRAGMENTS_FTS}_{name}")
+    for name in ('bi', 'ad'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS fragments_documents_{name}")
+
+    # Index nad externím obsahem se udržuje triggery na fragments
+    cursor.execute(f"""
+        CREATE TRIGGER {FRAGMENTS_FTS}_ai AFTER INSERT ON fragments BEGIN
+            INSERT INTO {FRAGMENTS_FTS}(rowid, text) VALUES (new.fragment_id, new.text);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {FRAGMENTS_FTS}_ad AFTER DELETE ON fragments BEGIN
+            INSERT INTO {FRAGMENTS_FTS}({FRAGMENTS_FTS}, rowid, text)
+            VALUES ('delete', old.fragment_id, old.text);
+        END
+    """)
+
+    # Smazaný nebo nahrazený dokument (INSERT OR REPLACE) ztratí i fragmenty
+    cursor.execute("""
+        CREATE TRIGGER fragments_documents_bi BEFORE INSERT ON documents BEGIN
+            DELETE FROM fragments WHERE doc_id IN (
+                SELECT doc_id FROM documents
+                WHERE doc_id = new.doc_id
+                   OR (collection = new.collection AND code = new.code)
+            );
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER fragments_documents_ad AFTER DELETE ON documents BEGIN
+            DELETE FROM fragments WHERE doc_id = old.doc_id;
+        END
+    """)
+
+    if created:
+        rebuild_fragments(conn, commit=False)
+
+    conn.commit()
+    return True
+
+
+def set_fragments(conn: sqlite3.Connection, doc_id: int, obj: Any) -> int:
+    """Nahradí fragmenty dokumentu podle obsahu z API; bez commitu"""
+    conn.execute("DELETE FROM fragments WHERE doc_id = ?", (doc_id,))
+    rows = split_fragments(obj)
+    conn.executemany("""
+        INSERT INTO fragments (doc_id, position, start_offset, end_offset, text)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(doc_id, *row) for row in rows])
+    return len(rows)
+
+
+def rebuild_fragments(conn: sqlite3.Connection, commit: bool = True) -> int:
+    """Znovu rozloží obsah všech dokumentů (content_json i bloby) na fragmenty"""
+    conn.execute("DELETE FROM fragments")
+    conn.execute(f"INSERT INTO {FRAGMENTS_FTS}({FRAGMENTS_FTS}) VALUES ('delete-all')")
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+    ref = 'content_json_ref' if 'content_json_ref' in columns else 'NULL'
+    rows = conn.execute(f"""
+        SELECT doc_id, content_json, {ref} FROM documents
+        WHERE content_json IS NOT NULL OR {ref} IS NOT NULL
+    """).fetchall()
+
+    count = 0
+    for doc_id, inline, blob_ref in rows:
+        text = inline or get_text(conn, blob_ref)
+        try:
+            obj = json.loads(text) if text else None
+        except ValueError:
+            continue
+        count += set_fragments(conn, doc_id, obj)
+
+    if commit:
+        conn.commit()
+    return count
+
+
+def ensure_fragments(conn: sqlite3.Connection, db_path: str) -> bool:
+    """Inicializuje tabulku fragmentů jednou za běh procesu pro danou databázi"""
+    if db_path not in _ensured:
+        if not init_fragments(conn):
+            return False
+        _ensured.add(db_path)
+    return True
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = tokens * CHARS_PER_TOKEN - 1
+    cut = text.rfind(' ', 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip() + '…'
+
+
+def retrieve(conn: sqlite3.Connection, question: str,
+             budget_tokens: int = DEFAULT_BUDGET_TOKENS, per_doc: int = 3,
+             candidates: int = CANDIDATES) -> List[Dict]:
+    """Nejlepší fragmenty k otázce v rozpočtu tokenů, seskupené po dokumentech
+
+    Dokumenty jsou seřazené podle nejlepšího fragmentu, fragmenty v dokumentu
+    podle pozice. Každý fragment nese offsety v textu dokumentu a odhad tokenů.
+    """
+    match = build_match_query(question, match_all=False)
+    if not match:
+        return []
+
+    rows = conn.execute(f"""
+        SELECT f.fragment_id, f.doc_id, f.position, f.start_offset, f.end_offset, f.text,
+               d.code, d.quote, d.title, d.year,
+               bm25({FRAGMENTS_FTS}) AS rank
+        FROM {FRAGMENTS_FTS}
+        JOIN fragments f ON f.fragment_id = {FRAGMENTS_FTS}.rowid
+        JOIN documents d ON d.doc_id = f.doc_id
+        WHERE {FRAGMENTS_FTS} MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    """, (match, candidates)).fetchall()
+
+    documents = {}
+    remaining = budget_tokens
+    for row in rows:
+        doc = documents.get(row[1])
+        if doc is not None and len(doc['fragments']) >= per_doc:
+            continue
+
+        header = f"**{row[7]} - {row[8]}** (rok {row[9]})"
+        cost = estimate_tokens(header) if doc is None else 0
+        text = row[5]
+        tokens = estimate_tokens(text)
+        if cost + tokens > remaining:
+            tokens = remaining - cost
+            if tokens < MIN_PARTIAL_TOKENS:
+                continue
+            text = _truncate(text, tokens)
+            tokens = estimate_tokens(text)
+
+        if doc is None:
+            doc = documents[row[1]] = {
+                'doc_id': row[1], 'code': row[6], 'quote': row[7], 'title': row[8],
+                'year': row[9], 'rank': row[10], 'fragments': [],
+            }
+        doc['fragments'].append({
+            'fragment_id': row[0], 'position': row[2], 'start_offset': row[3],
+            'end_offset': row[4], 'text': text, 'rank': row[10], 'tokens': tokens,
+        })
+        remaining -= cost + tokens
+        if remaining < MIN_PARTIAL_TOKENS:
+            break
+
+    result = list(documents.values())
+    for doc in result:
+        doc['fragments'].sort(key=lambda f: f['start_offset'])
+    return result
+
+
+def context_tokens(documents: List[Dict]) -> int:
+    """Odhad tokenů kontextu složeného z výsledku retrieve()"""
+    return sum(estimate_tokens(f"**{d['quote']} - {d['title']}** (rok {d['year']})") +
+               sum(f['tokens'] for f in d['fragments']) for d in documents)
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fragmenty dokumentů pro AI dotazy')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--rebuild', action='store_true', help='Znovu rozložit obsah na fragmenty')
+    parser.add_argument('--ask', help='Vybrat kontext k otázce')
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET_TOKENS, help='Rozpočet tokenů')
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+
+    try:
+        if not init_fragments(conn):
+            print("❌ FTS5 není k dispozici nebo chybí tabulka documents")
+            return
+
+        if args.rebuild:
+            print(f"✅ Fragmenty přestavěny ({rebuild_fragments(conn)} fragmentů)")
+
+        if args.ask:
+            documents = retrieve(conn, args.ask, budget_tokens=args.budget)
+            for doc in documents:
+                print(f"{doc['quote'] or '':15} | {doc['rank']:8.2f} | {(doc['title'] or '')[:70]}")
+                for fragment in doc['fragments']:
+                    print(f"{'':15} | [{fragment['start_offset']}:{fragment['end_offset']}] "
+                          f"{fragment['text'][:100]}")
+            print(f"📏 Kontext: ~{context_tokens(documents)} / {args.budget} tokenů")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -20,13 +20,21 @@ import json
 import time
 import argparse
 import logging
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from bs4 import BeautifulSoup
+from typing import Dict, List, Optional, Any, Iterable, Sequence, Union
 from urllib.parse import urljoin
 import xml.etree.ElementTree as ET
 
+from zakonyprolidi_fetch import FetchEngine, ResponseCache
+from zakonyprolidi_criteria import init_criteria_indexes
+from zakonyprolidi_fulltext import init_fulltext, set_body
+from zakonyprolidi_retrieval import init_fragments, set_fragments
+from zakonyprolidi_stats import init_stats, read_stats
+from zakonyprolidi_tags import init_tags
+from zakonyprolidi_html import default_backend, extract_links, extract_page
+from zakonyprolidi_storage import init_blob_store, put_json, put_text, fragment_text
+
 # Nastavení loggingu
 logging.basicConfig(
     level=logging.INFO,
@@ -45,23 +53,38 @@ class ZakonyProLidiAPI:
     BASE_URL = "http://www.zakonyprolidi.cz/api/v1"
     WEB_URL = "https://www.zakonyprolidi.cz"
 
-    def __init__(self, apikey: str = "test"):
+    def __init__(self, apikey: str = "test", base_url: str = None, engine: FetchEngine = None,
+                 cache: ResponseCache = None):
         self.apikey = apikey
+        self.base_url = base_url or self.BASE_URL
+        self.engine = engine or FetchEngine()
+        self.cache = cache
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'ZakonyProLidi-Scraper/1.0'
         })
+        self.engine.configure_session(self.session)
+
+    def _call_api(self, method: str, params: Dict = None, format: str = "json",
+                  raise_errors: bool = False) -> Any:
+        """Zavolá API metodu a vrátí výsledek
 
-    def _call_api(self, method: str, params: Dict = None, format: str = "json") -> Any:
-        """Zavolá API metodu a vrátí výsledek"""
+        Chyba sítě, HTTP nebo JSON se zaloguje a vrátí se None; s raise_errors=True
+        se vyhodí dál (synchronizace podle ní pozná neúspěšný běh).
+        """
         if params is None:
             params = {}
         params['apikey'] = self.apikey
 
-        url = f"{self.BASE_URL}/data.{format}/{method}"
+        url = f"{self.base_url}/data.{format}/{method}"
 
         try:
-            response = self.session.get(url, params=params, timeout=30)
+            # Rate limit + retry při 429/5xx zajišťuje engine, opakované dotazy cache
+            if self.cache:
+                response = self.cache.get(self.session, url, params=params, timeout=30,
+                                          engine=self.engine)
+            else:
+                response = self.engine.request(self.session, url, params=params, timeout=30)
             response.raise_for_status()
 
             if format == "json":
@@ -75,9 +98,13 @@ class ZakonyProLidiAPI:
 
         except requests.exceptions.RequestException as e:
             logger.error(f"API chyba při volání {method}: {e}")
+            if raise_errors:
+                raise
             return None
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode chyba: {e}")
+            if raise_errors:
+                raise
             return None
 
     def get_collections(self) -> List[Dict]:
@@ -111,13 +138,14 @@ class ZakonyProLidiAPI:
         })
         return result if result else []
 
-    def get_document(self, collection: str, document: str, format: str = "json") -> Dict:
+    def get_document(self, collection: str, document: str, format: str = "json",
+                     raise_errors: bool = False) -> Dict:
         """Získá konkrétní dokument"""
         logger.info(f"Stahuji dokument {document} ze sbírky {collection}...")
         return self._call_api("DocData", {
             'Collection': collection,
             'Document': document
-        }, format=format)
+        }, format=format, raise_errors=raise_errors)
 
     def get_document_versions(self, collection: str, document: str) -> List[Dict]:
         """Získá seznam verzí dokumentu"""
@@ -127,13 +155,14 @@ class ZakonyProLidiAPI:
         })
         return result if result else []
 
-    def get_publish_list(self, collection: str, date_from: str, date_to: str) -> List[Dict]:
+    def get_publish_list(self, collection: str, date_from: str, date_to: str,
+                         raise_errors: bool = False) -> List[Dict]:
         """Získá seznam publikovaných dokumentů v období"""
         result = self._call_api("PublishList", {
             'Collection': collection,
             'DateFrom': date_from,
             'DateTo': date_to
-        })
+        }, raise_errors=raise_errors)
         return result if result else []
 
 
@@ -142,33 +171,34 @@ class ZakonyProLidiScraper:
 
     BASE_URL = "https://www.zakonyprolidi.cz"
 
-    def __init__(self):
+    def __init__(self, cache: ResponseCache = None, html_backend: str = None):
+        self.cache = cache
+        self.html_backend = html_backend or default_backend()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (compatible; ZakonyProLidi-Scraper/1.0)'
         })
 
+    def _get(self, url: str):
+        """GET stránky (přes cache, pokud je k dispozici)"""
+        if self.cache:
+            return self.cache.get(self.session, url, timeout=30)
+        return self.session.get(url, timeout=30)
+
     def scrape_document(self, url: str) -> Dict:
         """Stáhne a parsuje dokument z HTML"""
         try:
-            response = self.session.get(url, timeout=30)
+            response = self._get(url)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Extrakce metadat
-            title = soup.find('title')
-            title_text = title.text if title else ""
-
-            # Extrakce obsahu dokumentu
-            content = soup.find('div', class_='Paper')
-            content_text = content.get_text(strip=True) if content else ""
+            # Jen titulek a div.Paper - bez stavby celého stromu
+            page = extract_page(response.text, want_links=False, backend=self.html_backend)
 
             return {
                 'url': url,
-                'title': title_text,
-                'content': content_text,
-                'html': str(content) if content else ""
+                'title': page['title'],
+                'content': page['content'],
+                'html': page['html']
             }
 
         except Exception as e:
@@ -182,12 +212,9 @@ class ZakonyProLidiScraper:
         for year in range(start_year, end_year + 1):
             url = f"{self.BASE_URL}/{collection}/rocnik/{year}"
             try:
-                response = self.session.get(url, timeout=30)
-                soup = BeautifulSoup(response.text, 'html.parser')
-
+                response = self._get(url)
                 # Najdi všechny odkazy na dokumenty
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
+                for href in extract_links(response.text, backend=self.html_backend):
                     if f"/{collection}/" in href and href.count('/') == 2:
                         full_url = urljoin(self.BASE_URL, href)
                         documents.append(full_url)
@@ -204,8 +231,14 @@ class ZakonyProLidiScraper:
 class LocalDatabase:
     """Správa lokální SQLite databáze"""
 
-    def __init__(self, db_path: str = "zakonyprolidi.db"):
+    # Výchozí počet řádků mezi commity při hromadném ukládání
+    COMMIT_INTERVAL = 1000
+
+    def __init__(self, db_path: str = "zakonyprolidi.db", journal_mode: str = "wal",
+                 commit_interval: int = COMMIT_INTERVAL):
         self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.commit_interval = max(1, commit_interval)
         self.conn = None
         self.init_database()
 
@@ -214,6 +247,11 @@ class LocalDatabase:
         self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
 
+        # WAL: zápis bez blokování čtenářů, fsync jen při checkpointu
+        self.conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.journal_mode.lower() == 'wal':
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+
         cursor = self.conn.cursor()
 
         # Tabulka sbírek
@@ -291,6 +329,26 @@ class LocalDatabase:
             )
         """)
 
+        # Stav inkrementální synchronizace (high-water mark PublishList)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                collection TEXT PRIMARY KEY,
+                last_sync DATE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Kompletně stažené ročníky (ne jen "rok má aspoň jeden dokument")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS synced_years (
+                collection TEXT,
+                year INTEGER,
+                doc_count INTEGER,
+                synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (collection, year)
+            )
+        """)
+
         # Indexy pro rychlejší vyhledávání
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents(collection)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_year ON documents(year)")
@@ -298,46 +356,95 @@ class LocalDatabase:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_effect_from ON documents(effect_from)")
 
         self.conn.commit()
+
+        # Pokrývající indexy pro výběr dávek ke stažení (datum / typ / rok)
+        init_criteria_indexes(self.conn)
+
+        # Komprimované úložiště obsahu (content_blobs + ref sloupce)
+        init_blob_store(self.conn)
+
+        # Fulltextový index (FTS5) synchronizovaný triggery
+        if not init_fulltext(self.conn):
+            logger.warning("⚠️  SQLite nepodporuje FTS5 - vyhledávání poběží přes LIKE")
+        else:
+            # Fragmenty s offsety pro výběr kontextu AI dotazů
+            init_fragments(self.conn)
+
+        # Tagy dokumentů (tags / document_tags)
+        init_tags(self.conn)
+
+        # Materializované počty pro statistiky (udržované triggery)
+        init_stats(self.conn)
         logger.info(f"Databáze inicializována: {self.db_path}")
 
-    def save_collection(self, collection: Dict):
-        """Uloží sbírku do databáze"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO collections (collection_id, code, name, first_year, last_year)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
+    # SQL pro zápis jednotlivých entit (sdílené jednotlivým i hromadným ukládáním)
+    COLLECTION_SQL = """
+        INSERT OR REPLACE INTO collections (collection_id, code, name, first_year, last_year)
+        VALUES (?, ?, ?, ?, ?)
+    """
+
+    DOC_TYPE_SQL = """
+        INSERT OR REPLACE INTO doc_types (doc_type_id, code, name)
+        VALUES (?, ?, ?)
+    """
+
+    # Obsah se ukládá do content_blobs, v documents zůstává jen odkaz (hash)
+    DOCUMENT_SQL = """
+        INSERT OR REPLACE INTO documents (
+            doc_id, collection, code, year, number, quote, title, doc_type,
+            declare_date, publish_date, effect_from, effect_till, last_update,
+            href, content_json_ref, content_html_ref
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    # Hromadné ukládání metadat (seznam ročníku, PublishList): existující dokument
+    # se jen aktualizuje - zůstane mu doc_id, odkazy na obsah, fragmenty i tagy.
+    # Není to INSERT ... ON CONFLICT DO UPDATE: pokus o vložení by spustil
+    # BEFORE INSERT triggery (statistiky, fulltext, fragmenty), které počítají
+    # s nahrazením řádku. Chybějící hodnota v seznamu uloženou hodnotu nepřepíše.
+    METADATA_COLUMNS = ('year', 'number', 'quote', 'title', 'doc_type', 'declare_date',
+                        'publish_date', 'effect_from', 'effect_till', 'last_update', 'href')
+
+    DOCUMENT_METADATA_UPDATE_SQL = f"""
+        UPDATE documents SET {', '.join(f'{col} = COALESCE(:{col}, {col})' for col in METADATA_COLUMNS)}
+        WHERE collection = :collection AND code = :code
+    """
+
+    DOCUMENT_METADATA_INSERT_SQL = f"""
+        INSERT OR REPLACE INTO documents (doc_id, collection, code, {', '.join(METADATA_COLUMNS)})
+        SELECT :doc_id, :collection, :code, {', '.join(f':{col}' for col in METADATA_COLUMNS)}
+        WHERE NOT EXISTS (
+            SELECT 1 FROM documents WHERE collection = :collection AND code = :code
+        )
+    """
+
+    BATCH_SQL = """
+        INSERT OR REPLACE INTO batches (
+            batch_id, collection, year, number, code, quote, publish_date, href, file
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _collection_row(collection: Dict) -> tuple:
+        return (
             collection.get('CollectionId'),
             collection.get('Code'),
             collection.get('Name'),
             collection.get('FirstYear'),
             collection.get('LastYear')
-        ))
-        self.conn.commit()
+        )
 
-    def save_doc_type(self, doc_type: Dict):
-        """Uloží typ dokumentu"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO doc_types (doc_type_id, code, name)
-            VALUES (?, ?, ?)
-        """, (
+    @staticmethod
+    def _doc_type_row(doc_type: Dict) -> tuple:
+        return (
             doc_type.get('DocTypeId'),
             doc_type.get('Code'),
             doc_type.get('Name')
-        ))
-        self.conn.commit()
+        )
 
-    def save_document(self, doc: Dict, content_json: str = None, content_html: str = None):
-        """Uloží dokument do databáze"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO documents (
-                doc_id, collection, code, year, number, quote, title, doc_type,
-                declare_date, publish_date, effect_from, effect_till, last_update,
-                href, content_json, content_html
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    @staticmethod
+    def _document_row(doc: Dict, content_json_ref: str = None, content_html_ref: str = None) -> tuple:
+        return (
             doc.get('DocId'),
             doc.get('Collection'),
             doc.get('Code'),
@@ -352,20 +459,19 @@ class LocalDatabase:
             doc.get('EffectTill'),
             doc.get('LastUpdate'),
             doc.get('Href'),
-            content_json,
-            content_html
-        ))
-        self.conn.commit()
-        return cursor.lastrowid
-
-    def save_batch(self, batch: Dict):
-        """Uloží částku do databáze"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO batches (
-                batch_id, collection, year, number, code, quote, publish_date, href, file
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+            content_json_ref,
+            content_html_ref
+        )
+
+    @classmethod
+    def _document_metadata_row(cls, doc: Dict) -> Dict:
+        # _document_row má metadata ve stejném pořadí, odkazy na obsah na konci se vynechají
+        return dict(zip(('doc_id', 'collection', 'code') + cls.METADATA_COLUMNS,
+                        cls._document_row(doc)))
+
+    @staticmethod
+    def _batch_row(batch: Dict) -> tuple:
+        return (
             batch.get('BatchId'),
             batch.get('Collection'),
             batch.get('Year'),
@@ -375,35 +481,213 @@ class LocalDatabase:
             batch.get('PublishDate'),
             batch.get('Href'),
             batch.get('File')
-        ))
+        )
+
+    def save_collection(self, collection: Dict):
+        """Uloží sbírku do databáze"""
+        self.conn.execute(self.COLLECTION_SQL, self._collection_row(collection))
         self.conn.commit()
 
-    def get_statistics(self) -> Dict:
-        """Vrátí statistiky databáze"""
+    def save_doc_type(self, doc_type: Dict):
+        """Uloží typ dokumentu"""
+        self.conn.execute(self.DOC_TYPE_SQL, self._doc_type_row(doc_type))
+        self.conn.commit()
+
+    def save_document(self, doc: Dict, content_json: str = None, content_html: str = None):
+        """Uloží dokument do databáze"""
+        content = json.loads(content_json) if content_json else None
+        json_ref = put_json(self.conn, content) if content is not None else None
+        html_ref = put_text(self.conn, content_html) if content_html else None
+
         cursor = self.conn.cursor()
+        cursor.execute(self.DOCUMENT_SQL, self._document_row(doc, json_ref, html_ref))
+        if content is not None:
+            set_body(self.conn, cursor.lastrowid, fragment_text(content))
+            set_fragments(self.conn, cursor.lastrowid, content)
+        self.conn.commit()
+        return cursor.lastrowid
 
-        stats = {}
+    def set_document_content(self, collection: str, code: str,
+                             doc_data: Any = None, html: str = None, last_update: str = None):
+        """Uloží obsah dokumentu (JSON z API / HTML) do blob store a aktualizuje odkaz
+
+        last_update se zapíše ve stejné transakci - synchronizace ho nastaví,
+        až když je obsah uložený.
+        """
+        updates = {}
+        if doc_data is not None:
+            updates['content_json'] = None
+            updates['content_json_ref'] = put_json(self.conn, doc_data)
+        if html is not None:
+            updates['content_html'] = None
+            updates['content_html_ref'] = put_text(self.conn, html)
+        if not updates:
+            return
+        if last_update is not None:
+            updates['last_update'] = last_update
+
+        if collection:
+            where, where_params = "collection = ? AND code = ?", [collection, code]
+        else:
+            where, where_params = "code = ?", [code]
+
+        assignments = ', '.join(f"{col} = ?" for col in updates)
+        rows = self.conn.execute(f"SELECT doc_id FROM documents WHERE {where}",
+                                 where_params).fetchall()
+        self.conn.execute(f"UPDATE documents SET {assignments} WHERE {where}",
+                          list(updates.values()) + where_params)
+
+        # Fulltext: text fragmentů z blobu trigger nepřečte
+        if doc_data is not None:
+            body = fragment_text(doc_data)
+            for row in rows:
+                set_body(self.conn, row['doc_id'], body)
+                set_fragments(self.conn, row['doc_id'], doc_data)
 
-        cursor.execute("SELECT COUNT(*) as count FROM collections")
-        stats['collections'] = cursor.fetchone()['count']
+        self.conn.commit()
 
-        cursor.execute("SELECT COUNT(*) as count FROM documents")
-        stats['documents'] = cursor.fetchone()['count']
+    def save_document_version(self, doc_id: int, version: Dict, doc_data: Any = None):
+        """Uloží verzi dokumentu - obsah sdílí bloby s documents (stejný obsah = stejný hash)"""
+        json_ref = put_json(self.conn, doc_data) if doc_data is not None else None
+        self.conn.execute("""
+            INSERT INTO document_versions (doc_id, version_number, effect_from, effect_till,
+                                           content_json_ref)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            doc_id,
+            version.get('Version') or version.get('VersionNumber'),
+            version.get('EffectFrom'),
+            version.get('EffectTill'),
+            json_ref
+        ))
+        self.conn.commit()
 
-        cursor.execute("SELECT COUNT(*) as count FROM doc_types")
-        stats['doc_types'] = cursor.fetchone()['count']
+    def save_batch(self, batch: Dict):
+        """Uloží částku do databáze"""
+        self.conn.execute(self.BATCH_SQL, self._batch_row(batch))
+        self.conn.commit()
 
-        cursor.execute("SELECT COUNT(*) as count FROM batches")
-        stats['batches'] = cursor.fetchone()['count']
+    def _bulk_write(self, sql: Union[str, Sequence[str]], rows: Iterable,
+                    commit_interval: int = None) -> Dict:
+        """Zapíše řádky přes executemany, commit vždy po commit_interval řádcích
 
-        cursor.execute("""
-            SELECT collection, COUNT(*) as count
-            FROM documents
-            GROUP BY collection
-        """)
-        stats['by_collection'] = {row['collection']: row['count'] for row in cursor.fetchall()}
+        sql může být i několik příkazů - každý se provede nad celou dávkou řádků.
+        Vrací statistiku {rows, seconds, rows_per_second} pro porovnání
+        s ukládáním po jednom řádku (commit_interval=1).
+        """
+        statements = (sql,) if isinstance(sql, str) else tuple(sql)
+        interval = max(1, commit_interval or self.commit_interval)
+        cursor = self.conn.cursor()
+        start = time.perf_counter()
+        total = 0
+        chunk = []
+
+        try:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= interval:
+                    for statement in statements:
+                        cursor.executemany(statement, chunk)
+                    self.conn.commit()
+                    total += len(chunk)
+                    chunk = []
+
+            if chunk:
+                for statement in statements:
+                    cursor.executemany(statement, chunk)
+                total += len(chunk)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': total,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(total / elapsed, 1) if elapsed > 0 else None
+        }
+
+    def bulk_save_collections(self, collections: Iterable[Dict], commit_interval: int = None) -> Dict:
+        """Hromadně uloží sbírky"""
+        rows = (self._collection_row(c) for c in collections)
+        return self._bulk_write(self.COLLECTION_SQL, rows, commit_interval)
+
+    def bulk_save_doc_types(self, doc_types: Iterable[Dict], commit_interval: int = None) -> Dict:
+        """Hromadně uloží typy dokumentů"""
+        rows = (self._doc_type_row(dt) for dt in doc_types)
+        return self._bulk_write(self.DOC_TYPE_SQL, rows, commit_interval)
+
+    def bulk_save_documents(self, docs: Iterable[Dict], commit_interval: int = None) -> Dict:
+        """Hromadně uloží metadata dokumentů z API slovníků (jedna transakce na commit_interval řádků)
+
+        Nové dokumenty vloží, u uložených jen aktualizuje metadata - stažený obsah zůstane.
+        """
+        rows = (self._document_metadata_row(doc) for doc in docs)
+        return self._bulk_write((self.DOCUMENT_METADATA_UPDATE_SQL, self.DOCUMENT_METADATA_INSERT_SQL),
+                                rows, commit_interval)
+
+    def bulk_save_batches(self, batches: Iterable[Dict], commit_interval: int = None) -> Dict:
+        """Hromadně uloží částky"""
+        rows = (self._batch_row(b) for b in batches)
+        return self._bulk_write(self.BATCH_SQL, rows, commit_interval)
+
+    def get_sync_mark(self, collection: str) -> Optional[str]:
+        """Vrátí datum poslední úspěšné synchronizace sbírky"""
+        row = self.conn.execute(
+            "SELECT last_sync FROM sync_state WHERE collection = ?", (collection,)
+        ).fetchone()
+        return row['last_sync'] if row else None
+
+    def set_sync_mark(self, collection: str, last_sync: str):
+        """Posune high-water mark synchronizace"""
+        self.conn.execute("""
+            INSERT OR REPLACE INTO sync_state (collection, last_sync, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, (collection, last_sync))
+        self.conn.commit()
+
+    def mark_year_synced(self, collection: str, year: int, doc_count: int):
+        """Zaznamená kompletně stažený ročník"""
+        self.conn.execute("""
+            INSERT OR REPLACE INTO synced_years (collection, year, doc_count, synced_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, (collection, year, doc_count))
+        self.conn.commit()
+
+    def get_synced_years(self, collection: str) -> List[int]:
+        """Vrátí seznam kompletně stažených ročníků"""
+        cursor = self.conn.execute(
+            "SELECT year FROM synced_years WHERE collection = ? ORDER BY year", (collection,)
+        )
+        return [row['year'] for row in cursor.fetchall()]
+
+    def get_last_updates(self, collection: str, codes: List[str]) -> Dict[str, Optional[str]]:
+        """Vrátí LastUpdate uložených dokumentů podle kódu (chybějící kódy nevrací)"""
+        result = {}
+        codes = list(codes)
+        for i in range(0, len(codes), 500):
+            chunk = codes[i:i + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor = self.conn.execute(f"""
+                SELECT code, last_update FROM documents
+                WHERE collection = ? AND code IN ({placeholders})
+            """, [collection] + chunk)
+            result.update({row['code']: row['last_update'] for row in cursor.fetchall()})
+        return result
+
+    def get_statistics(self) -> Dict:
+        """Vrátí statistiky databáze"""
+        counters = read_stats(self.conn)
 
-        return stats
+        return {
+            'collections': counters['rows']['collections'],
+            'documents': counters['documents'],
+            'doc_types': counters['rows']['doc_types'],
+            'batches': counters['rows']['batches'],
+            'by_collection': counters['by_collection'],
+            'storage': counters['blobs'],
+        }
 
     def close(self):
         """Zavře databázové spojení"""
@@ -414,10 +698,15 @@ class LocalDatabase:
 class ZakonyProLidiDownloader:
     """Hlavní třída pro stahování a správu dat"""
 
-    def __init__(self, apikey: str = "test", db_path: str = "zakonyprolidi.db"):
-        self.api = ZakonyProLidiAPI(apikey)
-        self.scraper = ZakonyProLidiScraper()
-        self.db = LocalDatabase(db_path)
+    def __init__(self, apikey: str = "test", db_path: str = "zakonyprolidi.db",
+                 journal_mode: str = "wal", commit_interval: int = LocalDatabase.COMMIT_INTERVAL,
+                 engine: FetchEngine = None, base_url: str = None, cache: ResponseCache = None,
+                 html_backend: str = None):
+        self.engine = engine or FetchEngine()
+        self.cache = cache
+        self.api = ZakonyProLidiAPI(apikey, base_url=base_url, engine=self.engine, cache=cache)
+        self.scraper = ZakonyProLidiScraper(cache=cache, html_backend=html_backend)
+        self.db = LocalDatabase(db_path, journal_mode=journal_mode, commit_interval=commit_interval)
 
     def download_metadata(self):
         """Stáhne metadata (sbírky, typy dokumentů)"""
@@ -425,15 +714,15 @@ class ZakonyProLidiDownloader:
 
         # Sbírky
         collections = self.api.get_collections()
+        self.db.bulk_save_collections(collections)
         for coll in collections:
-            self.db.save_collection(coll)
             logger.info(f"  Uložena sbírka: {coll.get('Name')}")
 
         # Typy dokumentů
         doc_types = self.api.get_doc_types()
         if 'DocTypes' in doc_types:
+            self.db.bulk_save_doc_types(doc_types['DocTypes'])
             for dt in doc_types['DocTypes']:
-                self.db.save_doc_type(dt)
                 logger.info(f"  Uložen typ: {dt.get('Name')}")
 
     def download_year(self, collection: str, year: int):
@@ -441,6 +730,10 @@ class ZakonyProLidiDownloader:
         logger.info(f"=== Stahování roku {year} ({collection}) ===")
 
         year_data = self.api.get_year(collection, year)
+        return self._store_year(collection, year, year_data)
+
+    def _store_year(self, collection: str, year: int, year_data: Optional[Dict]) -> int:
+        """Uloží stažená data roku do databáze"""
         if not year_data or 'Batches' not in year_data:
             logger.warning(f"⚠️  Rok {year} není dostupný s tímto API klíčem")
             logger.info(f"💡 Tip: Použijte --mode scrape pro HTML stahování")
@@ -450,24 +743,26 @@ class ZakonyProLidiDownloader:
         if isinstance(batches, dict):
             batches = [batches]
 
-        doc_count = 0
-        for batch in batches:
-            # Ulož částku
-            self.db.save_batch(batch)
+        # Částky i dokumenty celého roku hromadně (commit po commit_interval řádcích)
+        self.db.bulk_save_batches(batches)
+        stats = self.db.bulk_save_documents(self._iter_batch_docs(batches))
 
-            # Zpracuj dokumenty v částce
+        doc_count = stats['rows']
+        self.db.mark_year_synced(collection, year, doc_count)
+        logger.info(f"  Uloženo {doc_count} dokumentů z roku {year} "
+                    f"({stats['rows_per_second'] or 0} řádků/s)")
+        return doc_count
+
+    @staticmethod
+    def _iter_batch_docs(batches: List[Dict]):
+        """Projde dokumenty ve všech částkách roku"""
+        for batch in batches:
             docs = batch.get('Docs', [])
             if not docs:
                 continue
             if isinstance(docs, dict):
                 docs = [docs]
-
-            for doc in docs:
-                self.db.save_document(doc)
-                doc_count += 1
-
-        logger.info(f"  Uloženo {doc_count} dokumentů z roku {year}")
-        return doc_count
+            yield from docs
 
     def download_document_content(self, collection: str, document_code: str):
         """Stáhne kompletní obsah dokumentu"""
@@ -475,28 +770,35 @@ class ZakonyProLidiDownloader:
 
         # Stáhni přes API
         doc_data = self.api.get_document(collection, document_code)
-        if doc_data:
-            content_json = json.dumps(doc_data, ensure_ascii=False, indent=2)
-
-            # Aktualizuj v databázi
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                UPDATE documents
-                SET content_json = ?
-                WHERE collection = ? AND code = ?
-            """, (content_json, collection, document_code))
-            self.db.conn.commit()
+        self._store_document_content(collection, document_code, doc_data)
+
+    def _store_document_content(self, collection: str, document_code: str, doc_data: Optional[Dict],
+                                last_update: str = None):
+        """Uloží kompletní obsah dokumentu (a s ním LastUpdate, pokud je zadán)
+
+        Prázdná odpověď je chyba - dokument nesmí vypadat jako stažený.
+        """
+        if not doc_data:
+            raise ValueError(f"Prázdná odpověď DocData pro {document_code}")
+        # Aktualizuj v databázi (komprimovaný blob, sdílený mezi verzemi)
+        self.db.set_document_content(collection, document_code, doc_data=doc_data,
+                                     last_update=last_update)
 
     def download_collection_years(self, collection: str, start_year: int, end_year: int):
         """Stáhne všechny roky ze sbírky"""
         logger.info(f"=== Stahování sbírky {collection}: {start_year}-{end_year} ===")
 
+        # Roky se stahují paralelně (rate limit hlídá engine),
+        # zápis do SQLite probíhá v tomto vlákně
         total_docs = 0
-        for year in range(start_year, end_year + 1):
+        years = range(start_year, end_year + 1)
+        fetched = self.engine.map(lambda y: self.api.get_year(collection, y), years)
+
+        for year, year_data, error in fetched:
             try:
-                count = self.download_year(collection, year)
-                total_docs += count
-                time.sleep(1)  # Respektuj server
+                if error:
+                    raise error
+                total_docs += self._store_year(collection, year, year_data)
             except Exception as e:
                 logger.error(f"Chyba při stahování roku {year}: {e}")
 
@@ -516,9 +818,11 @@ class ZakonyProLidiDownloader:
 
         test_years = [1964, 2012]
 
-        for year in test_years:
-            self.download_year('cs', year)
-            time.sleep(2)
+        for year, year_data, error in self.engine.map(lambda y: self.api.get_year('cs', y), test_years):
+            if error:
+                logger.error(f"Chyba při stahování roku {year}: {error}")
+            else:
+                self._store_year('cs', year, year_data)
 
         # Stáhni kompletní obsah testovacích předpisů
         test_documents = [
@@ -530,13 +834,108 @@ class ZakonyProLidiDownloader:
             '2006-262'  # Zákoník práce
         ]
 
-        for doc_code in test_documents:
+        fetched = self.engine.map(lambda code: self.api.get_document('cs', code), test_documents)
+
+        for doc_code, doc_data, error in fetched:
             try:
-                self.download_document_content('cs', doc_code)
-                time.sleep(1)
+                if error:
+                    raise error
+                self._store_document_content('cs', doc_code, doc_data)
             except Exception as e:
                 logger.error(f"Chyba při stahování {doc_code}: {e}")
 
+    @staticmethod
+    def _publish_list_docs(result: Any) -> List[Dict]:
+        """Normalizuje odpověď PublishList na seznam dokumentů"""
+        if isinstance(result, dict):
+            result = result.get('Docs') or result.get('Documents') or []
+        if isinstance(result, dict):
+            result = [result]
+        return [doc for doc in result if isinstance(doc, dict) and doc.get('Code')]
+
+    def sync(self, collection: str = 'cs', since: str = None, until: str = None,
+             window_days: int = 31, with_content: bool = True) -> Dict:
+        """Inkrementální synchronizace přes PublishList od posledního běhu
+
+        Stáhne seznam publikovaných/změněných dokumentů od high-water marku,
+        porovná jejich LastUpdate s uloženými řádky a znovu stáhne jen nové
+        nebo změněné dokumenty. Mark se posune jen při bezchybném běhu.
+        """
+        date_to = date.fromisoformat(until) if until else date.today()
+        mark = since or self.db.get_sync_mark(collection)
+        if mark:
+            date_from = date.fromisoformat(mark[:10])
+        else:
+            date_from = date_to - timedelta(days=window_days)
+
+        logger.info(f"=== Synchronizace {collection}: {date_from} - {date_to} ===")
+
+        # PublishList po oknech (paralelně přes engine)
+        windows = []
+        start = date_from
+        while start <= date_to:
+            end = min(start + timedelta(days=window_days - 1), date_to)
+            windows.append((start.isoformat(), end.isoformat()))
+            start = end + timedelta(days=1)
+
+        listed = {}
+        errors = 0
+        # Chyby API se vyhazují - engine.map je vrátí a mark se neposune
+        fetched = self.engine.map(
+            lambda w: self.api.get_publish_list(collection, *w, raise_errors=True), windows)
+        for window, result, error in fetched:
+            if error:
+                logger.error(f"Chyba PublishList {window}: {error}")
+                errors += 1
+                continue
+            for doc in self._publish_list_docs(result):
+                # Stejný dokument v několika oknech - platí nejnovější LastUpdate
+                known = listed.get(doc['Code'])
+                if not known or (doc.get('LastUpdate') or '') > (known.get('LastUpdate') or ''):
+                    listed[doc['Code']] = doc
+
+        # Porovnání s lokální replikou
+        stored = self.db.get_last_updates(collection, listed.keys())
+        changed = [
+            doc for code, doc in listed.items()
+            if code not in stored or (doc.get('LastUpdate') or '') > (stored[code] or '')
+        ]
+        new_count = sum(1 for doc in changed if doc['Code'] not in stored)
+
+        logger.info(f"  V PublishList {len(listed)} dokumentů, nových {new_count}, "
+                    f"změněných {len(changed) - new_count}")
+
+        for doc in changed:
+            doc.setdefault('Collection', collection)
+        if with_content:
+            # LastUpdate se zapíše až s obsahem dokumentu: po chybě stahování má nový
+            # dokument NULL a změněný původní hodnotu, příští sync ho stáhne znovu
+            self.db.bulk_save_documents({**doc, 'LastUpdate': None} for doc in changed)
+        else:
+            self.db.bulk_save_documents(changed)
+
+        if with_content and changed:
+            codes = [doc['Code'] for doc in changed]
+            fetched = self.engine.map(
+                lambda code: self.api.get_document(collection, code, raise_errors=True), codes)
+            for doc_code, doc_data, error in fetched:
+                try:
+                    if error:
+                        raise error
+                    self._store_document_content(collection, doc_code, doc_data,
+                                                 last_update=listed[doc_code].get('LastUpdate'))
+                except Exception as e:
+                    logger.error(f"Chyba při stahování {doc_code}: {e}")
+                    errors += 1
+
+        if errors == 0:
+            self.db.set_sync_mark(collection, date_to.isoformat())
+        else:
+            logger.warning(f"⚠️  {errors} chyb - high-water mark zůstává {mark}")
+
+        return {'listed': len(listed), 'new': new_count,
+                'updated': len(changed) - new_count, 'errors': errors}
+
     def scrape_all_documents(self, collection: str, start_year: int, end_year: int):
         """Stáhne všechny dokumenty pomocí HTML scrapingu"""
         logger.info(f"=== HTML Scraping: {collection} ({start_year}-{end_year}) ===")
@@ -555,13 +954,7 @@ class ZakonyProLidiDownloader:
                         doc_code = parts[-1]
 
                         # Aktualizuj v databázi
-                        cursor = self.db.conn.cursor()
-                        cursor.execute("""
-                            UPDATE documents
-                            SET content_html = ?
-                            WHERE code = ?
-                        """, (doc_data['html'], doc_code))
-                        self.db.conn.commit()
+                        self.db.set_document_content(None, doc_code, html=doc_data['html'])
 
                 if i % 10 == 0:
                     logger.info(f"  Staženo {i}/{len(documents)} dokumentů")
@@ -585,10 +978,16 @@ class ZakonyProLidiDownloader:
         print("\nDokumenty podle sbírek:")
         for coll, count in stats['by_collection'].items():
             print(f"  {coll}: {count}")
+        storage = stats['storage']
+        print(f"\nObsah: {storage['blobs']} blobů, {storage['raw_bytes'] / 1e6:.1f} MB "
+              f"-> {storage['stored_bytes'] / 1e6:.1f} MB komprimováno")
         print("="*60 + "\n")
 
     def close(self):
         """Uzavře všechna spojení"""
+        if self.cache:
+            logger.info(f"HTTP cache: {self.cache.stats}")
+            self.cache.close()
         self.db.close()
 
 
@@ -599,8 +998,11 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
 
-    parser.add_argument('--mode', choices=['api', 'scrape', 'both', 'stats'],
+    parser.add_argument('--mode', choices=['api', 'scrape', 'both', 'sync', 'stats'],
                        default='api', help='Režim stahování')
+    parser.add_argument('--since', help='Sync: začátek období (YYYY-MM-DD), jinak od posledního běhu')
+    parser.add_argument('--no-content', action='store_true',
+                       help='Sync: aktualizovat jen metadata, bez obsahu dokumentů')
     parser.add_argument('--apikey', default='test', help='API klíč')
     parser.add_argument('--collection', default='cs', help='Kód sbírky')
     parser.add_argument('--year', type=int, help='Konkrétní rok')
@@ -608,10 +1010,36 @@ def main():
     parser.add_argument('--end-year', type=int, default=2012, help='Koncový rok')
     parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
     parser.add_argument('--test-only', action='store_true', help='Stáhnout jen testovací data')
+    parser.add_argument('--commit-interval', type=int, default=LocalDatabase.COMMIT_INTERVAL,
+                       help='Počet řádků mezi commity (1 = commit po každém dokumentu)')
+    parser.add_argument('--journal-mode', choices=['wal', 'delete', 'truncate', 'memory'],
+                       default='wal', help='SQLite journal mode')
+    parser.add_argument('--rate', type=float, default=2.0, help='Max. požadavků za sekundu')
+    parser.add_argument('--burst', type=float, help='Max. burst požadavků (výchozí = rate)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Počet souběžných požadavků')
+    parser.add_argument('--max-retries', type=int, default=4, help='Počet opakování při 429/5xx')
+    parser.add_argument('--base-url', help='Jiná adresa API (např. lokální stub server)')
+    parser.add_argument('--cache', default='http_cache.db', help='Soubor HTTP cache')
+    parser.add_argument('--cache-ttl', type=float, default=3600,
+                       help='Doba (s), po kterou se odpověď z cache nerevaliduje')
+    parser.add_argument('--cache-size', type=int, default=512, help='Max. velikost cache v MB')
+    parser.add_argument('--no-cache', action='store_true', help='Vypnout HTTP cache')
+    parser.add_argument('--html-backend', choices=['lxml', 'bs4'],
+                        help='Parser HTML stránek (výchozí lxml, pokud je nainstalováno)')
 
     args = parser.parse_args()
 
-    downloader = ZakonyProLidiDownloader(args.apikey, args.db)
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache, ttl=args.cache_ttl,
+                              max_bytes=args.cache_size * 1024 * 1024)
+
+    engine = FetchEngine(rate=args.rate, burst=args.burst, concurrency=args.concurrency,
+                         max_retries=args.max_retries)
+    downloader = ZakonyProLidiDownloader(args.apikey, args.db, journal_mode=args.journal_mode,
+                                         commit_interval=args.commit_interval,
+                                         engine=engine, base_url=args.base_url, cache=cache,
+                                         html_backend=args.html_backend)
 
     try:
         if args.mode == 'stats':
@@ -628,6 +1056,11 @@ def main():
                 )
             downloader.show_statistics()
 
+        elif args.mode == 'sync':
+            result = downloader.sync(args.collection, since=args.since,
+                                     with_content=not args.no_content)
+            logger.info(f"Synchronizace: {result}")
+
         elif args.mode == 'scrape':
             downloader.scrape_all_documents(
                 args.collection, args.start_year, args.end_year
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Materializované statistiky
+=============================================
+
+Tabulka stat_counters drží počty, které se jinak počítaly COUNT(*)
+a GROUP BY přes celou tabulku documents při každém zobrazení statistik:
+- dokumenty celkem, s obsahem, s tagy (document_tags)
+- podle sbírky, roku a typu dokumentu
+- počty řádků collections / doc_types / batches a velikost blobů
+
+Počty udržují triggery (INSERT, UPDATE, DELETE). INSERT OR REPLACE maže
+původní řádek bez DELETE triggeru, proto BEFORE INSERT trigger nejdřív
+odečte řádky, které nový řádek nahradí. Čtení je jeden dotaz nad pár
+stovkami řádků bez ohledu na velikost databáze.
+
+Použití:
+    python zakonyprolidi_stats.py               # statistiky
+    python zakonyprolidi_stats.py --recompute   # přepočet jedním průchodem
+"""
+
+import sqlite3
+from typing import Dict, List, Tuple
+
+STATS_TABLE = "stat_counters"
+
+# Podmínka "dokument má obsah" podle dostupných sloupců
+_CONTENT_COLUMNS = ('content_json', 'content_json_ref')
+
+# Tabulky, u kterých se počítají jen řádky: podmínka nahrazení při INSERT OR REPLACE
+ROW_TABLES = {
+    'collections': "collection_id = new.collection_id OR code = new.code",
+    'doc_types': "doc_type_id = new.doc_type_id OR code = new.code",
+    'batches': "batch_id = new.batch_id OR (collection = new.collection AND year = new.year "
+               "AND number = new.number)",
+}
+
+# Řádky documents, které nový řádek nahradí (PRIMARY KEY a UNIQUE(collection, code))
+_DOCUMENT_CONFLICT = "d.doc_id = new.doc_id OR (d.collection = new.collection AND d.code = new.code)"
+
+_UPSERT = "ON CONFLICT(dimension, value) DO UPDATE SET count = count + excluded.count"
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _document_dimensions(columns: set) -> List[Tuple[str, str, str]]:
+    """(dimenze, výraz hodnoty, podmínka) pro řádek s aliasem {a}"""
+    dimensions = [
+        ('documents', "''", "1"),
+        ('collection', "COALESCE(CAST({a}.collection AS TEXT), '')", "1"),
+        ('year', "COALESCE(CAST({a}.year AS TEXT), '')", "1"),
+        ('doc_type', "COALESCE(CAST({a}.doc_type AS TEXT), '')", "1"),
+    ]
+    content = [c for c in _CONTENT_COLUMNS if c in columns]
+    if content:
+        dimensions.append(('with_content', "''", '(' + ' OR '.join(f"{{a}}.{c} IS NOT NULL" for c in content) + ')'))
+    return dimensions
+
+
+def _delta(dimension: str, value: str, amount: str, where: str, source: str = "") -> str:
+    return (f"INSERT INTO {STATS_TABLE} (dimension, value, count) "
+            f"SELECT '{dimension}', {value}, {amount} {source} WHERE {where} {_UPSERT};")
+
+
+def _document_triggers(columns: set) -> Dict[str, str]:
+    dimensions = _document_dimensions(columns)
+    tracked = sorted({'collection', 'year', 'doc_type', *_CONTENT_COLUMNS} & columns)
+
+    before_insert = [
+        _delta(dim, value.format(a='d'), "-1", f"({_DOCUMENT_CONFLICT}) AND {cond.format(a='d')}",
+               source="FROM documents d")
+        for dim, value, cond in dimensions
+    ]
+    after_insert = [_delta(dim, value.format(a='new'), "1", cond.format(a='new'))
+                    for dim, value, cond in dimensions]
+    after_delete = [_delta(dim, value.format(a='old'), "-1", cond.format(a='old'))
+                    for dim, value, cond in dimensions]
+
+    # Změna: odečíst starou hodnotu a přičíst novou, jen pokud se liší
+    after_update = []
+    for dim, value, cond in dimensions:
+        old_value, new_value = value.format(a='old'), value.format(a='new')
+        old_cond, new_cond = cond.format(a='old'), cond.format(a='new')
+        changed = f"({old_value} IS NOT {new_value} OR {old_cond} IS NOT {new_cond})"
+        after_update.append(_delta(dim, old_value, "-1", f"{changed} AND {old_cond}"))
+        after_update.append(_delta(dim, new_value, "1", f"{changed} AND {new_cond}"))
+
+    return {
+        'documents_bi': f"BEFORE INSERT ON documents BEGIN {' '.join(before_insert)} END",
+        'documents_ai': f"AFTER INSERT ON documents BEGIN {' '.join(after_insert)} END",
+        'documents_ad': f"AFTER DELETE ON documents BEGIN {' '.join(after_delete)} END",
+        'documents_au': f"AFTER UPDATE OF {', '.join(tracked)} ON documents "
+                        f"BEGIN {' '.join(after_update)} END",
+    }
+
+
+def _row_triggers(table: str, conflict: str) -> Dict[str, str]:
+    value = f"'{table}'"
+    return {
+        f'{table}_bi': f"BEFORE INSERT ON {table} BEGIN "
+                       f"{_delta('rows', value, f'-(SELECT COUNT(*) FROM {table} WHERE {conflict})', '1')} END",
+        f'{table}_ai': f"AFTER INSERT ON {table} BEGIN {_delta('rows', value, '1', '1')} END",
+        f'{table}_ad': f"AFTER DELETE ON {table} BEGIN {_delta('rows', value, '-1', '1')} END",
+    }
+
+
+def _tag_triggers() -> Dict[str, str]:
+    # Dokument je otagovaný, dokud má v document_tags aspoň jeden řádek
+    def body(alias: str, amount: str) -> str:
+        others = (f"SELECT 1 FROM document_tags "
+                  f"WHERE doc_id = {alias}.doc_id AND tag_id != {alias}.tag_id")
+        return _delta('tagged', "''", amount, f"NOT EXISTS ({others})")
+    return {
+        'document_tags_ai': f"AFTER INSERT ON document_tags BEGIN {body('new', '1')} END",
+        'document_tags_ad': f"AFTER DELETE ON document_tags BEGIN {body('old', '-1')} END",
+    }
+
+
+def _blob_triggers() -> Dict[str, str]:
+    def body(alias: str, sign: str) -> str:
+        return ' '.join([
+            _delta('blobs', "'count'", f"{sign}1", '1'),
+            _delta('blobs', "'raw_bytes'", f"{sign}COALESCE({alias}.raw_size, 0)", '1'),
+            _delta('blobs', "'stored_bytes'", f"{sign}COALESCE({alias}.stored_size, 0)", '1'),
+        ])
+    return {
+        'content_blobs_ai': f"AFTER INSERT ON content_blobs BEGIN {body('new', '')} END",
+        'content_blobs_ad': f"AFTER DELETE ON content_blobs BEGIN {body('old', '-')} END",
+    }
+
+
+def init_stats(conn: sqlite3.Connection) -> bool:
+    """Vytvoří tabulku počtů a triggery; při vzniku nebo změně sledovaných sloupců přepočítá
+
+    Vrací False, pokud chybí tabulka documents.
+    """
+    columns = _columns(conn, 'documents')
+    if not columns:
+        return False
+
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        ) WITHOUT ROWID
+    """)
+
+    triggers = _document_triggers(columns)
+    for table, conflict in ROW_TABLES.items():
+        if _columns(conn, table):
+            triggers.update(_row_triggers(table, conflict))
+    if _columns(conn, 'document_tags'):
+        triggers.update(_tag_triggers())
+    if _columns(conn, 'content_blobs'):
+        triggers.update(_blob_triggers())
+
+    # Triggery se vždy vytvoří znovu, aby odpovídaly aktuálním sloupcům
+    existing = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'stats\\_%' ESCAPE '\\'")]
+    for name in existing:
+        conn.execute(f"DROP TRIGGER {name}")
+    for name, body in triggers.items():
+        conn.execute(f"CREATE TRIGGER stats_{name} {body}")
+
+    # Počty platí jen pro sadu triggerů, se kterou vznikly (např. později vytvořené document_tags)
+    signature = ','.join(sorted(triggers)) + '|' + ','.join(
+        dim for dim, _, _ in _document_dimensions(columns))
+    stored = conn.execute(f"SELECT value FROM {STATS_TABLE} WHERE dimension = '_schema'").fetchone()
+    if stored is None or stored[0] != signature:
+        recompute_stats(conn, commit=False)
+        conn.execute(f"DELETE FROM {STATS_TABLE} WHERE dimension = '_schema'")
+        conn.execute(f"INSERT INTO {STATS_TABLE} (dimension, value, count) VALUES ('_schema', ?, 0)",
+                     (signature,))
+
+    conn.commit()
+    return True
+
+
+def recompute_stats(conn: sqlite3.Connection, commit: bool = True) -> int:
+    """Přepočítá všechny počty jedním průchodem tabulky documents, vrací počet dokumentů"""
+    columns = _columns(conn, 'documents')
+    dimensions = _document_dimensions(columns)
+
+    conn.execute(f"DELETE FROM {STATS_TABLE} WHERE dimension != '_schema'")
+
+    # Jeden GROUP BY přes documents do malé dočasné tabulky, dimenze se sečtou z ní
+    keys = [f"{value.format(a='documents')} AS k{i}, {cond.format(a='documents')} AS c{i}"
+            for i, (_, value, cond) in enumerate(dimensions)]
+    conn.execute("DROP TABLE IF EXISTS temp._stat_groups")
+    conn.execute(f"""
+        CREATE TEMP TABLE _stat_groups AS
+        SELECT {', '.join(keys)}, COUNT(*) AS n FROM documents
+        GROUP BY {', '.join(f'k{i}, c{i}' for i in range(len(dimensions)))}
+    """)
+    for i, (dim, _, _) in enumerate(dimensions):
+        conn.execute(f"""
+            INSERT INTO {STATS_TABLE} (dimension, value, count)
+            SELECT '{dim}', k{i}, SUM(n) FROM _stat_groups WHERE c{i} GROUP BY k{i}
+        """)
+    conn.execute("DROP TABLE temp._stat_groups")
+
+    for table in ROW_TABLES:
+        if _columns(conn, table):
+            conn.execute(f"""
+                INSERT INTO {STATS_TABLE} (dimension, value, count)
+                SELECT 'rows', '{table}', COUNT(*) FROM {table}
+            """)
+    if _columns(conn, 'document_tags'):
+        conn.execute(f"""
+            INSERT INTO {STATS_TABLE} (dimension, value, count)
+            SELECT 'tagged', '', COUNT(DISTINCT doc_id) FROM document_tags
+        """)
+    if _columns(conn, 'content_blobs'):
+        conn.execute(f"""
+            INSERT INTO {STATS_TABLE} (dimension, value, count)
+            SELECT 'blobs', 'count', COUNT(*) FROM content_blobs
+            UNION ALL SELECT 'blobs', 'raw_bytes', COALESCE(SUM(raw_size), 0) FROM content_blobs
+            UNION ALL SELECT 'blobs', 'stored_bytes', COALESCE(SUM(stored_size), 0) FROM content_blobs
+        """)
+
+    total = conn.execute(
+        f"SELECT count FROM {STATS_TABLE} WHERE dimension = 'documents' AND value = ''"
+    ).fetchone()
+    if commit:
+        conn.commit()
+    return total[0] if total else 0
+
+
+def read_stats(conn: sqlite3.Connection) -> Dict:
+    """Statistiky z tabulky počtů (bez průchodu documents)
+
+    Roky jako int, neznámá hodnota (NULL) jako None; nulové počty se vynechají.
+    """
+    stats = {
+        'documents': 0, 'with_content': 0, 'tagged': 0,
+        'by_collection': {}, 'by_year': {}, 'by_doc_type': {},
+        'rows': {table: 0 for table in ROW_TABLES},
+        'blobs': {'blobs': 0, 'raw_bytes': 0, 'stored_bytes': 0},
+    }
+    rows = conn.execute(f"SELECT dimension, value, count FROM {STATS_TABLE} WHERE count != 0")
+    for dimension, value, count in rows:
+        if dimension in ('documents', 'with_content', 'tagged'):
+            stats[dimension] = count
+        elif dimension in ('collection', 'year', 'doc_type'):
+            key = None if value == '' else (int(value) if dimension == 'year' else value)
+            stats[f'by_{dimension}'][key] = count
+        elif dimension == 'rows':
+            stats['rows'][value] = count
+        elif dimension == 'blobs':
+            stats['blobs']['blobs' if value == 'count' else value] = count
+    return stats
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Materializované statistiky databáze')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--recompute', action='store_true', help='Přepočítat počty jedním průchodem')
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+
+    try:
+        if not init_stats(conn):
+            print("❌ Chybí tabulka documents")
+            return
+
+        if args.recompute:
+            print(f"✅ Přepočteno ({recompute_stats(conn)} dokumentů)")
+
+        stats = read_stats(conn)
+        print(f"📄 Dokumentů: {stats['documents']}, s obsahem: {stats['with_content']}, "
+              f"s tagy: {stats['tagged']}")
+        print(f"📚 Sbírky: {stats['by_collection']}")
+        print(f"🗂️  Typy: {stats['by_doc_type']}")
+        print(f"🧮 Řádky: {stats['rows']}, bloby: {stats['blobs']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Úložiště obsahu dokumentů
+============================================
+
+Content-addressed blob store pro content_json a content_html:
+- obsah je komprimovaný (zstd, případně zlib) a klíčovaný SHA-256 hashem
+- stejný obsah se uloží jen jednou - sdílí ho documents i document_versions
+- JSON se před uložením kanonizuje (bez odsazení, seřazené klíče)
+- tabulka documents drží jen odkaz (content_json_ref / content_html_ref),
+  takže dotazy na metadata nestránkují megabajty textu
+
+Použití:
+    python zakonyprolidi_storage.py --migrate     # přesun starého obsahu do blobů
+    python zakonyprolidi_storage.py --gc          # smazání nepoužitých blobů
+    python zakonyprolidi_storage.py               # statistiky úložiště
+"""
+
+import hashlib
+import json
+import sqlite3
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+
+# Sloupce s odkazem na blob: tabulka -> [(inline sloupec, ref sloupec)]
+CONTENT_COLUMNS = {
+    'documents': [('content_json', 'content_json_ref'), ('content_html', 'content_html_ref')],
+    'document_versions': [('content_json', 'content_json_ref')],
+}
+
+
+def compress(data: bytes) -> tuple:
+    """Zkomprimuje data, vrací (codec, blob)"""
+    if HAS_ZSTD:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return 'zlib', zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(codec: str, blob: bytes) -> bytes:
+    """Dekomprimuje blob podle codecu"""
+    if codec == 'zstd':
+        if not HAS_ZSTD:
+            raise RuntimeError("Blob je komprimovaný zstd, ale knihovna zstandard není nainstalována")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == 'zlib':
+        return zlib.decompress(blob)
+    return blob
+
+
+def canonical_json(obj: Any) -> str:
+    """Kanonická JSON serializace (stejný obsah = stejný hash)"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def fragment_text(obj: Any) -> Optional[str]:
+    """Text fragmentů dokumentu ({"Fragments": [{"Content": ...}]}) pro fulltext"""
+    if not isinstance(obj, dict):
+        return None
+    fragments = obj.get('Fragments')
+    if isinstance(fragments, dict):
+        fragments = [fragments]
+    if not isinstance(fragments, list):
+        return None
+    parts = [f['Content'] for f in fragments if isinstance(f, dict) and f.get('Content')]
+    return '\n'.join(parts) or None
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def init_blob_store(conn: sqlite3.Connection):
+    """Vytvoří tabulku blobů a doplní ref sloupce do documents/document_versions"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS content_blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            raw_size INTEGER,
+            stored_size INTEGER,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    for table, pairs in CONTENT_COLUMNS.items():
+        existing = _columns(conn, table)
+        if not existing:
+            continue
+        for _, ref_col in pairs:
+            if ref_col not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {ref_col} TEXT")
+    conn.commit()
+
+
+def put_text(conn: sqlite3.Connection, text: str) -> str:
+    """Uloží text jako blob (pokud ještě neexistuje), vrací hash"""
+    raw = text.encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()
+
+    exists = conn.execute("SELECT 1 FROM content_blobs WHERE hash = ?", (digest,)).fetchone()
+    if not exists:
+        codec, blob = compress(raw)
+        conn.execute("""
+            INSERT OR IGNORE INTO content_blobs (hash, codec, raw_size, stored_size, data)
+            VALUES (?, ?, ?, ?, ?)
+        """, (digest, codec, len(raw), len(blob), blob))
+    return digest
+
+
+def put_json(conn: sqlite3.Connection, obj: Any) -> str:
+    """Uloží JSON objekt v kanonické podobě, vrací hash"""
+    return put_text(conn, canonical_json(obj))
+
+
+def get_text(conn: sqlite3.Connection, ref: Optional[str]) -> Optional[str]:
+    """Načte a dekomprimuje blob podle hashe"""
+    if not ref:
+        return None
+    row = conn.execute("SELECT codec, data FROM content_blobs WHERE hash = ?", (ref,)).fetchone()
+    if not row:
+        return None
+    return decompress(row[0], row[1]).decode('utf-8')
+
+
+def _row_value(row, key: str):
+    """Hodnota z sqlite3.Row/dict, None pokud sloupec chybí (starší schéma)"""
+    try:
+        return row[key]
+    except (KeyError, IndexError):
+        return None
+
+
+def load_content_json(conn: sqlite3.Connection, row) -> Optional[str]:
+    """Vrátí content_json řádku - z blobu, nebo ze starého inline sloupce"""
+    ref = _row_value(row, 'content_json_ref')
+    if ref:
+        return get_text(conn, ref)
+    return _row_value(row, 'content_json')
+
+
+def load_content_html(conn: sqlite3.Connection, row) -> Optional[str]:
+    """Vrátí content_html řádku - z blobu, nebo ze starého inline sloupce"""
+    ref = _row_value(row, 'content_html_ref')
+    if ref:
+        return get_text(conn, ref)
+    return _row_value(row, 'content_html')
+
+
+def migrate_inline_content(conn: sqlite3.Connection, batch_size: int = 200) -> Dict[str, int]:
+    """Přesune obsah z inline sloupců do blobů (po dávkách, commit po každé)"""
+    init_blob_store(conn)
+    moved = {}
+
+    for table, pairs in CONTENT_COLUMNS.items():
+        existing = _columns(conn, table)
+        if not existing:
+            continue
+        key = 'doc_id' if table == 'documents' else 'version_id'
+        inline_cols = [c for c, _ in pairs]
+        where = ' OR '.join(f"{c} IS NOT NULL" for c in inline_cols)
+        moved[table] = 0
+        last_key = -1
+
+        while True:
+            rows = conn.execute(f"""
+                SELECT {key}, {', '.join(inline_cols)} FROM {table}
+                WHERE ({where}) AND {key} > ?
+                ORDER BY {key} LIMIT ?
+            """, (last_key, batch_size)).fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                last_key = row[0]
+                updates = {}
+                for i, (inline_col, ref_col) in enumerate(pairs, start=1):
+                    value = row[i]
+                    if value is None:
+                        continue
+                    if inline_col == 'content_json':
+                        try:
+                            ref = put_json(conn, json.loads(value))
+                        except ValueError:
+                            ref = put_text(conn, value)
+                    else:
+                        ref = put_text(conn, value)
+                    updates[inline_col] = None
+                    updates[ref_col] = ref
+
+                assignments = ', '.join(f"{col} = ?" for col in updates)
+                conn.execute(f"UPDATE {table} SET {assignments} WHERE {key} = ?",
+                             list(updates.values()) + [row[0]])
+                moved[table] += 1
+
+            conn.commit()
+
+    return moved
+
+
+def collect_garbage(conn: sqlite3.Connection) -> int:
+    """Smaže bloby, na které už žádný řádek neodkazuje"""
+    refs = []
+    for table, pairs in CONTENT_COLUMNS.items():
+        existing = _columns(conn, table)
+        for _, ref_col in pairs:
+            if ref_col in existing:
+                refs.append(f"SELECT {ref_col} FROM {table} WHERE {ref_col} IS NOT NULL")
+
+    if not refs:
+        return 0
+
+    cursor = conn.execute(f"DELETE FROM content_blobs WHERE hash NOT IN ({' UNION '.join(refs)})")
+    conn.commit()
+    return cursor.rowcount
+
+
+def blob_statistics(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Počet blobů a velikost před/po kompresi"""
+    row = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0)
+        FROM content_blobs
+    """).fetchone()
+    return {'blobs': row[0], 'raw_bytes': row[1], 'stored_bytes': row[2]}
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Úložiště obsahu Zákonů pro lidi')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--migrate', action='store_true', help='Přesunout inline obsah do blobů')
+    parser.add_argument('--gc', action='store_true', help='Smazat nepoužité bloby')
+    parser.add_argument('--vacuum', action='store_true', help='Po migraci zmenšit soubor databáze')
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+
+    try:
+        init_blob_store(conn)
+
+        if args.migrate:
+            moved = migrate_inline_content(conn)
+            print(f"✅ Přesunuto do blobů: {moved}")
+
+        if args.gc:
+            print(f"🗑️  Smazáno nepoužitých blobů: {collect_garbage(conn)}")
+
+        if args.vacuum:
+            conn.execute("VACUUM")
+            print("✅ VACUUM hotov")
+
+        stats = blob_statistics(conn)
+        print(f"📦 Blobů: {stats['blobs']}, obsah {stats['raw_bytes'] / 1e6:.1f} MB, "
+              f"uloženo {stats['stored_bytes'] / 1e6:.1f} MB "
+              f"({'zstd' if HAS_ZSTD else 'zlib'})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
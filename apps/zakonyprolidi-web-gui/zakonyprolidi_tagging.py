@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Automatické tagování podle pravidel
+======================================================
+
+Pravidla jsou v JSON souboru (tag_rules.json), ne v kódu:
+
+    {"rules": [
+        {"tag": "pracovní právo", "title": ["práce", "zaměstnan"]},
+        {"tag": "zákon", "doc_type": ["4"]},
+        {"tag": "nové", "year_from": 2020}
+    ]}
+
+- title: podřetězce názvu (malá písmena), stačí jeden
+- doc_type: přesné hodnoty typu dokumentu
+- year_from / year_to: rozsah roku (včetně), dokument musí rok mít
+Podmínky jednoho pravidla musí platit všechny.
+
+Vzory názvů ze všech pravidel jsou jeden regulární výraz; dávka dokumentů
+se prohledá jedním průchodem přes spojené názvy. Přetagování prochází
+documents po dávkách (keyset podle doc_id) a zapisuje jen rozdíl proti
+uloženým tagům se zdrojem 'auto' - tagy z webu a ruční tagy nemění.
+
+Použití:
+    python zakonyprolidi_tagging.py                       # přetagovat celý korpus
+    python zakonyprolidi_tagging.py --rules moje.json --dry-run
+"""
+
+import json
+import os
+import re
+import sqlite3
+import time
+from bisect import bisect_right
+from typing import Dict, List, Set
+
+from zakonyprolidi_tags import assign_tags, init_tags, unassign_tags
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tag_rules.json')
+
+# Zdroj tagů z pravidel v document_tags
+SOURCE = 'auto'
+
+DEFAULT_CHUNK_SIZE = 5000
+
+_CONDITIONS = ('title', 'doc_type', 'year_from', 'year_to')
+
+
+class TagRules:
+    """Zkompilovaná pravidla tagování"""
+
+    def __init__(self, rules: List[Dict]):
+        for rule in rules:
+            if not isinstance(rule, dict) or not isinstance(rule.get('tag'), str):
+                raise ValueError(f"Pravidlo bez tagu: {rule!r}")
+            unknown = set(rule) - {'tag', *_CONDITIONS}
+            if unknown:
+                raise ValueError(f"Neznámé klíče pravidla '{rule['tag']}': {', '.join(sorted(unknown))}")
+            if not any(key in rule for key in _CONDITIONS):
+                raise ValueError(f"Pravidlo '{rule['tag']}' nemá žádnou podmínku")
+
+        self.rules = rules
+        self.tags = [rule['tag'] for rule in rules]
+
+        # Vzor -> pravidla; shoda delšího vzoru zahrnuje i vzory, které jsou jeho prefixem
+        # (začínají na stejné pozici, alternace v regexu by je jinak nenašla)
+        patterns = {}
+        for i, rule in enumerate(rules):
+            for pattern in rule.get('title', []):
+                patterns.setdefault(pattern.lower(), set()).add(i)
+        self._pattern_rules = {
+            pattern: frozenset().union(*(rule_ids for other, rule_ids in patterns.items()
+                                         if pattern.startswith(other)))
+            for pattern in patterns
+        }
+        # Nejdelší vzory první, lookahead najde shodu na každé pozici (i překrývající se)
+        ordered = sorted(patterns, key=len, reverse=True)
+        self._regex = re.compile('(?=(' + '|'.join(map(re.escape, ordered)) + '))') if ordered else None
+
+        # Pravidla bez podmínky na název platí pro každý název
+        self._without_title = frozenset(i for i, rule in enumerate(rules) if 'title' not in rule)
+        # Pravidla splněná typem a rokem - pro každou dvojici (typ, rok) se spočítají jednou
+        self._by_type_year = {}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_RULES_PATH) -> 'TagRules':
+        """Načte pravidla ze souboru"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f).get('rules', []))
+
+    def _title_hits(self, titles: List[str]) -> List[Set[int]]:
+        """Pravidla se shodou v názvu pro každý název - jeden průchod regexu přes celou dávku"""
+        hits = [set() for _ in titles]
+        if self._regex is None:
+            return hits
+
+        # Offsety až po lower() - u některých znaků mění délku
+        titles = [title.lower() for title in titles]
+        starts, offset = [], 0
+        for title in titles:
+            starts.append(offset)
+            offset += len(title) + 1
+        text = '\n'.join(titles)
+
+        for match in self._regex.finditer(text):
+            hits[bisect_right(starts, match.start()) - 1] |= self._pattern_rules[match.group(1)]
+        return hits
+
+    def _rule_matches(self, rule: Dict, doc_type, year) -> bool:
+        if 'doc_type' in rule and str(doc_type or '') not in {str(v) for v in rule['doc_type']}:
+            return False
+        if 'year_from' in rule or 'year_to' in rule:
+            if not year or year < rule.get('year_from', year) or year > rule.get('year_to', year):
+                return False
+        return True
+
+    def _type_year_rules(self, doc_type, year) -> frozenset:
+        key = (doc_type, year)
+        if key not in self._by_type_year:
+            self._by_type_year[key] = frozenset(
+                i for i, rule in enumerate(self.rules) if self._rule_matches(rule, doc_type, year))
+        return self._by_type_year[key]
+
+    def tag_many(self, docs: List[Dict]) -> List[List[str]]:
+        """Tagy pro dávku dokumentů (title, doc_type, year)"""
+        hits = self._title_hits([doc.get('title') or '' for doc in docs])
+        result = []
+        for doc, title_hits in zip(docs, hits):
+            matched = self._type_year_rules(doc.get('doc_type'), doc.get('year')) & \
+                (title_hits | self._without_title)
+            result.append(list(dict.fromkeys(self.tags[i] for i in sorted(matched))))
+        return result
+
+    def tag(self, doc: Dict) -> List[str]:
+        """Tagy jednoho dokumentu"""
+        return self.tag_many([doc])[0]
+
+
+def retag(conn: sqlite3.Connection, rules: TagRules, chunk_size: int = DEFAULT_CHUNK_SIZE,
+          dry_run: bool = False) -> Dict:
+    """Přetaguje celý korpus po dávkách; zapíše jen přidané a odebrané tagy zdroje 'auto'"""
+    stats = {'documents': 0, 'tagged': 0, 'added': 0, 'removed': 0}
+    started = time.perf_counter()
+    last_id = -2 ** 63  # před nejmenším doc_id
+
+    while True:
+        rows = conn.execute("""
+            SELECT doc_id, title, doc_type, year FROM documents
+            WHERE doc_id > ? ORDER BY doc_id LIMIT ?
+        """, (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+
+        docs = [{'doc_id': r[0], 'title': r[1], 'doc_type': r[2], 'year': r[3]} for r in rows]
+        wanted = {doc['doc_id']: set(tags) for doc, tags in zip(docs, rules.tag_many(docs))}
+
+        # Uložené tagy z pravidel pro rozsah dávky (rozsah primárního klíče document_tags)
+        current = {doc_id: set() for doc_id in wanted}
+        for doc_id, name in conn.execute("""
+            SELECT dt.doc_id, t.name FROM document_tags dt
+            JOIN tags t ON t.tag_id = dt.tag_id
+            WHERE dt.doc_id BETWEEN ? AND ? AND dt.source = ?
+        """, (rows[0][0], rows[-1][0], SOURCE)):
+            current.setdefault(doc_id, set()).add(name)
+
+        additions = [(doc_id, tags - current[doc_id]) for doc_id, tags in wanted.items()
+                     if tags - current[doc_id]]
+        removals = [(doc_id, names - wanted.get(doc_id, set())) for doc_id, names in current.items()
+                    if names - wanted.get(doc_id, set())]
+
+        stats['documents'] += len(rows)
+        stats['tagged'] += sum(1 for tags in wanted.values() if tags)
+        stats['added'] += sum(len(tags) for _, tags in additions)
+        stats['removed'] += sum(len(names) for _, names in removals)
+
+        if not dry_run:
+            unassign_tags(conn, removals, source=SOURCE)
+            assign_tags(conn, additions, source=SOURCE)
+            conn.commit()
+
+        last_id = rows[-1][0]
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 2)
+    stats['documents_per_second'] = round(stats['documents'] / elapsed) if elapsed > 0 else None
+    return stats
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Automatické tagování dokumentů podle pravidel')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--rules', default=DEFAULT_RULES_PATH, help='Soubor s pravidly (JSON)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE, help='Dokumentů v dávce')
+    parser.add_argument('--dry-run', action='store_true', help='Jen spočítat změny, nic nezapisovat')
+
+    args = parser.parse_args()
+
+    rules = TagRules.load(args.rules)
+    conn = sqlite3.connect(args.db)
+
+    try:
+        if not init_tags(conn):
+            print("❌ Chybí tabulka documents")
+            return
+
+        print(f"🏷️  Pravidel: {len(rules.rules)} ({args.rules})")
+        stats = retag(conn, rules, chunk_size=args.chunk, dry_run=args.dry_run)
+        prefix = "🔍 Nanečisto: " if args.dry_run else "✅ "
+        print(f"{prefix}{stats['documents']} dokumentů ({stats['documents_per_second']}/s), "
+              f"s tagy: {stats['tagged']}, přidáno: {stats['added']}, odebráno: {stats['removed']}, "
+              f"{stats['seconds']} s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Tagy dokumentů
+=================================
+
+Tagy jsou v normalizovaných tabulkách místo JSON řetězce v documents.tags:
+- tags (tag_id, name, doc_count) - doc_count udržují triggery, počty tagů
+  se čtou bez procházení dokumentů
+- document_tags (doc_id, tag_id, source) s indexem (tag_id, doc_id) -
+  "dokumenty s tagem X" je vyhledání v indexu
+- source odliší původ tagu (web, auto, manual, json), takže přetagování
+  jednoho zdroje nesmaže tagy z ostatních
+
+Smazaný dokument ztratí i tagy. INSERT OR REPLACE se stejným doc_id
+(nové stažení dokumentu) tagy zachová.
+
+Použití:
+    python zakonyprolidi_tags.py                       # počty tagů
+    python zakonyprolidi_tags.py --migrate             # převod z JSON sloupce documents.tags
+    python zakonyprolidi_tags.py --tag "pracovní právo" # dokumenty s tagem
+"""
+
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def init_tags(conn: sqlite3.Connection) -> bool:
+    """Vytvoří tabulky tagů a triggery; při prvním vytvoření převede JSON sloupec documents.tags
+
+    Vrací False, pokud chybí tabulka documents.
+    """
+    if not _columns(conn, 'documents'):
+        return False
+
+    created = not _columns(conn, 'tags')
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            tag_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            doc_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS document_tags (
+            doc_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            source TEXT NOT NULL DEFAULT 'manual',
+            PRIMARY KEY (doc_id, tag_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_document_tags_tag ON document_tags(tag_id, doc_id)")
+
+    for name in ('count_ai', 'count_ad', 'documents_bi', 'documents_ad'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS tags_{name}")
+
+    # Počet dokumentů u tagu
+    cursor.execute("""
+        CREATE TRIGGER tags_count_ai AFTER INSERT ON document_tags BEGIN
+            UPDATE tags SET doc_count = doc_count + 1 WHERE tag_id = new.tag_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER tags_count_ad AFTER DELETE ON document_tags BEGIN
+            UPDATE tags SET doc_count = doc_count - 1 WHERE tag_id = old.tag_id;
+        END
+    """)
+
+    # Smazaný dokument nebo dokument nahrazený pod jiným doc_id (INSERT OR REPLACE) ztratí tagy
+    cursor.execute("""
+        CREATE TRIGGER tags_documents_bi BEFORE INSERT ON documents BEGIN
+            DELETE FROM document_tags WHERE doc_id IN (
+                SELECT doc_id FROM documents
+                WHERE doc_id != new.doc_id AND collection = new.collection AND code = new.code
+            );
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER tags_documents_ad AFTER DELETE ON documents BEGIN
+            DELETE FROM document_tags WHERE doc_id = old.doc_id;
+        END
+    """)
+
+    if created:
+        migrate_json_tags(conn, commit=False)
+
+    conn.commit()
+    return True
+
+
+def _clean(names: Iterable[str]) -> List[str]:
+    if isinstance(names, str):
+        names = [names]
+    return list(dict.fromkeys(n.strip() for n in names if isinstance(n, str) and n.strip()))
+
+
+def assign_tags(conn: sqlite3.Connection, assignments: Iterable[Tuple[int, Iterable[str]]],
+                source: str = 'manual', replace: bool = False) -> int:
+    """Hromadně přiřadí tagy dokumentům [(doc_id, [tagy]), ...]; bez commitu
+
+    replace=True nejdřív odebere dokumentům tagy stejného zdroje (source).
+    Vrací počet nově přiřazených dvojic dokument-tag.
+    """
+    pairs = [(doc_id, _clean(names)) for doc_id, names in assignments]
+
+    if replace:
+        conn.executemany("DELETE FROM document_tags WHERE doc_id = ? AND source = ?",
+                         [(doc_id, source) for doc_id, _ in pairs])
+
+    names = {name for _, tag_names in pairs for name in tag_names}
+    conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in names])
+
+    cursor = conn.executemany("""
+        INSERT OR IGNORE INTO document_tags (doc_id, tag_id, source)
+        SELECT ?, tag_id, ? FROM tags WHERE name = ?
+    """, [(doc_id, source, name) for doc_id, tag_names in pairs for name in tag_names])
+    return max(cursor.rowcount, 0)
+
+
+def set_document_tags(conn: sqlite3.Connection, doc_id: int, names: Iterable[str],
+                      source: str = 'manual') -> int:
+    """Nahradí tagy dokumentu z daného zdroje; bez commitu"""
+    return assign_tags(conn, [(doc_id, names)], source=source, replace=True)
+
+
+def remove_tags(conn: sqlite3.Connection, doc_ids: Iterable[int], names: Iterable[str],
+                source: str = None) -> int:
+    """Odebere tagy daným dokumentům (jen ze zdroje source, jinak všech zdrojů); bez commitu"""
+    return unassign_tags(conn, [(doc_id, names) for doc_id in doc_ids], source=source)
+
+
+def unassign_tags(conn: sqlite3.Connection, assignments: Iterable[Tuple[int, Iterable[str]]],
+                  source: str = None) -> int:
+    """Hromadně odebere dvojice [(doc_id, [tagy]), ...]; bez commitu"""
+    where = " AND source = ?" if source else ""
+    cursor = conn.executemany(f"""
+        DELETE FROM document_tags
+        WHERE doc_id = ? AND tag_id = (SELECT tag_id FROM tags WHERE name = ?){where}
+    """, [(doc_id, name, *([source] if source else []))
+          for doc_id, names in assignments for name in _clean(names)])
+    return max(cursor.rowcount, 0)
+
+
+def document_tags(conn: sqlite3.Connection, doc_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Tagy dokumentů {doc_id: [názvy]} jedním dotazem (dokumenty bez tagů mají [])"""
+    doc_ids = list(doc_ids)
+    result = {doc_id: [] for doc_id in doc_ids}
+    if not doc_ids or not _columns(conn, 'document_tags'):
+        return result
+    rows = conn.execute(f"""
+        SELECT dt.doc_id, t.name FROM document_tags dt
+        JOIN tags t ON t.tag_id = dt.tag_id
+        WHERE dt.doc_id IN ({','.join('?' * len(doc_ids))})
+        ORDER BY t.name
+    """, doc_ids)
+    for doc_id, name in rows:
+        result[doc_id].append(name)
+    return result
+
+
+def tag_filter_sql(names: Iterable[str], alias: str = 'd') -> Tuple[str, list]:
+    """Podmínka ' AND ...' - dokument má všechny zadané tagy
+
+    Každý tag je samostatný rozsah v indexu (tag_id, doc_id), ne průchod document_tags.
+    """
+    names = _clean(names)
+    clause = (f" AND {alias}.doc_id IN (SELECT doc_id FROM document_tags "
+              f"WHERE tag_id = (SELECT tag_id FROM tags WHERE name = ?))")
+    return clause * len(names), names
+
+
+def tag_counts(conn: sqlite3.Connection, limit: int = None) -> List[Dict]:
+    """Tagy s počtem dokumentů, nejčastější první (z doc_count, bez procházení)"""
+    sql = "SELECT name, doc_count FROM tags WHERE doc_count > 0 ORDER BY doc_count DESC, name"
+    params = []
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [{'name': row[0], 'count': row[1]} for row in conn.execute(sql, params)]
+
+
+def migrate_json_tags(conn: sqlite3.Connection, commit: bool = True) -> int:
+    """Převede JSON tagy z documents.tags do tabulek (source 'json') a sloupec vyprázdní
+
+    Vrací počet převedených dokumentů.
+    """
+    if 'tags' not in _columns(conn, 'documents'):
+        return 0
+
+    assignments = []
+    for doc_id, value in conn.execute("SELECT doc_id, tags FROM documents WHERE tags IS NOT NULL"):
+        try:
+            names = json.loads(value)
+        except ValueError:
+            continue
+        if isinstance(names, list):
+            assignments.append((doc_id, names))
+
+    assign_tags(conn, assignments, source='json')
+    # Sloupec se už nečte; prázdný, aby opakovaný převod nevrátil odebrané tagy
+    conn.execute("UPDATE documents SET tags = NULL WHERE tags IS NOT NULL")
+
+    if commit:
+        conn.commit()
+    return len(assignments)
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Tagy dokumentů Zákonů pro lidi')
+    parser.add_argument('--db', default='zakonyprolidi.db', help='Cesta k databázi')
+    parser.add_argument('--migrate', action='store_true', help='Převést JSON sloupec documents.tags')
+    parser.add_argument('--tag', help='Vypsat dokumenty s tagem')
+    parser.add_argument('--limit', type=int, default=30, help='Počet řádků výpisu')
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+
+    try:
+        if not init_tags(conn):
+            print("❌ Chybí tabulka documents")
+            return
+
+        if args.migrate:
+            print(f"✅ Převedeno dokumentů: {migrate_json_tags(conn)}")
+
+        if args.tag:
+            where, params = tag_filter_sql(args.tag)
+            rows = conn.execute(f"""
+                SELECT d.quote, d.title FROM documents d WHERE 1{where}
+                ORDER BY d.year DESC, d.doc_id LIMIT ?
+            """, params + [args.limit]).fetchall()
+            for quote, title in rows:
+                print(f"{quote or '':15} | {(title or '')[:70]}")
+            print(f"🏷️  {len(rows)} dokumentů s tagem '{args.tag}'")
+        else:
+            for tag in tag_counts(conn, limit=args.limit):
+                print(f"🏷️  {tag['name']:30} {tag['count']:6}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Zákony pro lidi - Získání textu dokumentů
+==========================================
+
+Text PDF se získává nejlevnější dostupnou cestou:
+1. source     - text, ze kterého jsme PDF sami vygenerovali (div.Paper)
+2. text_layer - textová vrstva PDF (pdftotext z poppleru)
+3. ocr        - jen PDF bez textové vrstvy, typicky skenované přílohy
+
+Každé získání se zapíše do tabulky text_sources (metoda, počet stránek,
+čas). Ze skutečné ceny OCR stránky v ocr_jobs se pak odhadne, kolik
+času OCR cesty source a text_layer ušetřily.
+
+Použití:
+    python zakonyprolidi_text.py attachments/2012-89/priloha.pdf
+    python zakonyprolidi_text.py --stats
+"""
+
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from zakonyprolidi_ocr import HAS_OCR, OCRService
+
+# Méně znaků na stránku = textová vrstva chybí (sken) nebo je jen číslování
+MIN_CHARS_PER_PAGE = 50
+
+# Odhad ceny OCR stránky, dokud nejsou vlastní měření v ocr_jobs
+DEFAULT_OCR_SECONDS_PER_PAGE = 4.0
+
+
+def pdf_page_count(pdf_path: str) -> Optional[int]:
+    """Počet stránek PDF (pdfinfo, jinak podle objektů /Type /Page)"""
+    if shutil.which('pdfinfo'):
+        try:
+            output = subprocess.run(['pdfinfo', pdf_path], capture_output=True, text=True,
+                                    timeout=60, check=True).stdout
+            match = re.search(r'^Pages:\s+(\d+)', output, re.M)
+            if match:
+                return int(match.group(1))
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    try:
+        with open(pdf_path, 'rb') as f:
+            return len(re.findall(rb'/Type\s*/Page(?!s)', f.read())) or None
+    except OSError:
+        return None
+
+
+def text_layer(pdf_path: str, min_chars_per_page: int = MIN_CHARS_PER_PAGE) -> Optional[Tuple[str, int]]:
+    """Text z textové vrstvy PDF, vrací (text, stránky) nebo None, pokud vrstva chybí"""
+    if not shutil.which('pdftotext'):
+        return None
+
+    try:
+        text = subprocess.run(['pdftotext', '-layout', '-enc', 'UTF-8', pdf_path, '-'],
+                              capture_output=True, text=True, timeout=120, check=True).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+    # pdftotext odděluje stránky znakem form feed
+    pages = max(1, text.count('\f'))
+    chars = len(re.sub(r'\s', '', text))
+    if chars < pages * min_chars_per_page:
+        return None
+    return text, pages
+
+
+class TextExtractor:
+    """Získání textu PDF: zdrojový text -> textová vrstva -> OCR"""
+
+    def __init__(self, ocr_service: OCRService, output_dir: str = "ocr_texts",
+                 min_chars_per_page: int = MIN_CHARS_PER_PAGE):
+        self.ocr_service = ocr_service
+        self.output_dir = output_dir
+        self.min_chars_per_page = min_chars_per_page
+        self.lock = threading.Lock()
+
+        # Záznamy leží vedle OCR fronty, aby šly spojit s cenou OCR stránky
+        self.conn = sqlite3.connect(ocr_service.queue_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS text_sources (
+                path TEXT PRIMARY KEY,
+                doc_code TEXT,
+                method TEXT NOT NULL,
+                pages INTEGER,
+                chars INTEGER,
+                seconds REAL,
+                ocr_job INTEGER,
+                output_path TEXT,
+                created_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def _write(self, output_path: str, text: str):
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _record(self, result: Dict):
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO text_sources
+                    (path, doc_code, method, pages, chars, seconds, ocr_job, output_path, created_at)
+                VALUES (:path, :doc_code, :method, :pages, :chars, :seconds, :ocr_job, :output_path, :created_at)
+            """, result)
+            self.conn.commit()
+
+    def acquire(self, pdf_path: str, source_text: str = None, doc_code: str = None,
+                output_path: str = None, wait: bool = True) -> Dict:
+        """Uloží text PDF do output_path nejlevnější cestou, vrací záznam o použité metodě
+
+        S wait=False se OCR jen zařadí do fronty (výsledek zapíše OCRService
+        a ohlásí ho přes on_complete).
+        """
+        output_path = output_path or os.path.join(self.output_dir, Path(pdf_path).stem + '.txt')
+        started = time.perf_counter()
+        result = {'path': pdf_path, 'doc_code': doc_code, 'method': 'none', 'pages': None,
+                  'chars': None, 'seconds': None, 'ocr_job': None, 'output_path': None,
+                  'created_at': time.time()}
+
+        if source_text and source_text.strip():
+            # PDF jsme generovali sami - jeho text už máme
+            self._write(output_path, source_text)
+            result.update(method='source', pages=pdf_page_count(pdf_path), chars=len(source_text),
+                          output_path=output_path)
+        else:
+            layer = text_layer(pdf_path, self.min_chars_per_page)
+            if layer:
+                text, pages = layer
+                self._write(output_path, text)
+                result.update(method='text_layer', pages=pages, chars=len(text), output_path=output_path)
+            elif HAS_OCR:
+                job_id = self.ocr_service.submit(pdf_path, output_path=output_path, doc_code=doc_code)
+                result.update(method='ocr', ocr_job=job_id, output_path=output_path)
+                if wait:
+                    job = self.ocr_service.wait(job_id)
+                    if job['status'] != 'done':
+                        raise RuntimeError(job.get('error') or f"OCR {pdf_path} selhalo")
+                    result['pages'] = job['pages']
+
+        result['seconds'] = time.perf_counter() - started
+        self._record(result)
+        return result
+
+    def ocr_seconds_per_page(self) -> Tuple[float, bool]:
+        """Průměrná cena OCR stránky z dokončených úloh, vrací (sekundy, změřeno)"""
+        row = self.conn.execute("""
+            SELECT SUM(seconds), SUM(pages) FROM ocr_jobs
+            WHERE status = 'done' AND seconds > 0 AND pages > 0
+        """).fetchone()
+        if row[1]:
+            return row[0] / row[1], True
+        return DEFAULT_OCR_SECONDS_PER_PAGE, False
+
+    def statistics(self) -> Dict:
+        """Počty a stránky podle metody + odhad ušetřeného času OCR"""
+        with self.lock:
+            # U OCR platí stránky a čas workerů z úlohy (může doběhnout až později)
+            rows = self.conn.execute("""
+                SELECT t.method, COUNT(*),
+                       COALESCE(SUM(COALESCE(t.pages, j.pages)), 0),
+                       COALESCE(SUM(CASE WHEN t.method = 'ocr' THEN j.seconds ELSE t.seconds END), 0)
+                FROM text_sources t
+                LEFT JOIN ocr_jobs j ON j.job_id = t.ocr_job
+                GROUP BY t.method
+            """).fetchall()
+
+        methods = {method: {'files': files, 'pages': pages, 'seconds': round(seconds, 2)}
+                   for method, files, pages, seconds in rows}
+        per_page, measured = self.ocr_seconds_per_page()
+        skipped_pages = sum(methods.get(m, {}).get('pages', 0) for m in ('source', 'text_layer'))
+        spent = sum(m['seconds'] for name, m in methods.items() if name in ('source', 'text_layer'))
+
+        return {
+            'methods': methods,
+            'ocr_seconds_per_page': round(per_page, 2),
+            'ocr_cost_measured': measured,
+            'ocr_pages_skipped': skipped_pages,
+            'ocr_seconds_saved': round(max(0.0, skipped_pages * per_page - spent), 1),
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    """Hlavní funkce"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Získání textu PDF (textová vrstva, případně OCR)')
+    parser.add_argument('pdfs', nargs='*', help='PDF soubory')
+    parser.add_argument('--queue', default='ocr_queue.db', help='Soubor OCR fronty a záznamů')
+    parser.add_argument('--output-dir', default='ocr_texts', help='Adresář pro texty')
+    parser.add_argument('--stats', action='store_true', help='Zobrazit použité metody a ušetřený čas')
+
+    args = parser.parse_args()
+
+    service = OCRService(args.queue, output_dir=args.output_dir)
+    extractor = TextExtractor(service, output_dir=args.output_dir)
+
+    try:
+        for pdf in args.pdfs:
+            result = extractor.acquire(pdf)
+            print(f"📄 {pdf}: {result['method']} ({result['pages'] or '?'} str., "
+                  f"{result['seconds']:.1f}s) -> {result['output_path']}")
+
+        if args.stats or not args.pdfs:
+            stats = extractor.statistics()
+            for method, values in stats['methods'].items():
+                print(f"  {method:10} {values['files']:6} souborů {values['pages']:7} stránek")
+            print(f"⏱️  Ušetřeno OCR: ~{stats['ocr_seconds_saved'] / 60:.1f} min "
+                  f"({stats['ocr_pages_skipped']} stránek × {stats['ocr_seconds_per_page']}s"
+                  f"{'' if stats['ocr_cost_measured'] else ', odhad'})")
+    finally:
+        extractor.close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -11,17 +11,19 @@ Webové rozhraní pro:
 - Download manager
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
 import sqlite3
 import json
+import re
 import os
 import time
 import requests
-from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import threading
 import hashlib
+import base64
+import queue
 
 # AI knihovny (volitelné)
 try:
@@ -36,26 +38,29 @@ try:
 except:
     HAS_OPENAI = False
 
-# PDF a OCR knihovny
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    from reportlab.lib.utils import simpleSplit
-    HAS_PDF = True
-except:
-    HAS_PDF = False
-
-try:
-    import pytesseract
-    from pdf2image import convert_from_path
-    HAS_OCR = True
-except:
-    HAS_OCR = False
+# PDF (reportlab je volitelný, viz zakonyprolidi_pdf)
+from zakonyprolidi_pdf import HAS_PDF, render_paper
 
 from bs4 import BeautifulSoup
 
+import zakonyprolidi_fulltext as fulltext
+import zakonyprolidi_retrieval as retrieval
+from zakonyprolidi_fetch import FetchEngine, ResponseCache
+from zakonyprolidi_storage import load_content_json, load_content_html
+from zakonyprolidi_db import ConnectionManager
+from zakonyprolidi_ocr import HAS_OCR, OCRService
+from zakonyprolidi_text import TextExtractor
+from zakonyprolidi_attachments import AttachmentFetcher
+from zakonyprolidi_answers import AnswerCache
+from zakonyprolidi_criteria import explain as explain_criteria, init_criteria_indexes, select_documents
+from zakonyprolidi_jobs import DownloadQueue
+from zakonyprolidi_stats import init_stats, read_stats
+from zakonyprolidi_tagging import DEFAULT_RULES_PATH, TagRules
+from zakonyprolidi_tags import (assign_tags, document_tags, init_tags, remove_tags, set_document_tags,
+                               tag_counts)
+from zakonyprolidi_artifacts import (artifact_statistics, document_artifacts, has_artifact,
+                                     init_artifacts, record_artifact, shard_path)
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
@@ -64,77 +69,313 @@ DB_PATH = "zakonyprolidi.db"
 PDF_DIR = "pdfs"
 OCR_DIR = "ocr_texts"
 ATTACHMENTS_DIR = "attachments"
-
-# Vytvoř adresáře
-Path(PDF_DIR).mkdir(exist_ok=True)
-Path(OCR_DIR).mkdir(exist_ok=True)
-Path(ATTACHMENTS_DIR).mkdir(exist_ok=True)
-
-# Globální stav stahování
-download_status = {
-    'is_running': False,
-    'current_doc': None,
-    'total': 0,
-    'completed': 0,
-    'errors': []
-}
+ATTACHMENTS_DB_PATH = "attachments.db"
+HTTP_CACHE_PATH = "http_cache.db"
+OCR_QUEUE_PATH = "ocr_queue.db"
+DOWNLOAD_QUEUE_PATH = "download_queue.db"
+ANSWER_CACHE_PATH = "answer_cache.db"
+TAG_RULES_PATH = os.getenv('ZAKONY_TAG_RULES', DEFAULT_RULES_PATH)
+WEB_URL = "https://www.zakonyprolidi.cz"
+
+# Rozpočet kontextu pro AI dotaz (odhad tokenů, lze přepsat parametrem budget)
+ASK_CONTEXT_TOKENS = int(os.getenv('ZAKONY_ASK_CONTEXT_TOKENS', retrieval.DEFAULT_BUDGET_TOKENS))
+ASK_MAX_CONTEXT_TOKENS = 16000
+
+# Cache odpovědí AI: platnost a počet uložených odpovědí (LRU)
+ANSWER_CACHE_TTL = int(os.getenv('ZAKONY_ANSWER_CACHE_TTL', 7 * 24 * 3600))
+ANSWER_CACHE_MAX_ENTRIES = 5000
+
+# Vyhledávání: výchozí a největší velikost stránky
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGE_SIZE = 100
+# Nejvíc výsledků přes kurzor - každá stránka znovu seřadí všechny shody (BM25)
+SEARCH_MAX_DEPTH = 1000
+
+# SSE: komentář po této době ticha udrží spojení přes proxy
+SSE_KEEPALIVE_SECONDS = 15
+
+# Sdílené služby vytvoří init_app() až v procesu serveru. Import modulu nic
+# neotevírá ani nezapisuje - workery OCR poolu (spawn) ho znovu importují
+# jako __mp_main__ a potřebují jen zakonyprolidi_ocr.
+db: Optional[ConnectionManager] = None
+http_session: Optional[requests.Session] = None
+http_cache: Optional[ResponseCache] = None
+attachment_fetcher: Optional[AttachmentFetcher] = None
+ocr_service: Optional[OCRService] = None
+text_extractor: Optional[TextExtractor] = None
+download_queue: Optional[DownloadQueue] = None
+answer_cache: Optional[AnswerCache] = None
+tag_rules: Optional[TagRules] = None
+ai_engine: Optional['AIQueryEngine'] = None
+download_manager: Optional['DownloadManager'] = None
+
+
+def init_app() -> Flask:
+    """Vytvoří adresáře, otevře databáze a sdílené služby; volá se jednou při startu serveru"""
+    global db, http_session, http_cache, attachment_fetcher, ocr_service, text_extractor
+    global download_queue, answer_cache, tag_rules, ai_engine, download_manager
+
+    # Vytvoř adresáře
+    Path(PDF_DIR).mkdir(exist_ok=True)
+    Path(OCR_DIR).mkdir(exist_ok=True)
+    Path(ATTACHMENTS_DIR).mkdir(exist_ok=True)
+
+    # Sdílená SQLite spojení: pool čtenářů pro routy, jeden zapisovatel pro stahování
+    db = ConnectionManager(DB_PATH)
+
+    # Evidence stažených souborů - kontrola duplikátů a statistiky bez procházení adresářů
+    with db.writer() as conn:
+        init_artifacts(conn)
+        # Pokrývající indexy pro výběr dávek podle kritérií
+        init_criteria_indexes(conn)
+        # Tagy v tabulkách tags / document_tags (převod z JSON sloupce documents.tags)
+        init_tags(conn)
+        # Materializované počty pro /api/stats (udržované triggery)
+        init_stats(conn)
+
+    # Sdílená HTTP cache - každá stránka se během běhu stáhne jen jednou,
+    # opakované běhy ji jen revalidují (ETag/Last-Modified)
+    http_session = requests.Session()
+    http_cache = ResponseCache(HTTP_CACHE_PATH)
+
+    # Přílohy mimo cache: streamem na disk, souběžně, deduplikace podle URL a obsahu
+    attachment_fetcher = AttachmentFetcher(ATTACHMENTS_DB_PATH, session=http_session)
+
+    # OCR v poolu procesů po stránkách; fronta přežije restart serveru.
+    # Dokončené texty se rovnou zaevidují v artifacts.
+    ocr_service = OCRService(OCR_QUEUE_PATH, output_dir=OCR_DIR, on_complete=_record_ocr_text)
+
+    # Text PDF: zdrojový text -> textová vrstva -> OCR (jen skeny)
+    text_extractor = TextExtractor(ocr_service, output_dir=OCR_DIR)
+
+    # Fronta stahování po dokumentech - stav přežije restart serveru
+    download_queue = DownloadQueue(DOWNLOAD_QUEUE_PATH)
+
+    # Odpovědi AI pro stejnou otázku nad nezměněnými dokumenty
+    answer_cache = AnswerCache(ANSWER_CACHE_PATH, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES)
+
+    # Pravidla automatického tagování (stejná jako dávkové přetagování zakonyprolidi_tagging.py)
+    tag_rules = TagRules.load(TAG_RULES_PATH)
+
+    ai_engine = AIQueryEngine(provider=os.getenv('ZAKONY_AI_PROVIDER', 'anthropic'), answer_cache=answer_cache)
+    download_manager = DownloadManager()
+    return app
+
+
+def _record_ocr_text(job: Dict):
+    """Zaeviduje text dokončené OCR úlohy (volá OCRService z dispatcheru)"""
+    if job.get('doc_code'):
+        with db.writer() as conn:
+            record_artifact(conn, job['doc_code'], 'text', job['output_path'])
 
 
 class AIQueryEngine:
     """AI asistent pro dotazy na zákony"""
 
-    def __init__(self, provider='anthropic', api_key=None):
+    # Model podle poskytovatele (součást klíče cache odpovědí)
+    MODELS = {
+        'anthropic': "claude-3-5-sonnet-20241022",
+        'openai': "gpt-4",
+        'stub': "stub",
+    }
+
+    def __init__(self, provider='anthropic', api_key=None, answer_cache: AnswerCache = None):
         self.provider = provider
+        self.model = self.MODELS.get(provider)
+        self.fts_ready = None
+        self.fragments_ready = None
+        self.answer_cache = answer_cache
         self.api_key = api_key or os.getenv(f'{provider.upper()}_API_KEY')
+        self.client = None
 
         if provider == 'anthropic' and HAS_ANTHROPIC:
             self.client = anthropic.Anthropic(api_key=self.api_key)
         elif provider == 'openai' and HAS_OPENAI:
             openai.api_key = self.api_key
             self.client = openai
+        elif provider == 'stub':
+            self.client = StubAIClient()
+
+    def _ensure_fulltext(self) -> bool:
+        # Inicializace indexu (zápis) jen jednou, pak už jen čtecí spojení
+        if self.fts_ready is None:
+            with db.writer() as conn:
+                self.fts_ready = fulltext.ensure_fulltext(conn, DB_PATH)
+        return self.fts_ready
+
+    def search_documents(self, query: str, limit: int = 5, match_all: bool = True,
+                         snippet_tokens: int = 24, fields=fulltext.DEFAULT_FIELDS,
+                         after: tuple = None, filters: Dict = None) -> List[Dict]:
+        """Vyhledá relevantní dokumenty pro dotaz (vybraná pole, stránka za kurzorem after)
+
+        Prázdný dotaz s filtrem tagů vrátí dokumenty s tagy (novější rok dřív).
+        """
+        fts_ready = self._ensure_fulltext()
+
+        with db.reader() as conn:
+            # FTS5 index s BM25 řazením a zvýrazněným úryvkem
+            if fts_ready and query:
+                return fulltext.search(conn, query, limit=limit, match_all=match_all,
+                                       snippet_tokens=snippet_tokens, fields=fields,
+                                       after=after, filters=filters)
+
+            # Bez dotazu nebo bez FTS5 (sekvenční LIKE) - "rank" = novější rok dřív
+            columns = ''.join(f", {f}" for f in fields if f in fulltext.SEARCH_FIELDS
+                              and f not in ('doc_id', 'tags', 'snippet', 'rank'))
+            match, params = self._match_sql(query)
+            where, filter_params = fulltext.filters_sql(filters, alias='documents')
+            params += filter_params
+            if after is not None:
+                where += " AND (-COALESCE(year, 0) > ? OR (-COALESCE(year, 0) = ? AND doc_id > ?))"
+                params += [after[0], after[0], after[1]]
+
+            cursor = conn.execute(f"""
+                SELECT doc_id, -COALESCE(year, 0) AS rank{columns}, NULL AS snippet
+                FROM documents
+                WHERE {match}{where}
+                ORDER BY rank, doc_id
+                LIMIT ?
+            """, [*params, limit])
+
+            docs = [dict(row) for row in cursor.fetchall()]
+            return fulltext.attach_tags(conn, docs) if 'tags' in fields else docs
 
-    def search_documents(self, query: str, limit: int = 5) -> List[Dict]:
-        """Vyhledá relevantní dokumenty pro dotaz"""
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # FTS vyhledávání (pokud je k dispozici) nebo LIKE
-        cursor.execute("""
-            SELECT doc_id, quote, title, year, content_json, tags
-            FROM documents
-            WHERE title LIKE ? OR content_json LIKE ?
-            ORDER BY year DESC
-            LIMIT ?
-        """, (f"%{query}%", f"%{query}%", limit))
-
-        docs = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return docs
-
-    def ask_ai(self, question: str, context_docs: List[Dict]) -> str:
-        """Zeptá se AI s kontextem z dokumentů"""
+    @staticmethod
+    def _match_sql(query: str) -> tuple:
+        """Podmínka LIKE pro hledání bez FTS5 (prázdný dotaz = všechny dokumenty)
+
+        Hledá jen v metadatech (název, citace) - obsah je komprimovaný v blob
+        store a content_json zůstává prázdný, fulltext obsahu umí jen FTS5.
+        """
+        if not query:
+            return "1", []
+        return "(title LIKE ? OR quote LIKE ?)", [f"%{query}%", f"%{query}%"]
+
+    def search_facets(self, query: str, match_all: bool = True, filters: Dict = None) -> Dict:
+        """Počty výsledků podle roku a typu dokumentu"""
+        fts_ready = self._ensure_fulltext()
+
+        with db.reader() as conn:
+            if fts_ready and query:
+                return fulltext.facets(conn, query, match_all=match_all, filters=filters)
+
+            match, params = self._match_sql(query)
+            where, filter_params = fulltext.filters_sql(filters, alias='documents')
+            return {field: [
+                {'value': row[0], 'count': row[1]} for row in conn.execute(f"""
+                    SELECT {field}, COUNT(*) AS count FROM documents
+                    WHERE {match}{where}
+                    GROUP BY {field} ORDER BY count DESC, {field} LIMIT 20
+                """, [*params, *filter_params])
+            ] for field in fulltext.FACET_FIELDS}
+
+    def retrieve_context(self, question: str, budget_tokens: int = ASK_CONTEXT_TOKENS) -> List[Dict]:
+        """Nejrelevantnější fragmenty k otázce v rozpočtu tokenů (fallback: úryvky dokumentů)"""
+        if self.fragments_ready is None:
+            with db.writer() as conn:
+                self.fragments_ready = retrieval.ensure_fragments(conn, DB_PATH)
+
+        if self.fragments_ready:
+            with db.reader() as conn:
+                documents = retrieval.retrieve(conn, question, budget_tokens=budget_tokens)
+            if documents:
+                return documents
+
+        # Bez fragmentů (FTS5 chybí nebo dokumenty nemají obsah) - úryvky z fulltextu
+        return self.search_documents(question, limit=5, match_all=False, snippet_tokens=64)
 
-        # Připrav kontext
+    @staticmethod
+    def build_context(context_docs: List[Dict]) -> str:
+        """Text kontextu pro AI z dokumentů (fragmenty nebo úryvky)"""
         context = "Relevantní právní dokumenty:\n\n"
         for doc in context_docs:
             context += f"**{doc['quote']} - {doc['title']}** (rok {doc['year']})\n"
 
-            # Přidej část obsahu
-            if doc.get('content_json'):
-                try:
-                    content = json.loads(doc['content_json'])
-                    if 'Fragments' in content:
-                        fragments = content['Fragments'][:5]  # Prvních 5 fragmentů
-                        for frag in fragments:
-                            if frag.get('Content'):
-                                context += f"  {frag['Content'][:200]}...\n"
-                except:
-                    pass
+            # Vybrané fragmenty, jinak zvýrazněný úryvek z fulltextu
+            if doc.get('fragments'):
+                for fragment in doc['fragments']:
+                    context += f"  {fragment['text']}\n"
+            elif doc.get('snippet'):
+                snippet = doc['snippet'].replace('<mark>', '').replace('</mark>', '')
+                context += f"  {snippet}\n"
             context += "\n"
+        return context
 
-        # Zeptej se AI
-        prompt = f"""Jsi právní AI asistent specializující se na české zákony.
+    @staticmethod
+    def source_versions(context_docs: List[Dict]) -> Dict[str, Optional[str]]:
+        """last_update zdrojových dokumentů - změna zneplatní odpověď v cache"""
+        codes = [doc['code'] for doc in context_docs if doc.get('code')]
+        if not codes:
+            return {}
+        with db.reader() as conn:
+            rows = conn.execute(f"""
+                SELECT code, last_update FROM documents WHERE code IN ({','.join('?' * len(codes))})
+            """, codes).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def context_fragments(context_docs: List[Dict]) -> List[str]:
+        """Texty fragmentů kontextu v pořadí, v jakém jdou do promptu"""
+        texts = []
+        for doc in context_docs:
+            texts.append(f"{doc.get('code')}|{doc.get('quote')}|{doc.get('title')}|{doc.get('year')}")
+            if doc.get('fragments'):
+                texts.extend(fragment['text'] for fragment in doc['fragments'])
+            elif doc.get('snippet'):
+                texts.append(doc['snippet'])
+        return texts
+
+    def complete(self, prompt: str) -> Optional[str]:
+        """Odpověď poskytovatele na prompt, None bez nakonfigurovaného AI"""
+        if self.provider == 'anthropic' and HAS_ANTHROPIC:
+            message = self.client.messages.create(
+                model=self.model,
+                max_tokens=2048,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return message.content[0].text
+
+        elif self.provider == 'openai' and HAS_OPENAI:
+            response = self.client.ChatCompletion.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=2048
+            )
+            return response.choices[0].message.content
+
+        elif self.provider == 'stub':
+            return self.client.complete(prompt, self.model)
+
+        return None
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Odpověď poskytovatele po částech, jak přicházejí (bez AI nic)"""
+        if self.provider == 'anthropic' and HAS_ANTHROPIC:
+            with self.client.messages.stream(
+                model=self.model,
+                max_tokens=2048,
+                messages=[{"role": "user", "content": prompt}]
+            ) as stream:
+                yield from stream.text_stream
+
+        elif self.provider == 'openai' and HAS_OPENAI:
+            for chunk in self.client.ChatCompletion.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=2048,
+                stream=True
+            ):
+                text = chunk.choices[0].delta.get('content')
+                if text:
+                    yield text
+
+        elif self.provider == 'stub':
+            yield from self.client.stream(prompt, self.model)
+
+    @staticmethod
+    def build_prompt(question: str, context: str) -> str:
+        """Prompt s kontextem a otázkou uživatele"""
+        return f"""Jsi právní AI asistent specializující se na české zákony.
 
 {context}
 
@@ -143,32 +384,92 @@ Otázka uživatele: {question}
 Odpověz na základě výše uvedených právních dokumentů. Pokud informace nejsou v dokumentech,
 jasně to uveď. Odkazuj na konkrétní zákony (číslo Sb.)."""
 
-        if self.provider == 'anthropic' and HAS_ANTHROPIC:
-            try:
-                message = self.client.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=2048,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return message.content[0].text
-            except Exception as e:
-                return f"AI není k dispozici: {e}\n\nKontext:\n{context}"
+    def _cached(self, question: str, context_docs: List[Dict]) -> tuple:
+        """(klíč, verze zdrojů, odpověď z cache nebo None); bez cache/AI klíč None"""
+        if self.answer_cache is None or self.client is None:
+            return None, None, None
+        key = self.answer_cache.cache_key(question, self.provider, self.model,
+                                          self.context_fragments(context_docs))
+        sources = self.source_versions(context_docs)
+        return key, sources, self.answer_cache.get(key, sources)
 
-        elif self.provider == 'openai' and HAS_OPENAI:
-            try:
-                response = self.client.ChatCompletion.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=2048
-                )
-                return response.choices[0].message.content
-            except Exception as e:
-                return f"AI není k dispozici: {e}\n\nKontext:\n{context}"
+    def ask_ai(self, question: str, context_docs: List[Dict]) -> str:
+        """Zeptá se AI s kontextem z dokumentů (odpověď z cache, pokud se zdroje nezměnily)"""
+        context = self.build_context(context_docs)
 
-        else:
+        key, sources, answer = self._cached(question, context_docs)
+        if answer is not None:
+            return answer
+
+        # Zeptej se AI
+        try:
+            answer = self.complete(self.build_prompt(question, context))
+        except Exception as e:
+            return f"AI není k dispozici: {e}\n\nKontext:\n{context}"
+
+        if answer is None:
             # Fallback bez AI - jen zobraz kontext
             return f"AI není nakonfigurováno. Zde jsou relevantní dokumenty:\n\n{context}"
 
+        if key is not None:
+            self.answer_cache.put(key, answer, sources, question=question,
+                                  provider=self.provider, model=self.model)
+        return answer
+
+    def ask_ai_stream(self, question: str, context_docs: List[Dict]) -> Iterator[str]:
+        """Jako ask_ai, ale odpověď vrací po částech hned, jak je poskytovatel posílá
+
+        Chyba před první částí se vrátí jako text (stejně jako u ask_ai), chyba
+        uprostřed odpovědi se vyhodí dál. Do cache jde jen celá odpověď.
+        """
+        context = self.build_context(context_docs)
+
+        key, sources, answer = self._cached(question, context_docs)
+        if answer is not None:
+            yield answer
+            return
+
+        parts = []
+        try:
+            for text in self.stream(self.build_prompt(question, context)):
+                parts.append(text)
+                yield text
+        except Exception as e:
+            if parts:
+                raise
+            yield f"AI není k dispozici: {e}\n\nKontext:\n{context}"
+            return
+
+        if not parts:
+            yield f"AI není nakonfigurováno. Zde jsou relevantní dokumenty:\n\n{context}"
+            return
+
+        if key is not None:
+            self.answer_cache.put(key, ''.join(parts), sources, question=question,
+                                  provider=self.provider, model=self.model)
+
+
+class StubAIClient:
+    """Poskytovatel bez sítě pro testy (provider='stub') - deterministická odpověď z promptu
+
+    stream() vrací odpověď po slovech s prodlevou `delay` sekund (simulace generování).
+    """
+
+    def __init__(self, delay: float = float(os.getenv('ZAKONY_STUB_DELAY', 0.05))):
+        self.delay = delay
+        self.calls = 0
+
+    def complete(self, prompt: str, model: str) -> str:
+        self.calls += 1
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]
+        return (f"Odpověď {model} #{digest} (kontext {len(prompt)} znaků). "
+                f"Podle uvedených předpisů platí obecná pravidla, podrobnosti viz zdroje.")
+
+    def stream(self, prompt: str, model: str) -> Iterator[str]:
+        for word in re.findall(r'\S+\s*', self.complete(prompt, model)):
+            time.sleep(self.delay)
+            yield word
+
 
 class DocumentIndexer:
     """Indexování a tagování dokumentů"""
@@ -177,155 +478,101 @@ class DocumentIndexer:
     def get_tags_from_web(doc_code: str) -> List[str]:
         """Získá tagy z původního webu"""
         try:
-            url = f"https://www.zakonyprolidi.cz/cs/{doc_code}"
-            response = requests.get(url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            tags = []
-
-            # Hledej meta keywords
-            meta = soup.find('meta', {'name': 'keywords'})
-            if meta and meta.get('content'):
-                tags.extend([t.strip() for t in meta['content'].split(',')])
-
-            # Hledej kategorie v breadcrumbs
-            breadcrumbs = soup.find_all('a', class_='breadcrumb')
-            for bc in breadcrumbs:
-                if bc.text.strip():
-                    tags.append(bc.text.strip())
-
-            return list(set(tags))  # Unikátní
+            soup = PDFDownloader.fetch_page(doc_code, timeout=10)
+            return DocumentIndexer.extract_tags(soup)
         except:
             return []
 
     @staticmethod
-    def auto_tag_document(doc: Dict) -> List[str]:
-        """Automatické tagování podle obsahu"""
+    def extract_tags(soup: BeautifulSoup) -> List[str]:
+        """Vytáhne tagy z již naparsované stránky dokumentu"""
         tags = []
-        title = doc.get('title', '').lower()
-
-        # Právní oblasti
-        if any(x in title for x in ['trestní', 'trest']):
-            tags.append('trestní právo')
-        if any(x in title for x in ['občanský', 'obchodní']):
-            tags.append('občanské právo')
-        if any(x in title for x in ['daň', 'daní']):
-            tags.append('daňové právo')
-        if any(x in title for x in ['práce', 'zaměstnan']):
-            tags.append('pracovní právo')
-        if any(x in title for x in ['správní', 'úřad']):
-            tags.append('správní právo')
-        if any(x in title for x in ['staveb', 'územ']):
-            tags.append('stavební právo')
-        if any(x in title for x in ['doprav', 'silnič']):
-            tags.append('dopravní právo')
-        if any(x in title for x in ['životní prostředí', 'ekolog', 'ochrana přírody']):
-            tags.append('environmentální právo')
-
-        # Typ dokumentu
-        doc_type = doc.get('doc_type', '')
-        if doc_type == '4':
-            tags.append('zákon')
-        elif doc_type == '2':
-            tags.append('vyhláška')
-        elif doc_type == '1':
-            tags.append('nařízení vlády')
-
-        # Rok
-        year = doc.get('year')
-        if year:
-            if year >= 2020:
-                tags.append('nové')
-            elif year >= 2000:
-                tags.append('platné')
-            else:
-                tags.append('historické')
 
-        return tags
+        # Hledej meta keywords
+        meta = soup.find('meta', {'name': 'keywords'})
+        if meta and meta.get('content'):
+            tags.extend([t.strip() for t in meta['content'].split(',')])
 
-    @staticmethod
-    def save_tags(doc_id: int, tags: List[str]):
-        """Uloží tagy do databáze"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        # Hledej kategorie v breadcrumbs
+        breadcrumbs = soup.find_all('a', class_='breadcrumb')
+        for bc in breadcrumbs:
+            if bc.text.strip():
+                tags.append(bc.text.strip())
 
-        # Aktualizuj tagy jako JSON
-        cursor.execute("""
-            UPDATE documents
-            SET tags = ?
-            WHERE doc_id = ?
-        """, (json.dumps(tags, ensure_ascii=False), doc_id))
+        return list(set(tags))  # Unikátní
 
-        conn.commit()
-        conn.close()
+    @staticmethod
+    def auto_tag_document(doc: Dict) -> List[str]:
+        """Automatické tagování podle pravidel z TAG_RULES_PATH"""
+        return tag_rules.tag(doc)
+
+    @staticmethod
+    def save_tags(doc_id: int, tags: List[str], source: str = 'manual'):
+        """Uloží tagy do databáze (nahradí dosavadní tagy stejného zdroje)"""
+        with db.writer() as conn:
+            set_document_tags(conn, doc_id, tags, source=source)
 
 
 class PDFDownloader:
     """Stahování a konverze do PDF s OCR"""
 
+    @staticmethod
+    def fetch_html(doc_code: str, timeout: float = 30, engine: FetchEngine = None) -> str:
+        """Stáhne HTML stránky dokumentu (přes sdílenou cache)"""
+        url = f"{WEB_URL}/cs/{doc_code}"
+        response = http_cache.get(http_session, url, timeout=timeout, engine=engine)
+        response.raise_for_status()
+        return response.text
+
+    @staticmethod
+    def parse_html(html: str) -> BeautifulSoup:
+        """Naparsuje HTML stránky dokumentu"""
+        return BeautifulSoup(html, 'html.parser')
+
+    @staticmethod
+    def fetch_page(doc_code: str, timeout: float = 30, engine: FetchEngine = None) -> BeautifulSoup:
+        """Stáhne a naparsuje stránku dokumentu"""
+        return PDFDownloader.parse_html(PDFDownloader.fetch_html(doc_code, timeout, engine))
+
     @staticmethod
     def download_document_as_pdf(doc_code: str) -> Optional[str]:
         """Stáhne dokument a uloží jako PDF"""
         try:
-            url = f"https://www.zakonyprolidi.cz/cs/{doc_code}"
-            response = requests.get(url, timeout=30)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            return PDFDownloader.render_pdf(doc_code, PDFDownloader.fetch_page(doc_code))
+        except Exception as e:
+            print(f"Chyba při stahování PDF: {e}")
+            return None
 
+    @staticmethod
+    def render_pdf(doc_code: str, soup: BeautifulSoup) -> Optional[str]:
+        """Uloží již naparsovanou stránku dokumentu jako PDF"""
+        try:
             # Najdi hlavní obsah
             content = soup.find('div', class_='Paper')
             if not content:
                 return None
 
-            # Vytvoř PDF
-            pdf_path = os.path.join(PDF_DIR, f"{doc_code}.pdf")
+            # Vytvoř PDF (pdfs/ROK/STOVKA/KOD.pdf)
+            pdf_path = shard_path(PDF_DIR, doc_code, f"{doc_code}.pdf")
+            Path(pdf_path).parent.mkdir(parents=True, exist_ok=True)
 
             if HAS_PDF:
-                c = canvas.Canvas(pdf_path, pagesize=A4)
-                width, height = A4
-
-                # Registruj české fonty (pokud jsou k dispozici)
-                # pdfmetrics.registerFont(TTFont('DejaVu', 'DejaVuSans.ttf'))
-
-                y = height - 50
-
-                # Titulek
                 title = soup.find('title')
-                if title:
-                    c.setFont("Helvetica-Bold", 16)
-                    c.drawString(50, y, title.text[:80])
-                    y -= 30
-
-                # Obsah
-                c.setFont("Helvetica", 10)
-                text = content.get_text(separator='\n')
-
-                for line in text.split('\n')[:100]:  # Max 100 řádků
-                    if y < 50:
-                        c.showPage()
-                        y = height - 50
-
-                    # Ošetři dlouhé řádky
-                    if len(line) > 80:
-                        line = line[:80] + '...'
-
-                    try:
-                        c.drawString(50, y, line.strip())
-                    except:
-                        # Ignoruj chyby s neASCII znaky
-                        pass
-                    y -= 15
-
-                c.save()
-                return pdf_path
+                render_paper(content, pdf_path, title=title.get_text().strip() if title else None)
+                kind = 'pdf'
             else:
                 # Fallback - ulož jako text
-                txt_path = pdf_path.replace('.pdf', '.txt')
-                with open(txt_path, 'w', encoding='utf-8') as f:
+                pdf_path = pdf_path.replace('.pdf', '.txt')
+                with open(pdf_path, 'w', encoding='utf-8') as f:
                     f.write(content.get_text())
-                return txt_path
+                kind = 'pdf_fallback'
+
+            with db.writer() as conn:
+                record_artifact(conn, doc_code, kind, pdf_path)
+            return pdf_path
 
         except Exception as e:
-            print(f"Chyba při stahování PDF: {e}")
+            print(f"Chyba při generování PDF: {e}")
             return None
 
     @staticmethod
@@ -335,21 +582,8 @@ class PDFDownloader:
             return "OCR není k dispozici"
 
         try:
-            # Převeď PDF na obrázky
-            images = convert_from_path(pdf_path)
-
-            # OCR na každé stránce
-            text = ""
-            for i, img in enumerate(images):
-                text += f"\n--- Stránka {i+1} ---\n"
-                text += pytesseract.image_to_string(img, lang='ces+eng')
-
-            # Ulož OCR text
-            ocr_path = os.path.join(OCR_DIR, Path(pdf_path).stem + '.txt')
-            with open(ocr_path, 'w', encoding='utf-8') as f:
-                f.write(text)
-
-            return ocr_path
+            # Stránky se OCRují paralelně v poolu, tady se jen čeká na výsledek
+            return ocr_service.ocr(pdf_path)
         except Exception as e:
             return f"OCR chyba: {e}"
 
@@ -357,162 +591,272 @@ class PDFDownloader:
     def download_attachments(doc_code: str) -> List[str]:
         """Stáhne všechny přílohy dokumentu"""
         try:
-            url = f"https://www.zakonyprolidi.cz/cs/{doc_code}"
-            response = requests.get(url, timeout=30)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            return PDFDownloader.extract_attachments(doc_code, PDFDownloader.fetch_page(doc_code))
+        except Exception as e:
+            print(f"Chyba při stahování příloh: {e}")
+            return []
 
-            attachments = []
+    @staticmethod
+    def extract_attachments(doc_code: str, soup: BeautifulSoup,
+                            engine: FetchEngine = None) -> List[str]:
+        """Stáhne přílohy odkazované z již naparsované stránky dokumentu"""
+        try:
+            items = {}
 
             # Hledej odkazy na přílohy
             for link in soup.find_all('a', href=True):
                 href = link['href']
                 if any(ext in href for ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx']):
-                    # Stáhni přílohu
                     if not href.startswith('http'):
-                        href = 'https://www.zakonyprolidi.cz' + href
+                        href = WEB_URL + href
 
                     filename = os.path.basename(href.split('?')[0])
-                    filepath = os.path.join(ATTACHMENTS_DIR, doc_code, filename)
-
-                    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+                    items.setdefault(href, shard_path(ATTACHMENTS_DIR, doc_code, doc_code, filename))
 
-                    att_response = requests.get(href, timeout=30)
-                    with open(filepath, 'wb') as f:
-                        f.write(att_response.content)
+            # Stáhni souběžně; už stažené URL a stejný obsah se nestahují znovu
+            results = [r for r in attachment_fetcher.fetch_all(items.items(), engine=engine) if r['path']]
 
-                    attachments.append(filepath)
-
-            return attachments
+            with db.writer() as conn:
+                for r in results:
+                    record_artifact(conn, doc_code, 'attachment', r['path'], sha256=r['sha256'])
+            return [r['path'] for r in results]
         except Exception as e:
             print(f"Chyba při stahování příloh: {e}")
             return []
 
 
-class DownloadManager:
-    """Správa stahování s kontrolou duplikátů"""
+class DocumentPipeline:
+    """Zpracování dokumentů ve stupních propojených omezenými frontami
 
-    def __init__(self):
-        self.pause_seconds = 2
-        self.max_docs = 100
+    fetch (síť) -> parse (CPU) -> process (PDF, přílohy, tagy) -> text
 
-    def is_downloaded(self, doc_code: str) -> bool:
-        """Zkontroluje, zda už je dokument stažen"""
-        pdf_path = os.path.join(PDF_DIR, f"{doc_code}.pdf")
-        txt_path = os.path.join(PDF_DIR, f"{doc_code}.txt")
-        return os.path.exists(pdf_path) or os.path.exists(txt_path)
+    Každá stránka se stáhne a naparsuje jen jednou, naparsovaný strom se
+    předá všem dalším krokům. Stupně běží souběžně, takže se síť, parsování
+    a OCR různých dokumentů překrývají; velikost front omezuje paměť.
+    """
 
-    def download_batch(self, criteria: Dict):
-        """Stáhne dávku dokumentů podle kritérií"""
-        global download_status
+    STAGES = ('fetch', 'parse', 'process', 'text')
 
-        download_status['is_running'] = True
-        download_status['errors'] = []
-        download_status['completed'] = 0
+    def __init__(self, workers: Dict[str, int] = None, queue_size: int = 8,
+                 engine: FetchEngine = None):
+        self.workers = {'fetch': 4, 'parse': 2, 'process': 2, 'text': 1}
+        self.workers.update(workers or {})
+        self.queue_size = queue_size
+        self.engine = engine
 
-        try:
-            # Získej dokumenty podle kritérií
-            docs = self.get_documents_by_criteria(criteria)
-            download_status['total'] = len(docs)
+    # --- Jednotlivé stupně (pracují nad kontextem dokumentu) ---
 
-            for doc in docs:
-                if not download_status['is_running']:
-                    break
+    def fetch(self, ctx: Dict):
+        ctx['html'] = PDFDownloader.fetch_html(ctx['doc']['code'], engine=self.engine)
 
-                doc_code = doc['code']
-                download_status['current_doc'] = doc_code
+    def parse(self, ctx: Dict):
+        ctx['soup'] = PDFDownloader.parse_html(ctx.pop('html'))
 
-                # Kontrola, zda už není stažen
-                if self.is_downloaded(doc_code):
-                    print(f"⏭️  {doc_code} již stažen")
-                    download_status['completed'] += 1
-                    continue
+    def process(self, ctx: Dict):
+        doc = ctx['doc']
+        soup = ctx.pop('soup')
 
-                try:
-                    # Stáhni PDF
-                    pdf_path = PDFDownloader.download_document_as_pdf(doc_code)
+        ctx['pdf_path'] = PDFDownloader.render_pdf(doc['code'], soup)
+        if not ctx['pdf_path']:
+            return
+
+        # Text, ze kterého PDF vzniklo - později ho není nutné OCRovat
+        content = soup.find('div', class_='Paper')
+        ctx['source_text'] = content.get_text(separator='\n') if content else None
+
+        # Přílohy a tagy ze stejného stromu - bez dalšího požadavku na stránku
+        ctx['attachments'] = PDFDownloader.extract_attachments(doc['code'], soup, engine=self.engine)
+
+        DocumentIndexer.save_tags(doc['doc_id'], DocumentIndexer.extract_tags(soup), source='web')
+        DocumentIndexer.save_tags(doc['doc_id'], DocumentIndexer.auto_tag_document(doc), source='auto')
 
-                    if pdf_path:
-                        # OCR (pokud je k dispozici)
-                        if HAS_OCR and pdf_path.endswith('.pdf'):
-                            PDFDownloader.ocr_pdf(pdf_path)
+    def text(self, ctx: Dict):
+        doc = ctx['doc']
+        source_text = ctx.pop('source_text', None)
 
-                        # Stáhni přílohy
-                        PDFDownloader.download_attachments(doc_code)
+        results = []
 
-                        # Indexuj a taguj
-                        tags_web = DocumentIndexer.get_tags_from_web(doc_code)
-                        tags_auto = DocumentIndexer.auto_tag_document(doc)
-                        all_tags = list(set(tags_web + tags_auto))
-                        DocumentIndexer.save_tags(doc['doc_id'], all_tags)
+        # Vygenerované PDF: text ze stránky, OCR není potřeba
+        pdf_path = ctx.get('pdf_path')
+        if pdf_path and pdf_path.endswith('.pdf'):
+            output_path = shard_path(OCR_DIR, doc['code'], f"{doc['code']}.txt")
+            results.append(text_extractor.acquire(pdf_path, source_text=source_text,
+                                                  doc_code=doc['code'], output_path=output_path))
+            ctx['text_method'] = results[-1]['method']
 
-                        download_status['completed'] += 1
+        # Přílohy: textová vrstva, skeny do OCR fronty (stahování nečeká)
+        for path in ctx.get('attachments') or []:
+            if path.lower().endswith('.pdf'):
+                output_path = shard_path(OCR_DIR, doc['code'], doc['code'], Path(path).stem + '.txt')
+                results.append(text_extractor.acquire(path, doc_code=doc['code'],
+                                                      output_path=output_path, wait=False))
 
+        # Texty z OCR fronty (wait=False) zaeviduje po dokončení úlohy _record_ocr_text
+        written = [r['output_path'] for r in results
+                   if r['output_path'] and os.path.exists(r['output_path'])]
+        if written:
+            with db.writer() as conn:
+                for path in written:
+                    record_artifact(conn, doc['code'], 'text', path)
+
+    # --- Řízení ---
+
+    def _worker(self, stage: str, inbox: queue.Queue, outbox: Optional[queue.Queue], on_done,
+                should_stop):
+        func = getattr(self, stage)
+        while True:
+            ctx = inbox.get()
+            if ctx is None:
+                break
+
+            # Při zastavení rozpracované dokumenty jen projdou zbylými stupni
+            if 'error' not in ctx and should_stop():
+                ctx['error'] = 'cancelled'
+
+            if 'error' not in ctx:
+                start = time.perf_counter()
+                try:
+                    func(ctx)
                 except Exception as e:
-                    error_msg = f"{doc_code}: {str(e)}"
-                    download_status['errors'].append(error_msg)
-                    print(f"❌ {error_msg}")
+                    ctx['error'] = f"{stage}: {e}"
+                ctx['timings'][stage] = time.perf_counter() - start
 
-                # Pauza
-                time.sleep(self.pause_seconds)
+            if outbox is not None:
+                outbox.put(ctx)
+            else:
+                on_done(ctx)
+
+    def run(self, docs, on_done, should_stop=lambda: False):
+        """Prožene dokumenty pipeline, on_done(ctx) se volá po posledním stupni"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.STAGES]
+        stage_threads = []
+
+        for i, stage in enumerate(self.STAGES):
+            outbox = queues[i + 1] if i + 1 < len(self.STAGES) else None
+            threads = [
+                threading.Thread(target=self._worker,
+                                 args=(stage, queues[i], outbox, on_done, should_stop),
+                                 name=f"pipeline-{stage}-{n}", daemon=True)
+                for n in range(max(1, self.workers.get(stage, 1)))
+            ]
+            for t in threads:
+                t.start()
+            stage_threads.append(threads)
 
+        try:
+            for doc in docs:
+                if should_stop():
+                    break
+                queues[0].put({'doc': doc, 'timings': {}})
         finally:
-            download_status['is_running'] = False
+            # Ukončení po stupních: až doběhne stupeň, dostane sentinel další
+            for i, threads in enumerate(stage_threads):
+                for _ in threads:
+                    queues[i].put(None)
+                for t in threads:
+                    t.join()
 
-    def get_documents_by_criteria(self, criteria: Dict) -> List[Dict]:
-        """Získá dokumenty podle kritérií"""
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        query = "SELECT * FROM documents WHERE 1=1"
-        params = []
-
-        # Datum od-do
-        if criteria.get('date_from'):
-            query += " AND publish_date >= ?"
-            params.append(criteria['date_from'])
-
-        if criteria.get('date_to'):
-            query += " AND publish_date <= ?"
-            params.append(criteria['date_to'])
-
-        # Stáří ve dnech
-        if criteria.get('days_old'):
-            days_ago = (datetime.now() - timedelta(days=criteria['days_old'])).strftime('%Y-%m-%d')
-            query += " AND publish_date >= ?"
-            params.append(days_ago)
-
-        # Typ dokumentu
-        if criteria.get('doc_type'):
-            query += " AND doc_type = ?"
-            params.append(criteria['doc_type'])
-
-        # Rok
-        if criteria.get('year'):
-            query += " AND year = ?"
-            params.append(criteria['year'])
-
-        # Řazení a limit
-        query += " ORDER BY publish_date DESC"
-
-        if criteria.get('max_docs'):
-            query += " LIMIT ?"
-            params.append(criteria['max_docs'])
-        else:
-            query += " LIMIT ?"
-            params.append(self.max_docs)
 
-        cursor.execute(query, params)
-        docs = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+class DownloadManager:
+    """Stahování přes perzistentní frontu úloh s kontrolou duplikátů
 
-        return docs
+    Dávky se jen zařadí do fronty (dokument zadaný víckrát se stáhne
+    jednou), frontu zpracovává jedno vlákno s pipeline po celou dobu
+    běhu serveru.
+    """
 
+    def __init__(self, jobs: DownloadQueue = None, workers: Dict[str, int] = None):
+        self.jobs = jobs or download_queue
+        self.pause_seconds = 2
+        self.max_docs = 100
+        self.workers = {'fetch': 4, 'parse': 2, 'process': 2, 'text': 1}
+        self.workers.update(workers or {})
 
-# ========== FLASK ROUTES ==========
+        # Rate limit sdílený všemi dávkami a workery
+        self.engine = FetchEngine(rate=1.0 / self.pause_seconds, concurrency=self.workers['fetch'])
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = False
+
+    def is_downloaded(self, doc_code: str) -> bool:
+        """Zkontroluje, zda už je dokument stažen (indexovaný dotaz do artifacts)"""
+        with db.reader() as conn:
+            return has_artifact(conn, doc_code)
+
+    def submit(self, criteria: Dict) -> Dict:
+        """Zařadí dávku dokumentů podle kritérií, vrací {batch_id, queued, duplicates}"""
+        # Pauza mezi požadavky se převádí na rate limit; platí z poslední dávky
+        pause = criteria.get('pause_seconds')
+        if pause is None:
+            pause = self.pause_seconds
+        self.engine.bucket.rate = 1.0 / pause if pause else 0
+
+        docs = self.get_documents_by_criteria(criteria)
+        result = self.jobs.submit(docs, criteria)
+        self.start()
+        return result
+
+    def start(self):
+        """Spustí zpracování fronty (pokud ještě neběží)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stopping = False
+
+            # Úlohy rozpracované při pádu předchozího procesu
+            recovered = self.jobs.recover()
+            if recovered:
+                print(f"🔁 Obnoveno {recovered} rozpracovaných úloh stahování")
+
+            self.thread = threading.Thread(target=self._run, name="download-queue", daemon=True)
+            self.thread.start()
+
+    def close(self):
+        """Zastaví zpracování fronty (nedokončené úlohy ve frontě zůstanou)"""
+        with self.lock:
+            thread, self.stopping = self.thread, True
+        self.jobs.wake()
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            self.thread = None
+
+    def _run(self):
+        pipeline = DocumentPipeline(self.workers, engine=self.engine)
+        should_stop = lambda: self.stopping
+
+        def pending(docs):
+            for doc in docs:
+                # Kontrola, zda už není stažen
+                if self.is_downloaded(doc['code']):
+                    print(f"⏭️  {doc['code']} již stažen")
+                    self.jobs.finish(doc['code'])
+                    continue
+
+                yield doc
+
+        def on_done(ctx):
+            code = ctx['doc']['code']
+            error = ctx.get('error')
+            if error == 'cancelled':
+                # Zastavení není chyba - úloha se vrátí do fronty bez započteného pokusu
+                self.jobs.release(code)
+                return
+            if error is None and not ctx.get('pdf_path'):
+                error = "PDF nevzniklo (chybí obsah stránky)"
+            if error:
+                print(f"❌ {code}: {error}")
+            self.jobs.finish(code, pdf_path=ctx.get('pdf_path'), timings=ctx['timings'], error=error)
 
-ai_engine = AIQueryEngine(provider='anthropic')
-download_manager = DownloadManager()
+        pipeline.run(pending(self.jobs.iter_claims(should_stop)), on_done, should_stop=should_stop)
+
+    def get_documents_by_criteria(self, criteria: Dict) -> List[Dict]:
+        """Získá dokumenty podle kritérií (jen sloupce pro zpracování, z pokrývajícího indexu)"""
+        with db.reader() as conn:
+            return select_documents(conn, criteria, default_limit=self.max_docs)
+
+
+# ========== FLASK ROUTES ==========
 
 
 @app.route('/')
@@ -521,36 +865,127 @@ def index():
     return render_template('index.html')
 
 
+def _encode_cursor(doc: Dict, depth: int) -> str:
+    """Kurzor další stránky z posledního výsledku (rank, doc_id) a počtu vrácených výsledků"""
+    raw = json.dumps([doc['rank'], doc['doc_id'], depth]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """((rank, doc_id), hloubka) z kurzoru; ValueError pro neplatný kurzor"""
+    if not isinstance(cursor, str):
+        raise ValueError(cursor)
+    try:
+        rank, doc_id, depth = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError(cursor)
+    if not isinstance(rank, (int, float)) or not isinstance(doc_id, int) \
+            or not isinstance(depth, int) or depth < 0:
+        raise ValueError(cursor)
+    return (rank, doc_id), depth
+
+
 @app.route('/api/search', methods=['POST'])
 def search():
-    """API pro vyhledávání"""
-    data = request.json
+    """API pro vyhledávání
+
+    Volitelně: fields (projekce), limit, cursor (next_cursor z předchozí
+    stránky), year / doc_type / tags (filtry) a facets (počty podle roku
+    a typu). S filtrem tags může být dotaz prázdný.
+
+    Kurzor končí po SEARCH_MAX_DEPTH výsledcích: keyset jen přeskočí řádky
+    před kurzorem, BM25 se ale pro každou stránku počítá nad všemi shodami.
+    """
+    data = request.json or {}
     query = data.get('query', '')
 
-    if not query:
+    tags = data.get('tags')
+    if isinstance(tags, str):
+        tags = [tags]
+    if tags is not None and not (isinstance(tags, list) and all(isinstance(t, str) for t in tags)):
+        return jsonify({'error': 'tags musí být seznam názvů tagů'}), 400
+
+    if not query and not tags:
         return jsonify({'error': 'Prázdný dotaz'}), 400
 
-    # Vyhledej dokumenty
-    docs = ai_engine.search_documents(query, limit=10)
+    fields = data.get('fields') or list(fulltext.DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in fulltext.SEARCH_FIELDS]
+    if unknown:
+        return jsonify({'error': f'Neznámá pole: {", ".join(map(str, unknown))}',
+                        'fields': fulltext.SEARCH_FIELDS}), 400
 
-    return jsonify({
+    limit = data.get('limit', SEARCH_PAGE_SIZE)
+    if not isinstance(limit, int) or not 0 < limit <= SEARCH_MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit musí být 1-{SEARCH_MAX_PAGE_SIZE}'}), 400
+
+    after, depth = None, 0
+    if data.get('cursor'):
+        try:
+            after, depth = _decode_cursor(data['cursor'])
+        except ValueError:
+            return jsonify({'error': 'Neplatný kurzor'}), 400
+    if depth >= SEARCH_MAX_DEPTH:
+        return jsonify({'error': f'Stránkovat lze nejvýš {SEARCH_MAX_DEPTH} výsledků, upřesněte dotaz'}), 400
+    limit = min(limit, SEARCH_MAX_DEPTH - depth)
+
+    filters = {f: data[f] for f in fulltext.FACET_FIELDS if data.get(f) is not None}
+    if tags:
+        filters['tags'] = tags
+
+    # O jeden víc - pozná se, jestli existuje další stránka
+    docs = ai_engine.search_documents(query, limit=limit + 1, fields=fields,
+                                      after=after, filters=filters)
+    depth += min(len(docs), limit)
+    next_cursor = (_encode_cursor(docs[limit - 1], depth)
+                   if len(docs) > limit and depth < SEARCH_MAX_DEPTH else None)
+    docs = [{k: v for k, v in doc.items() if k in fields} for doc in docs[:limit]]
+
+    result = {
         'query': query,
         'count': len(docs),
-        'documents': docs
-    })
+        'documents': docs,
+        'next_cursor': next_cursor
+    }
+    if data.get('facets'):
+        result['facets'] = ai_engine.search_facets(query, filters=filters)
+    return jsonify(result)
 
 
-@app.route('/api/ask', methods=['POST'])
-def ask_ai():
-    """API pro AI dotazy"""
-    data = request.json
+def _ask_params() -> tuple:
+    """(otázka, rozpočet kontextu, chybová odpověď) z požadavku na /api/ask*"""
+    data = request.json or {}
     question = data.get('question', '')
 
     if not question:
-        return jsonify({'error': 'Prázdná otázka'}), 400
+        return None, None, (jsonify({'error': 'Prázdná otázka'}), 400)
+
+    budget = data.get('budget', ASK_CONTEXT_TOKENS)
+    if not isinstance(budget, int) or not 0 < budget <= ASK_MAX_CONTEXT_TOKENS:
+        return None, None, (jsonify({'error': f'budget musí být 1-{ASK_MAX_CONTEXT_TOKENS} tokenů'}), 400)
+
+    return question, budget, None
+
 
-    # Najdi relevantní dokumenty
-    context_docs = ai_engine.search_documents(question, limit=5)
+def _ask_sources(context_docs: List[Dict]) -> List[Dict]:
+    """Zdroje odpovědi s offsety použitých fragmentů"""
+    return [{
+        'quote': d['quote'],
+        'title': d['title'],
+        'code': d['code'],
+        'fragments': [{'position': f['position'], 'start_offset': f['start_offset'],
+                       'end_offset': f['end_offset']} for f in d.get('fragments', [])]
+    } for d in context_docs]
+
+
+@app.route('/api/ask', methods=['POST'])
+def ask_ai():
+    """API pro AI dotazy"""
+    question, budget, error = _ask_params()
+    if error:
+        return error
+
+    # Nejlepší fragmenty (stačí shoda v libovolném slově otázky) v rozpočtu tokenů
+    context_docs = ai_engine.retrieve_context(question, budget_tokens=budget)
 
     # Zeptej se AI
     answer = ai_engine.ask_ai(question, context_docs)
@@ -558,95 +993,245 @@ def ask_ai():
     return jsonify({
         'question': question,
         'answer': answer,
-        'sources': [{'quote': d['quote'], 'title': d['title']} for d in context_docs]
+        'context_tokens': retrieval.estimate_tokens(ai_engine.build_context(context_docs)),
+        'sources': _ask_sources(context_docs)
     })
 
 
+@app.route('/api/ask/stream', methods=['POST'])
+def ask_ai_stream():
+    """AI dotaz jako Server-Sent Events
+
+    Hned po výběru kontextu přijde sources (zdroje a velikost kontextu),
+    pak token s každou částí odpovědi od poskytovatele a nakonec done
+    (nebo error, pokud spojení s poskytovatelem spadne uprostřed odpovědi).
+    """
+    question, budget, error = _ask_params()
+    if error:
+        return error
+
+    context_docs = ai_engine.retrieve_context(question, budget_tokens=budget)
+
+    def stream():
+        yield _sse('sources', {
+            'question': question,
+            'context_tokens': retrieval.estimate_tokens(ai_engine.build_context(context_docs)),
+            'sources': _ask_sources(context_docs)
+        })
+        try:
+            for text in ai_engine.ask_ai_stream(question, context_docs):
+                yield _sse('token', {'text': text})
+        except Exception as e:
+            yield _sse('error', {'error': str(e)})
+            return
+        yield _sse('done', {})
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/api/download/start', methods=['POST'])
 def start_download():
-    """Spustí stahování"""
-    if download_status['is_running']:
-        return jsonify({'error': 'Stahování už běží'}), 400
-
+    """Zařadí dávku do fronty stahování (může běžet víc dávek najednou)"""
     criteria = request.json
 
     # Validace
     if criteria.get('max_docs', 0) > 1000:
         return jsonify({'error': 'Max 1000 dokumentů najednou'}), 400
 
-    # Spusť v threadu
-    thread = threading.Thread(target=download_manager.download_batch, args=(criteria,))
-    thread.start()
+    result = download_manager.submit(criteria)
 
-    return jsonify({'status': 'started'})
+    return jsonify({'status': 'queued', **result})
 
 
 @app.route('/api/download/stop', methods=['POST'])
 def stop_download():
-    """Zastaví stahování"""
-    download_status['is_running'] = False
-    return jsonify({'status': 'stopped'})
+    """Zastaví stahování - čekající úlohy se zruší, běžící doběhnou"""
+    return jsonify({'status': 'stopped', 'cancelled': download_queue.cancel()})
+
+
+@app.route('/api/download/explain', methods=['POST'])
+def explain_download_criteria():
+    """EXPLAIN QUERY PLAN výběru dokumentů pro kritéria (kontrola použití indexu)"""
+    criteria = request.json or {}
+    with db.reader() as conn:
+        return jsonify(explain_criteria(conn, criteria, default_limit=download_manager.max_docs))
 
 
 @app.route('/api/download/status')
 def get_download_status():
-    """Vrátí stav stahování"""
-    return jsonify(download_status)
+    """Vrátí stav stahování z fronty (aktivní dávky, případně ?batch=ID)"""
+    status = download_queue.status(batch_id=request.args.get('batch', type=int))
+    if HAS_OCR:
+        status['ocr'] = ocr_service.status()
+    return jsonify(status)
+
+
+def _sse(kind: str, data: Dict, event_id: int = None) -> str:
+    """Jedna zpráva Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        # Epocha procesu v id - po restartu serveru klient dostane nový snapshot
+        lines.append(f"id: {download_queue.events.epoch}-{event_id}")
+    lines.append(f"event: {kind}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def _last_event_id() -> Optional[int]:
+    """Číslo poslední přijaté události z Last-Event-ID (jen ze stejného běhu serveru)"""
+    epoch, _, number = (request.headers.get('Last-Event-ID') or '').partition('-')
+    if epoch == str(download_queue.events.epoch) and number.isdigit():
+        return int(number)
+    return None
+
+
+@app.route('/api/download/events')
+def download_events():
+    """Průběh stahování jako Server-Sent Events
+
+    Nejdřív snapshot (stejný jako /api/download/status), pak jen změny:
+    task (převzetí/výsledek dokumentu včetně chyby a časů stupňů),
+    batch/cancel/retry a progress s počty, které se od minula změnily.
+    """
+    events = download_queue.events
+    last_id = _last_event_id()
+
+    def stream():
+        seq = last_id
+        sent = {}
+
+        # Nový klient, nebo mu události mezitím vypadly z bufferu
+        if seq is None or events.since(seq) is None:
+            seq = events.last_id
+            snapshot = download_queue.status()
+            sent = {k: snapshot[k] for k in download_queue.progress()}
+            yield _sse('snapshot', snapshot, seq)
+
+        while True:
+            batch = events.wait(seq, timeout=SSE_KEEPALIVE_SECONDS)
+            if batch is None:
+                seq = events.last_id
+                yield _sse('snapshot', download_queue.status(), seq)
+                continue
+            if not batch:
+                yield ': keepalive\n\n'
+                continue
+
+            for event_id, kind, data in batch:
+                yield _sse(kind, data, event_id)
+                seq = event_id
+
+            # Několik událostí najednou = jedna zpráva s počty
+            progress = download_queue.progress()
+            delta = {k: v for k, v in progress.items() if sent.get(k) != v}
+            if delta:
+                sent.update(delta)
+                yield _sse('progress', delta, seq)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/api/stats')
 def get_stats():
     """Statistiky databáze"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with db.reader() as conn:
+        # Počty dokumentů z materializované tabulky (bez COUNT(*) přes documents)
+        counters = read_stats(conn)
 
-    cursor.execute("SELECT COUNT(*) FROM documents")
-    total_docs = cursor.fetchone()[0]
+        # Soubory podle druhu z evidence (bez os.listdir)
+        artifacts = artifact_statistics(conn)
 
-    cursor.execute("SELECT COUNT(*) FROM documents WHERE tags IS NOT NULL")
-    tagged_docs = cursor.fetchone()[0]
+    return jsonify({
+        'total_documents': counters['documents'],
+        'tagged_documents': counters['tagged'],
+        'pdf_documents': artifacts.get('pdf', {}).get('documents', 0),
+        'ocr_documents': artifacts.get('text', {}).get('documents', 0),
+        'artifacts': artifacts,
+        'text_sources': text_extractor.statistics(),
+        'attachments': attachment_fetcher.statistics(),
+        'answer_cache': answer_cache.statistics()
+    })
 
-    # Dokumenty s PDF
-    pdf_count = len([f for f in os.listdir(PDF_DIR) if f.endswith('.pdf')])
 
-    conn.close()
+@app.route('/api/tags')
+def get_tags():
+    """Tagy s počty dokumentů (udržované triggery, bez procházení dokumentů)"""
+    limit = request.args.get('limit', type=int)
+    with db.reader() as conn:
+        return jsonify({'tags': tag_counts(conn, limit=limit)})
+
+
+@app.route('/api/tags/assign', methods=['POST'])
+def assign_document_tags():
+    """Hromadné přiřazení tagů dokumentům podle kódů
+
+    mode: add (výchozí), replace (nahradí ruční tagy dokumentů) nebo remove.
+    """
+    data = request.json or {}
+    codes = data.get('codes') or []
+    tags = data.get('tags') or []
+    mode = data.get('mode', 'add')
+
+    if not codes or not all(isinstance(c, str) for c in codes):
+        return jsonify({'error': 'codes musí být neprázdný seznam kódů'}), 400
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        return jsonify({'error': 'tags musí být seznam názvů tagů'}), 400
+    if mode not in ('add', 'replace', 'remove'):
+        return jsonify({'error': 'mode musí být add, replace nebo remove'}), 400
+
+    with db.writer() as conn:
+        doc_ids = []
+        for i in range(0, len(codes), 500):
+            chunk = codes[i:i + 500]
+            doc_ids += [row[0] for row in conn.execute(
+                f"SELECT doc_id FROM documents WHERE code IN ({','.join('?' * len(chunk))})", chunk)]
+
+        if mode == 'remove':
+            changed = remove_tags(conn, doc_ids, tags)
+        else:
+            changed = assign_tags(conn, [(doc_id, tags) for doc_id in doc_ids],
+                                  source='manual', replace=mode == 'replace')
 
-    return jsonify({
-        'total_documents': total_docs,
-        'tagged_documents': tagged_docs,
-        'pdf_documents': pdf_count,
-        'ocr_documents': len(os.listdir(OCR_DIR)) if os.path.exists(OCR_DIR) else 0
-    })
+    return jsonify({'documents': len(doc_ids), 'changed': changed})
 
 
 @app.route('/api/document/<doc_code>')
 def get_document(doc_code):
     """Detail dokumentu"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM documents WHERE code = ?", (doc_code,))
-    doc = cursor.fetchone()
-    conn.close()
+    with db.reader() as conn:
+        doc = conn.execute("SELECT * FROM documents WHERE code = ?", (doc_code,)).fetchone()
 
     if not doc:
         return jsonify({'error': 'Dokument nenalezen'}), 404
 
     doc_dict = dict(doc)
 
-    # Přidej info o PDF
-    pdf_path = os.path.join(PDF_DIR, f"{doc_code}.pdf")
-    doc_dict['has_pdf'] = os.path.exists(pdf_path)
+    # Obsah jen na vyžádání (?content=1) - dekomprimuje se až tady
+    inline = {key: doc_dict.pop(key, None) for key in
+              ('content_json', 'content_html', 'content_json_ref', 'content_html_ref')}
+    doc_dict['has_content'] = any(inline.values())
+    if request.args.get('content'):
+        with db.reader() as conn:
+            doc_dict['content_json'] = load_content_json(conn, inline)
+            doc_dict['content_html'] = load_content_html(conn, inline)
+
+    # Přidej info o PDF a dalších souborech
+    with db.reader() as conn:
+        doc_dict['artifacts'] = document_artifacts(conn, doc_code)
+    doc_dict['has_pdf'] = any(a['kind'] == 'pdf' for a in doc_dict['artifacts'])
 
-    # Přidej tagy
-    if doc_dict.get('tags'):
-        doc_dict['tags'] = json.loads(doc_dict['tags'])
+    # Přidej tagy (z document_tags, sloupec documents.tags se už nečte)
+    with db.reader() as conn:
+        doc_dict['tags'] = document_tags(conn, [doc_dict['doc_id']])[doc_dict['doc_id']]
 
     return jsonify(doc_dict)
 
 
 if __name__ == '__main__':
+    init_app()
+
     print("🚀 Zákony pro lidi - Web GUI")
     print("="*60)
     print(f"📊 Databáze: {DB_PATH}")
@@ -659,6 +1244,14 @@ if __name__ == '__main__':
     print(f"OCR: {'✅' if HAS_OCR else '❌'}")
     print("="*60)
     print("🌐 Server běží na: http://localhost:5000")
+
+    # Dokončí OCR úlohy, které zůstaly ve frontě z minulého běhu
+    # (jen v procesu serveru, ne v hlídacím procesu reloaderu)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if HAS_OCR:
+            ocr_service.start()
+        # Dokončí úlohy stahování z minulého běhu
+        download_manager.start()
     print("="*60)
 
     app.run(debug=True, port=5000, host='0.0.0.0')